@@ -2,49 +2,232 @@
 
 from pathlib import Path
 from shutil import rmtree
+from typing import Callable, Union
 
-import hydromt  # noqa: F401
-import pandas as pd
+import numpy as np
 import xarray as xr
-from hydromt import DataCatalog
-from rucio.client import Client
-from rucio.client.downloadclient import DownloadClient
 
-
-def get_dataset_names(rucio_scope: str = "wtromp"):
+from DT_flood.utils.forcing.cache import ForcingCache, get_default_cache
+from DT_flood.utils.forcing.catalogue import (
+    get_file_metadata,
+    is_offline,
+    load_catalogue,
+)
+from DT_flood.utils.forcing.download import download_files
+from DT_flood.utils.forcing.manifest import load_manifest, select_files
+from DT_flood.utils.forcing.planner import ForcingRequest, plan_reads
+from DT_flood.utils.forcing.references import open_virtual_dataset
+from DT_flood.utils.forcing.stations import get_station_coords, get_station_index
+from DT_flood.utils.forcing.subset import combine_subsets, open_subset, subset_dataset
+
+
+def get_dataset_names(
+    rucio_scope: str = "wtromp",
+    rucio_client=None,
+    ttl_hours: float = None,
+    offline: bool = None,
+    refresh: bool = False,
+):
     """
     Get the names of datasets in a Rucio scope.
 
+    The names come from a locally stored catalogue, which is only listed from Rucio
+    again once it is older than its TTL.
+
     Parameters
     ----------
     rucio_scope : str, optional
         The Rucio scope to use. The default is 'wtromp'.
+    rucio_client : Client, optional
+        Rucio client. By default a client is borrowed from the shared pool.
+    ttl_hours : float, optional
+        Maximum age of the stored catalogue in hours, by default 24 hours.
+    offline : bool, optional
+        If True only use the stored catalogue. Defaults to ``DT_FLOOD_OFFLINE``.
+    refresh : bool, optional
+        If True list the datasets from Rucio regardless of the catalogue age.
 
     Returns
     -------
     list
         A list of dataset names.
     """
-    # Create a Rucio client
-    rucio_client = Client()
-
-    # Get the list of datasets in the scope
-    datasets = rucio_client.list_dids(
-        scope=rucio_scope, filters={"name": "*"}, did_type="dataset"
+    datasets = load_catalogue(
+        rucio_scope=rucio_scope,
+        rucio_client=rucio_client,
+        ttl_hours=ttl_hours,
+        offline=offline,
+        refresh=refresh,
     )
     return list(datasets)
 
 
+def select_forcing_files(
+    dataset: str,
+    start_date: str,
+    end_date: str,
+    data_vars: list,
+    rucio_scope: str = "wtromp",
+    rucio_client=None,
+    refresh: bool = False,
+) -> list[dict]:
+    """
+    Select the files of a Rucio dataset needed for a time window.
+
+    Parameters
+    ----------
+    dataset : str
+        The name of the dataset.
+    start_date : str
+        The start date of the data to download.
+    end_date : str
+        The end date of the data to download.
+    data_vars : list
+        The list of data variables to download.
+    rucio_scope : str, optional
+        The Rucio scope to use. The default is 'wtromp'.
+    rucio_client : Client, optional
+        Rucio client used to list the dataset, only needed when the dataset manifest
+        is not stored locally yet. By default a client is borrowed from the shared
+        pool.
+    refresh : bool, optional
+        If True rebuild the locally stored manifest of the dataset. It is also
+        rebuilt when it does not cover end_date.
+
+    Returns
+    -------
+    list[dict]
+        Descriptions of the selected files, with at least scope, name and adler32.
+    """
+    # Get files covering the requested variables and time window
+    offline = is_offline()
+    manifest = load_manifest(
+        rucio_client,
+        dataset=dataset,
+        rucio_scope=rucio_scope,
+        refresh=refresh,
+        offline=offline,
+        end_date=end_date,
+    )
+    files = []
+    if "elevtn" in data_vars:
+        files.append(
+            get_file_metadata(
+                "elevtn.nc",
+                rucio_scope=rucio_scope,
+                rucio_client=rucio_client,
+                offline=offline,
+            )
+        )
+    files.extend(
+        select_files(
+            manifest, start_date=start_date, end_date=end_date, data_vars=data_vars
+        )
+    )
+    return files
+
+
+def fetch_forcing_files(
+    files: list[dict],
+    cache: Union[ForcingCache, None, bool] = True,
+    max_workers: int = 4,
+    retries: int = 3,
+    download_client_factory: Callable = None,
+    base_dir: Union[str, Path] = ".",
+) -> list[Path]:
+    """
+    Fetch files from Rucio, using the local cache where possible.
+
+    Files already present in the local forcing cache are not downloaded again.
+    Remaining files are downloaded concurrently and verified against the size and
+    checksum in their description. Corrupt files are downloaded again, and
+    verified files left behind by an interrupted run are reused.
+
+    Parameters
+    ----------
+    files : list[dict]
+        Descriptions of the files, as returned by select_forcing_files.
+    cache : Union[ForcingCache, None, bool], optional
+        Local cache for downloaded files. If True (default) use the cache configured
+        through the environment, if None or False download into the rucio_scope
+        folder without caching.
+    max_workers : int, optional
+        Maximum number of concurrent downloads. The default is 4.
+    retries : int, optional
+        Number of retries per file after a failed download. The default is 3.
+    download_client_factory : Callable, optional
+        Callable creating a download client for each download worker. By default
+        download clients are borrowed from the shared pool.
+    base_dir : Union[str, Path], optional
+        Folder to download into, files end up in ``base_dir/scope/name`` unless
+        they are moved into the cache. The default is the working directory.
+
+    Returns
+    -------
+    list[Path]
+        Paths to the local files, in the same order as files.
+    """
+    if cache is True:
+        cache = get_default_cache()
+    elif cache is False:
+        cache = None
+
+    outlist = []
+    pending = []
+    for file in files:
+        did = file["scope"] + ":" + file["name"]
+        cached = cache.get(did, file.get("adler32")) if cache is not None else None
+        if cached is not None:
+            print(f"Using cached file for {did}")
+            outlist.append(cached)
+        else:
+            pending.append((len(outlist), did, file.get("adler32")))
+            outlist.append(Path(base_dir, file["scope"], file["name"]))
+
+    if pending and is_offline():
+        raise FileNotFoundError(
+            f"Files {[did for _, did, _ in pending]} are not cached in offline mode"
+        )
+    if pending:
+        download_list = [did for _, did, _ in pending]
+        print(f"Downloading files: {download_list}")
+        results = download_files(
+            download_list,
+            download_client_factory=download_client_factory,
+            base_dir=base_dir,
+            max_workers=max_workers,
+            retries=retries,
+            metadata={file["scope"] + ":" + file["name"]: file for file in files},
+        )
+        total_size = sum(result.size for result in results)
+        print(f"Downloaded {len(results)} files, {total_size / 1e6:.1f} MB in total")
+
+    # Move fresh downloads into the cache
+    if cache is not None:
+        for index, did, checksum in pending:
+            outlist[index] = cache.put(did, outlist[index], checksum=checksum)
+    return outlist
+
+
 def get_forcing_data(
     dataset: str,
     start_date: str,
     end_date: str,
     data_vars: list,
     rucio_scope: str = "wtromp",
+    cache: Union[ForcingCache, None, bool] = True,
+    max_workers: int = 4,
+    retries: int = 3,
+    rucio_client=None,
+    download_client_factory: Callable = None,
+    refresh: bool = False,
 ):
     """
     Get forcing data from Rucio.
 
+    Files already present in the local forcing cache are not downloaded again.
+    Remaining files are downloaded concurrently.
+
     Parameters
     ----------
     dataset : str
@@ -57,53 +240,44 @@ def get_forcing_data(
         The list of data variables to download.
     rucio_scope : str, optional
         The Rucio scope to use. The default is 'wtromp'.
+    cache : Union[ForcingCache, None, bool], optional
+        Local cache for downloaded files. If True (default) use the cache configured
+        through the environment, if None or False download into the rucio_scope
+        folder without caching.
+    max_workers : int, optional
+        Maximum number of concurrent downloads. The default is 4.
+    retries : int, optional
+        Number of retries per file after a failed download. The default is 3.
+    rucio_client : Client, optional
+        Rucio client used to list the dataset. By default a client is borrowed from
+        the shared pool.
+    download_client_factory : Callable, optional
+        Callable creating a download client for each download worker. By default
+        download clients are borrowed from the shared pool.
+    refresh : bool, optional
+        If True rebuild the locally stored manifest of the dataset.
 
     Returns
     -------
     list
         A list of paths to the downloaded files.
     """
-    download_list = []
-    outlist = []
-
-    # Create a Rucio client
-    rucio_client = Client()
-
-    # Create a DownloadClient instance
-    download_client = DownloadClient()
-
-    # get list of moths and years
-    months = list(
-        range(pd.to_datetime(start_date).month, pd.to_datetime(end_date).month + 1)
-    )
-    years = list(
-        range(pd.to_datetime(start_date).year, pd.to_datetime(end_date).year + 1)
+    files = select_forcing_files(
+        dataset=dataset,
+        start_date=start_date,
+        end_date=end_date,
+        data_vars=data_vars,
+        rucio_scope=rucio_scope,
+        rucio_client=rucio_client,
+        refresh=refresh,
     )
-
-    # Get contents of the dataset
-    contents = rucio_client.list_content(
-        name=dataset,
-        scope=rucio_scope,
+    return fetch_forcing_files(
+        files,
+        cache=cache,
+        max_workers=max_workers,
+        retries=retries,
+        download_client_factory=download_client_factory,
     )
-    # Get files with correct months and years
-    if "elevtn" in data_vars:
-        download_list.append({"did": "wtromp:elevtn.nc"})
-        outlist.append(Path("wtromp", "elevtn.nc"))
-    for file in contents:
-        if (
-            any("_" + str(month) in file["name"] for month in months)
-            and any("_" + str(year) in file["name"] for year in years)
-            and any(var in file["name"] for var in data_vars)
-        ):
-            download_list.append({"did": file["scope"] + ":" + file["name"]})
-            outlist.append(Path(file["scope"], file["name"]))
-
-    print(f"Downloading files: {download_list}")
-    _ = download_client.download_dids(download_list)
-    for file in outlist:
-        if not file.exists():
-            raise FileNotFoundError(f"File {file} does not exist. Download failed.")
-    return outlist
 
 
 def get_event_forcing_data(
@@ -114,10 +288,20 @@ def get_event_forcing_data(
     bounds: list,
     rucio_scope: str = "wtromp",
     cleanup=True,
+    chunks: dict = None,
+    virtual: bool = False,
+    storage_options: dict = None,
+    refresh: bool = False,
 ):
     """
     Get forcing data for a specific event from Rucio.
 
+    Each file is clipped to the bounding box and time window before the files are
+    merged, so memory use scales with the model domain rather than the global grid.
+    With virtual=True files are not downloaded, but read remotely through cached
+    byte-range references, fetching only the chunks inside the bounding box and
+    time window.
+
     Parameters
     ----------
     dataset : str
@@ -132,12 +316,46 @@ def get_event_forcing_data(
         The bounding box to clip the data to. CRS should match dataset CRS.
     rucio_scope : str, optional
         The Rucio scope to use. The default is 'wtromp'.
+    cleanup : bool, optional
+        If True load the data and remove the download folder. The default is True.
+    chunks : dict, optional
+        Dask chunks of the clipped data, by default weekly chunks of hourly data.
+    virtual : bool, optional
+        If True read the files through references instead of downloading them,
+        see DT_flood.utils.forcing.references. The default is False.
+    storage_options : dict, optional
+        fsspec options to read the file replicas when virtual is True.
+    refresh : bool, optional
+        If True rebuild the locally stored manifest of the dataset.
 
     Returns
     -------
     xarray.Dataset
         An xarray dataset containing the forcing data for the event.
     """
+    if virtual:
+        files = select_forcing_files(
+            dataset=dataset,
+            start_date=start_date,
+            end_date=end_date,
+            data_vars=data_vars,
+            rucio_scope=rucio_scope,
+            refresh=refresh,
+        )
+        datasets = [
+            subset_dataset(
+                open_virtual_dataset(file, storage_options=storage_options),
+                bounds=bounds,
+                start_date=start_date,
+                end_date=end_date,
+            )
+            for file in files
+        ]
+        ds_clip = combine_subsets(datasets, chunks=chunks)
+        if cleanup:
+            ds_clip.load()
+        return ds_clip
+
     # Get the forcing data for the event
     data_list = get_forcing_data(
         dataset=dataset,
@@ -145,34 +363,108 @@ def get_event_forcing_data(
         end_date=end_date,
         data_vars=data_vars,
         rucio_scope=rucio_scope,
+        refresh=refresh,
     )
-    # merge the data files
-    ds_full = xr.open_mfdataset(
+    # clip each file to the model domain and event window before merging
+    ds_clip = open_subset(
         data_list,
-        combine="nested",
+        bounds=bounds,
+        start_date=start_date,
+        end_date=end_date,
+        chunks=chunks,
     )
-    ds_full.close()
 
-    ds_full = ds_full.sortby("longitude")
-    ds_full = ds_full.sortby("latitude")
+    if cleanup:
+        ds_clip.load()
+        rmtree(rucio_scope, ignore_errors=True)
 
-    delta_lat = ds_full["latitude"].diff("latitude").min().values
-    delta_lon = ds_full["longitude"].diff("longitude").min().values
+    return ds_clip
 
-    ds_clip = ds_full.sel(
-        longitude=slice(bounds[0] - delta_lon, bounds[2] + delta_lon),
-        latitude=slice(bounds[1] - delta_lat, bounds[3] + delta_lat),
-    )
 
-    if len(ds_clip.time) > 1:
-        print("slicing time")
-        ds_clip = ds_clip.sel(time=slice(start_date, end_date))
+def get_planned_forcing_data(
+    requests: list[ForcingRequest],
+    rucio_scope: str = "wtromp",
+    cleanup: bool = True,
+    chunks: dict = None,
+    rucio_client=None,
+    refresh: bool = False,
+    **kwargs,
+) -> dict[str, xr.Dataset]:
+    """
+    Get gridded forcing data for several forcings of an event at once.
 
-    if cleanup:
-        ds_clip.load()
-        rmtree(rucio_scope)
+    Requests for the same files are merged, so every file is downloaded and read
+    only once, clipped to the union of the bounding boxes and time windows of the
+    requests using it. The result is then split per request.
 
-    return ds_clip
+    Parameters
+    ----------
+    requests : list[ForcingRequest]
+        Forcing requests, each with its own dataset, variables, window and bounds.
+    rucio_scope : str, optional
+        The Rucio scope to use. The default is 'wtromp'.
+    cleanup : bool, optional
+        If True remove the download folder afterwards. The default is True.
+    chunks : dict, optional
+        Dask chunks of the clipped data, by default weekly chunks of hourly data.
+    rucio_client : Client, optional
+        Rucio client used to list the datasets. By default a client is borrowed
+        from the shared pool.
+    refresh : bool, optional
+        If True rebuild the locally stored manifests of the datasets.
+    **kwargs
+        Passed on to fetch_forcing_files.
+
+    Returns
+    -------
+    dict[str, xr.Dataset]
+        Forcing data by request name.
+    """
+    files = {
+        request.name: select_forcing_files(
+            dataset=request.dataset,
+            start_date=request.start_date,
+            end_date=request.end_date,
+            data_vars=request.data_vars,
+            rucio_scope=rucio_scope,
+            rucio_client=rucio_client,
+            refresh=refresh,
+        )
+        for request in requests
+    }
+    reads = plan_reads(requests, files)
+    n_requested = sum(len(file_list) for file_list in files.values())
+    print(f"Fetching {len(reads)} unique files for {n_requested} requested files")
+
+    paths = fetch_forcing_files([read.file for read in reads.values()], **kwargs)
+
+    # read every file once, clipped to the union of all requests using it
+    clipped = {}
+    for (did, read), path in zip(reads.items(), paths):
+        with xr.open_dataset(path) as ds:
+            clipped[did] = subset_dataset(
+                ds,
+                bounds=read.bounds,
+                start_date=read.start_date,
+                end_date=read.end_date,
+            ).load()
+
+    if cleanup:
+        rmtree(rucio_scope, ignore_errors=True)
+
+    forcing_data = {}
+    for request in requests:
+        datasets = [
+            subset_dataset(
+                clipped[file["scope"] + ":" + file["name"]],
+                bounds=request.bounds,
+                start_date=request.start_date,
+                end_date=request.end_date,
+            )
+            for file in files[request.name]
+        ]
+        forcing_data[request.name] = combine_subsets(datasets, chunks=chunks)
+    return forcing_data
 
 
 def get_gtsm_forcing_data(
@@ -183,9 +475,18 @@ def get_gtsm_forcing_data(
     bounds: list,
     rucio_scope: str = "wtromp",
     cleanup: bool = True,
+    buffer: float = 0.0,
+    points: np.ndarray = None,
+    n_nearest: int = None,
+    refresh: bool = False,
 ):
     """Get GTSM data from Rucio.
 
+    Stations are looked up in a spatial index built once per dataset, and only the
+    selected stations are read from each file. The merged selection is read through
+    the hydromt DataCatalog, which clips it to the time window and applies the
+    same renaming, unit and CRS handling as for a full dataset.
+
     Parameters
     ----------
     dataset : str
@@ -200,12 +501,26 @@ def get_gtsm_forcing_data(
         The bounding box to clip the data to. CRS should match dataset CRS.
     rucio_scope : str, optional
         The Rucio scope to use. The default is 'wtromp'.
+    cleanup : bool, optional
+        If True load the data and remove the download folder. The default is True.
+    buffer : float, optional
+        Buffer around the bounding box in dataset CRS units. The default is 0.
+    points : np.ndarray, optional
+        Points (N x 2), e.g. along the model boundary. If given together with
+        n_nearest, the n_nearest stations closest to each point are selected
+        instead of the stations inside the bounding box.
+    n_nearest : int, optional
+        Number of nearest stations per point.
+    refresh : bool, optional
+        If True rebuild the locally stored manifest of the dataset.
 
     Returns
     -------
     xarray.Dataset
         An xarray dataset containing the GTSM data for the event.
     """
+    from hydromt import DataCatalog
+
     # Get the forcing data for the event
     data_list = get_forcing_data(
         dataset=dataset,
@@ -213,20 +528,41 @@ def get_gtsm_forcing_data(
         end_date=end_date,
         data_vars=data_vars,
         rucio_scope=rucio_scope,
+        refresh=refresh,
     )
-    # merge the data files
-    ds_full = xr.open_mfdataset(
-        data_list,
-        combine="nested",
-    )
-    ds_full.close()
 
-    dc = DataCatalog()
-
-    ds_clip = dc.get_geodataset(ds_full, bbox=bounds, time_tuple=(start_date, end_date))
+    nearest = points is not None and n_nearest is not None
+    stations = None
+    ds_list = []
+    for path in data_list:
+        ds = xr.open_dataset(path)
+        if stations is None:
+            station_dim, _, _ = get_station_coords(ds)
+            index = get_station_index(dataset, ds, rucio_scope=rucio_scope)
+            if nearest:
+                stations = index.nearest(points, n=n_nearest)
+            else:
+                stations = index.within(bounds, buffer=buffer)
+            print(f"Selected {stations.size} of {len(index)} {dataset} stations")
+        ds_list.append(ds.isel({station_dim: stations}))
+    # files only differ in time, the station coordinates are taken from the first
+    ds_full = xr.concat(
+        ds_list, dim="time", data_vars="minimal", coords="minimal", compat="override"
+    ).sortby("time")
+
+    # the stations inside the bounding box are selected again, unless the index
+    # selected stations outside of it
+    clip_bbox = not nearest and buffer == 0
+    ds_clip = DataCatalog().get_geodataset(
+        ds_full,
+        bbox=bounds if clip_bbox else None,
+        time_tuple=(start_date, end_date),
+    )
 
     if cleanup:
         ds_clip.load()
-        rmtree(rucio_scope)
+        for ds in ds_list:
+            ds.close()
+        rmtree(rucio_scope, ignore_errors=True)
 
     return ds_clip
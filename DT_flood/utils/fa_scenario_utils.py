@@ -1,23 +1,42 @@
-"""Utils functions for setting up FloodAdapt objects."""
+"""Utils functions for setting up FloodAdapt objects.
 
-import os
-from pathlib import Path
-from typing import Union
+FloodAdapt, the geospatial stack and the forcing data utilities are slow to
+import, so they are imported in the functions that use them. Importing this
+module only to call e.g. init_scenario does not pay for the forcing stack.
+"""
 
-import geojson
-import geopandas as gpd
-import hydromt  # noqa: F401
-import pandas as pd
-from flood_adapt.config.config import Settings
-from flood_adapt.dbs_classes.interface.database import IDatabase
-from flood_adapt.flood_adapt import FloodAdapt
-from flood_adapt.objects.forcing import rainfall, wind
+from __future__ import annotations
 
-from DT_flood.utils.data_utils import (
-    get_dataset_names,
-    get_event_forcing_data,
-    get_gtsm_forcing_data,
-)
+import itertools
+import os
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import TYPE_CHECKING, Union
+
+if TYPE_CHECKING:
+    import pandas as pd
+    import xarray as xr
+    from flood_adapt.dbs_classes.interface.database import IDatabase
+    from flood_adapt.flood_adapt import FloodAdapt
+
+FORCING_VARS = {
+    "meteo": ["precip", "wind10_u", "wind10_v", "press_msl"],
+    "wind": ["wind10_u", "wind10_v"],
+    "rainfall": ["precip"],
+    "waterlevel": ["waterlevel"],
+    "wflow": ["kin", "kout", "temp", "press_msl", "precip"],
+    "orography": ["elevtn"],
+}
+DEFAULT_SF_FORCINGS = {"meteo": "era5_hourly", "waterlevel": "gtsm_hourly"}
+DEFAULT_WF_FORCINGS = {
+    "precip_warmup": "era5_daily",
+    "pet_warmup": "era5_daily",
+    "precip_event": "era5_hourly",
+    "pet_event": "era5_hourly",
+    "orography": "era5_orography",
+}
 
 
 def tree(directory):
@@ -65,11 +84,28 @@ def create_systems_folder(database_path: Path):
     sfincs_path.touch()
 
 
-def get_database(database_path):
-    """Get database object."""
+# FloodAdapt keeps a single database per process, so only the database opened
+# last can be reused
+_active_database = {}
+
+
+def get_database(database_path, refresh: bool = False):
+    """Get database object.
+
+    The database opened last is reused by later calls for the same path, unless
+    refresh is True. Opening another database replaces it.
+    """
+    database_path = Path(database_path)
+    key = database_path.resolve()
+    if _active_database.get("path") == key and not refresh:
+        return _active_database["database"]
+    _name_indexes.pop(key, None)
     if not (database_path / "system").exists():
         create_systems_folder(database_path)
 
+    from flood_adapt.config.config import Settings
+    from flood_adapt.flood_adapt import FloodAdapt
+
     Settings(
         DATABASE_ROOT=database_path.parent,
         DATABASE_NAME=database_path.stem,
@@ -78,10 +114,73 @@ def get_database(database_path):
         VALIDATE_ALLOWED_FORCINGS=False,
     )
     db = FloodAdapt(database_path=database_path)
+    _active_database.update(path=key, database=db)
 
     return db
 
 
+# Names of the stored objects per database and object type
+_name_indexes = {}
+_LIST_METHODS = {
+    "event": "get_events",
+    "projection": "get_projections",
+    "measure": "get_measures",
+    "strategy": "get_strategies",
+    "scenario": "get_scenarios",
+}
+
+
+def _object_names(database: FloodAdapt, object_type: str) -> set[str]:
+    """Get the names of the stored objects of a type, listed once per database."""
+    if object_type not in _LIST_METHODS:
+        raise ValueError(
+            f"Object type {object_type} not valid, choose from {list(_LIST_METHODS)}"
+        )
+    index = _name_indexes.setdefault(Path(database.database.base_path).resolve(), {})
+    if object_type not in index:
+        objects = getattr(database, _LIST_METHODS[object_type])()
+        index[object_type] = set(objects["name"])
+    return index[object_type]
+
+
+def object_exists(database: FloodAdapt, object_type: str, name: str) -> bool:
+    """Check if an object exists in the database.
+
+    The object type is 'event', 'projection', 'measure', 'strategy' or
+    'scenario'. The names of the stored objects are listed from the database on the first
+    check and kept in memory, so later checks do not load every object again.
+    """
+    return name in _object_names(database, object_type)
+
+
+def _save_object(database: FloodAdapt, object_type: str, obj):
+    """Save an object to the database and add its name to the name index."""
+    getattr(database, f"save_{object_type}")(obj)
+    index = _name_indexes.get(Path(database.database.base_path).resolve(), {})
+    if object_type in index:
+        index[object_type].add(obj.name)
+
+
+def invalidate_name_index(database: FloodAdapt = None, object_type: str = None):
+    """Drop the in-memory object names, e.g. after editing a database directly.
+
+    Parameters
+    ----------
+    database : FloodAdapt, optional
+        FloodAdapt object. By default the names of all databases are dropped.
+    object_type : str, optional
+        Object type to drop. By default all object types are dropped.
+    """
+    if database is None:
+        _name_indexes.clear()
+        return
+    index = _name_indexes.get(Path(database.database.base_path).resolve(), {})
+    if object_type is None:
+        index.clear()
+    else:
+        index.pop(object_type, None)
+
+
 def init_scenario(
     database_path: Union[str, os.PathLike], scenario_name: str
 ) -> tuple[IDatabase, dict]:
@@ -131,18 +230,15 @@ def create_scenario(
     IScenario
         FloodAdapt Scenario object
     """
-    if event not in database.get_events()["name"]:
+    if not object_exists(database, "event", event):
         raise ValueError(f"Event {event} does not exist in the database!")
-    if strategy not in database.get_strategies()["name"]:
+    if not object_exists(database, "strategy", strategy):
         raise ValueError(f"Strategy {strategy} does not exist in the database!")
-    if projection not in database.get_projections()["name"]:
+    if not object_exists(database, "projection", projection):
         raise ValueError(f"Projection {projection} does not exist in the database!")
 
-    # Load existing scenarios
-    scenarios_existing = database.get_scenarios()
-
     # If necessary create new scenario, save it and return object, otherwise load existing and return object
-    if name not in scenarios_existing["name"]:
+    if not object_exists(database, "scenario", name):
         scenario_new = create_scenario_config(
             database=database,
             name=name,
@@ -150,12 +246,100 @@ def create_scenario(
             strategy=strategy,
             projection=projection,
         )
-        database.save_scenario(scenario_new)
+        _save_object(database, "scenario", scenario_new)
         return scenario_new
     else:
         return database.get_scenario(name)
 
 
+def create_scenario_matrix(
+    database: FloodAdapt,
+    events: list[str],
+    strategies: list[str],
+    projections: list[str],
+    name_format: str = "{event}_{projection}_{strategy}",
+    manifest_path: Union[str, os.PathLike] = None,
+) -> pd.DataFrame:
+    """Create the scenarios of all combinations of events, strategies and projections.
+
+    The events, strategies and projections are validated once for the whole
+    matrix. Scenarios whose name already exists are skipped.
+
+    Parameters
+    ----------
+    database : FloodAdapt
+        FloodAdapt Database object
+    events : list[str]
+        Names of existing events.
+    strategies : list[str]
+        Names of existing strategies.
+    projections : list[str]
+        Names of existing projections.
+    name_format : str, optional
+        Format of the scenario names, with fields event, projection and strategy.
+        The default is '{event}_{projection}_{strategy}'.
+    manifest_path : Union[str, os.PathLike], optional
+        If given, write the returned table to this CSV file.
+
+    Returns
+    -------
+    pd.DataFrame
+        Per scenario name the event, projection, strategy and status ('created',
+        'existing' or 'failed'), in the order to run them.
+    """
+    import pandas as pd
+
+    missing = [
+        f"{object_type} {name}"
+        for object_type, names in [
+            ("event", events),
+            ("strategy", strategies),
+            ("projection", projections),
+        ]
+        for name in dict.fromkeys(names)
+        if not object_exists(database, object_type, name)
+    ]
+    if missing:
+        raise ValueError(f"Not in the database: {', '.join(missing)}")
+
+    records = {}
+    for event, projection, strategy in itertools.product(
+        dict.fromkeys(events), dict.fromkeys(projections), dict.fromkeys(strategies)
+    ):
+        name = name_format.format(event=event, projection=projection, strategy=strategy)
+        if name in records:
+            raise ValueError(f"Scenario name {name} is not unique in the matrix")
+        records[name] = {"event": event, "projection": projection, "strategy": strategy}
+
+    tic = time.perf_counter()
+    for name, record in records.items():
+        if object_exists(database, "scenario", name):
+            record["status"] = "existing"
+            continue
+        try:
+            scenario_new = create_scenario_config(
+                database=database, name=name, **record
+            )
+            _save_object(database, "scenario", scenario_new)
+            record["status"] = "created"
+        except Exception as err:
+            print(f"Creating scenario {name} failed: {err}")
+            record["status"] = "failed"
+
+    matrix = pd.DataFrame.from_dict(records, orient="index")
+    matrix.index.name = "name"
+    print(
+        f"Scenario matrix of {len(matrix)} scenarios: "
+        f"{(matrix['status'] == 'created').sum()} created, "
+        f"{(matrix['status'] == 'existing').sum()} existing, "
+        f"{(matrix['status'] == 'failed').sum()} failed "
+        f"in {time.perf_counter() - tic:.1f} s"
+    )
+    if manifest_path is not None:
+        matrix.to_csv(manifest_path)
+    return matrix
+
+
 def create_scenario_config(
     database: FloodAdapt, name: str, event: str, strategy: str, projection: str
 ):
@@ -176,6 +360,10 @@ def create_event(
     end_time: str,
     sf_forcings: dict = None,
     wf_forcings: dict = None,
+    encoding: str = None,
+    store: str = "netcdf",
+    warmup_archive: bool = True,
+    refresh: bool = False,
 ):
     """Check if event already exists.
 
@@ -187,40 +375,284 @@ def create_event(
         FloodAdapt Database object
     scenario_config : dict
         Dict containing toplevel scenario configurations
+    encoding : str, optional
+        Encoding profile of the forcing NetCDF files, see
+        DT_flood.utils.forcing.encoding.get_encoding
+    store : str, optional
+        Storage of the Wflow forcing, 'netcdf' for one file per forcing or 'zarr'
+        for a single Zarr store shared by all Wflow forcings. SFINCS forcing is
+        always written as NetCDF.
+    warmup_archive : bool, optional
+        If True take the Wflow warm-up forcing from the site-level archive, only
+        fetching the days missing from it. The default is True.
+    refresh : bool, optional
+        If True list the Rucio datasets and rebuild their manifests before
+        selecting the forcing files. The default is False.
 
     Returns
     -------
     IEvent
         FloodAdapt Event object
     """
-    # Load existing events
-    if sf_forcings is None:
-        sf_forcings = {"meteo": "era5_hourly", "waterlevel": "gtsm_hourly"}
-    if wf_forcings is None:
-        wf_forcings = {
-            "precip_warmup": "era5_daily",
-            "pet_warmup": "era5_daily",
-            "precip_event": "era5_hourly",
-            "pet_event": "era5_hourly",
-            "orography": "era5_orography",
-        }
-    events_existing = database.get_events()
     # If necessary create new event, save it and return object, otherwise load existing and return object
-    if name not in events_existing["name"]:
-        event_dict = {
-            "name": name,
-            "start_time": start_time,
-            "end_time": end_time,
-            "sfincs_forcing": sf_forcings,
-            "wflow_forcing": wf_forcings,
-        }
+    if not object_exists(database, "event", name):
+        event_dict = _event_dict(
+            name=name,
+            start_time=start_time,
+            end_time=end_time,
+            sf_forcings=sf_forcings,
+            wf_forcings=wf_forcings,
+            encoding=encoding,
+            store=store,
+            warmup_archive=warmup_archive,
+            refresh=refresh,
+        )
         event_new = create_event_config(database, event_dict)
-        database.save_event(event_new)
+        _save_object(database, "event", event_new)
         return event_new
     else:
         return database.get_event(name)
 
 
+def _event_dict(
+    name: str,
+    start_time: str,
+    end_time: str,
+    sf_forcings: dict = None,
+    wf_forcings: dict = None,
+    encoding: str = None,
+    store: str = "netcdf",
+    warmup_archive: bool = True,
+    refresh: bool = False,
+) -> dict:
+    """Build the event configuration passed to create_event_config."""
+    return {
+        "name": name,
+        "start_time": start_time,
+        "end_time": end_time,
+        "sfincs_forcing": dict(sf_forcings or DEFAULT_SF_FORCINGS),
+        "wflow_forcing": dict(wf_forcings or DEFAULT_WF_FORCINGS),
+        "encoding": encoding,
+        "store": store,
+        "warmup_archive": warmup_archive,
+        "refresh": refresh,
+    }
+
+
+def _select_event_files(
+    event_dict: dict, archive: Path = None, bounds: list = None
+) -> list[dict]:
+    """Select the Rucio files needed for all forcings of an event.
+
+    With warmup_archive only the warm-up windows missing from the archive at the
+    given Wflow bounds are selected, as in create_event_config.
+    """
+    import pandas as pd
+
+    from DT_flood.utils.data_utils import select_forcing_files
+    from DT_flood.utils.forcing.archive import get_missing_windows
+
+    start_time = event_dict["start_time"]
+    end_time = event_dict["end_time"]
+    refresh = event_dict.get("refresh", False)
+    warmup_archive = event_dict.get("warmup_archive", True)
+    start_warmup = (pd.to_datetime(start_time) - pd.DateOffset(years=1)).strftime(
+        "%Y-%m-%d %H:%M:%S"
+    )
+    archived = set()
+    files = []
+    for forcing, dataset in event_dict["sfincs_forcing"].items():
+        if forcing not in FORCING_VARS:
+            continue
+        files.extend(
+            select_forcing_files(
+                dataset=dataset,
+                start_date=start_time,
+                end_date=end_time,
+                data_vars=FORCING_VARS[forcing],
+                refresh=refresh,
+            )
+        )
+    for forcing, dataset in event_dict["wflow_forcing"].items():
+        if warmup_archive and "warmup" in forcing:
+            archived.add(dataset)
+            continue
+        files.extend(
+            select_forcing_files(
+                dataset=dataset,
+                start_date=start_warmup if "warmup" in forcing else start_time,
+                end_date=start_time if "warmup" in forcing else end_time,
+                data_vars=FORCING_VARS["orography"]
+                if "orography" in forcing
+                else FORCING_VARS["wflow"],
+                refresh=refresh,
+            )
+        )
+    # Planning only, the archive is updated when the event is created
+    for dataset in sorted(archived):
+        windows = get_missing_windows(
+            archive,
+            dataset=dataset,
+            start_date=start_warmup,
+            end_date=start_time,
+            bounds=bounds,
+            update=False,
+        )
+        for start, end in windows:
+            files.extend(
+                select_forcing_files(
+                    dataset=dataset,
+                    start_date=start,
+                    end_date=end,
+                    data_vars=FORCING_VARS["wflow"],
+                    refresh=refresh,
+                )
+            )
+    return files
+
+
+def _prefetch_files(files: list[dict], cache, max_workers: int) -> dict:
+    """Download files missing from the cache, returning what was moved."""
+    from DT_flood.utils.data_utils import fetch_forcing_files
+
+    tic = time.perf_counter()
+    pending = [
+        file
+        for file in files
+        if not cache.contains(file["scope"] + ":" + file["name"], file.get("adler32"))
+    ]
+    # separate download folder, as event creation removes the default one
+    with tempfile.TemporaryDirectory(dir=cache.tmp_dir) as tmpdir:
+        paths = fetch_forcing_files(
+            pending, cache=cache, max_workers=max_workers, base_dir=tmpdir
+        )
+    return {
+        "files_downloaded": len(pending),
+        "bytes_downloaded": sum(path.stat().st_size for path in paths),
+        "download_s": time.perf_counter() - tic,
+    }
+
+
+def create_events(
+    database: FloodAdapt,
+    events: list[dict],
+    prefetch: bool = True,
+    max_workers: int = 4,
+) -> pd.DataFrame:
+    """Create several events, downloading forcing for later events in the background.
+
+    The forcing files of all new events are selected up front and deduplicated
+    across events. While an event is being clipped and written, the files of the
+    next events are downloaded into the forcing cache by a background thread.
+
+    Parameters
+    ----------
+    database : FloodAdapt
+        FloodAdapt Database object
+    events : list[dict]
+        Event specifications, each with the keyword arguments of create_event
+        (name, start_time, end_time and optionally sf_forcings, wf_forcings,
+        encoding, store, warmup_archive and refresh).
+    prefetch : bool, optional
+        If True download forcing of later events in the background. Requires the
+        forcing cache to be enabled. The default is True.
+    max_workers : int, optional
+        Maximum number of concurrent downloads. The default is 4.
+
+    Returns
+    -------
+    pd.DataFrame
+        Per event the status ('created', 'existing' or 'failed'), the number of
+        files and bytes downloaded for it, the time spent waiting for its
+        downloads and the total time to create it.
+    """
+    import pandas as pd
+
+    from DT_flood.utils.forcing.archive import ARCHIVE_NAME
+    from DT_flood.utils.forcing.cache import get_default_cache
+    from DT_flood.utils.site_geometry import get_wflow_domain
+
+    new_events = [
+        _event_dict(**event)
+        for event in events
+        if not object_exists(database, "event", event["name"])
+    ]
+    new_names = [event["name"] for event in new_events]
+
+    cache = get_default_cache() if prefetch else None
+    if prefetch and cache is None:
+        print("Forcing cache disabled, creating events without prefetching")
+
+    # Plan the downloads of all events at once, each file fetched for the first
+    # event needing it
+    plans = []
+    if cache is not None:
+        archive = database.database.base_path / "data" / ARCHIVE_NAME
+        bounds = get_wflow_domain(database).bounds
+        planned = set()
+        for event_dict in new_events:
+            files = []
+            for file in _select_event_files(event_dict, archive, bounds):
+                did = file["scope"] + ":" + file["name"]
+                if did not in planned:
+                    planned.add(did)
+                    files.append(file)
+            plans.append(files)
+        n_files = sum(len(files) for files in plans)
+        print(f"Planned {n_files} unique forcing files for {len(new_events)} events")
+
+    records = {
+        event["name"]: {"status": "existing"}
+        for event in events
+        if event["name"] not in new_names
+    }
+    with ThreadPoolExecutor(max_workers=1) as executor:
+        futures = [
+            executor.submit(_prefetch_files, files, cache, max_workers)
+            for files in plans
+        ]
+        for i, event_dict in enumerate(new_events):
+            name = event_dict["name"]
+            record = {"status": "created"}
+            tic = time.perf_counter()
+            if futures:
+                try:
+                    record.update(futures[i].result())
+                except Exception as err:
+                    print(f"Prefetching forcing for event {name} failed: {err}")
+            record["wait_s"] = time.perf_counter() - tic
+            try:
+                event_new = create_event_config(database, event_dict)
+                _save_object(database, "event", event_new)
+            except Exception as err:
+                print(f"Creating event {name} failed: {err}")
+                record["status"] = "failed"
+            record["total_s"] = time.perf_counter() - tic
+            print(f"Event {name} {record['status']} in {record['total_s']:.1f} s")
+            records[name] = record
+    return pd.DataFrame.from_dict(records, orient="index")
+
+
+def _write_wflow_forcing(
+    ds: xr.Dataset,
+    event_folder: Path,
+    forcing: str,
+    dataset: str,
+    store: str,
+    encoding: str,
+):
+    """Write a Wflow forcing to the event folder as NetCDF or to its Zarr store."""
+    from DT_flood.utils.forcing.encoding import write_forcing
+    from DT_flood.utils.forcing.zarr_store import STORE_NAME, write_zarr_forcing
+
+    if store == "zarr":
+        write_zarr_forcing(
+            ds, event_folder / STORE_NAME, forcing=forcing, group=dataset
+        )
+    else:
+        write_forcing(ds, event_folder / f"{forcing}.nc", profile=encoding)
+
+
 def create_event_config(database: FloodAdapt, event_dict: dict):
     """Create FloodAdapt Event object from scenario configuration.
 
@@ -241,14 +673,25 @@ def create_event_config(database: FloodAdapt, event_dict: dict):
     NotImplementedError
         Only supports HistoricalNearshore event types
     """
-    forcing_vars = {
-        "meteo": ["precip", "wind10_u", "wind10_v", "press_msl"],
-        "wind": ["wind10_u", "wind10_v"],
-        "rainfall": ["precip"],
-        "waterlevel": ["waterlevel"],
-        "wflow": ["kin", "kout", "temp", "press_msl", "precip"],
-        "orography": ["elevtn"],
-    }
+    import pandas as pd
+    from flood_adapt.objects.forcing import rainfall, wind
+
+    from DT_flood.utils.data_utils import (
+        get_dataset_names,
+        get_gtsm_forcing_data,
+        get_planned_forcing_data,
+    )
+    from DT_flood.utils.forcing.archive import (
+        ARCHIVE_NAME,
+        add_to_archive,
+        get_missing_windows,
+        open_archive_window,
+    )
+    from DT_flood.utils.forcing.encoding import write_forcing
+    from DT_flood.utils.forcing.planner import ForcingRequest
+    from DT_flood.utils.site_geometry import get_sfincs_domain, get_wflow_domain
+
+    forcing_vars = FORCING_VARS
 
     units = database.database.site.gui.units
 
@@ -263,21 +706,17 @@ def create_event_config(database: FloodAdapt, event_dict: dict):
 
     sf_forcings = event_dict["sfincs_forcing"]
     wf_forcings = event_dict["wflow_forcing"]
+    encoding = event_dict.get("encoding")
+    store = event_dict.get("store", "netcdf")
+    if store not in ["netcdf", "zarr"]:
+        raise ValueError(f"Forcing store {store} not valid, choose 'netcdf' or 'zarr'")
+    warmup_archive = event_dict.get("warmup_archive", True)
+    refresh = event_dict.get("refresh", False)
 
-    sf_bounds = database.get_model_boundary().to_crs(4326).total_bounds
-    wf_bounds = (
-        gpd.read_file(
-            database.database.static_path
-            / "templates"
-            / "wflow"
-            / "staticgeoms"
-            / "region.geojson"
-        )
-        .to_crs(4326)
-        .total_bounds
-    )
+    sf_bounds = get_sfincs_domain(database).bounds
+    wf_bounds = get_wflow_domain(database).bounds
 
-    dataset_names = get_dataset_names()
+    dataset_names = get_dataset_names(refresh=refresh)
 
     event_folder = database.database.base_path / "input" / "events" / event_name
     if not event_folder.exists():
@@ -287,7 +726,11 @@ def create_event_config(database: FloodAdapt, event_dict: dict):
     if not data_folder.exists():
         data_folder.mkdir(parents=True)
 
+    archive = database.database.base_path / "data" / ARCHIVE_NAME
+    archived = {}
+
     forcings = {}
+    requests = []
 
     # Get SFINCS forcing data
     for forcing in sf_forcings:
@@ -306,24 +749,21 @@ def create_event_config(database: FloodAdapt, event_dict: dict):
                 end_date=end_time,
                 data_vars=forcing_vars[forcing],
                 bounds=sf_bounds,
+                refresh=refresh,
             )
-            ds.to_netcdf(event_folder / f"{forcing}.nc")
+            write_forcing(ds, event_folder / f"{forcing}.nc", profile=encoding)
             del ds
         else:
-            ds = get_event_forcing_data(
-                dataset=sf_forcings[forcing],
-                start_date=start_time,
-                end_date=end_time,
-                data_vars=forcing_vars[forcing],
-                bounds=sf_bounds,
+            requests.append(
+                ForcingRequest(
+                    name=f"sfincs_{forcing}",
+                    dataset=sf_forcings[forcing],
+                    data_vars=forcing_vars[forcing],
+                    start_date=start_time,
+                    end_date=end_time,
+                    bounds=sf_bounds,
+                )
             )
-            if "latitude" in ds.coords:
-                ds = ds.rename({"latitude": "lat"})
-            if "longitude" in ds.coords:
-                ds = ds.rename({"longitude": "lon"})
-
-            ds.to_netcdf(data_folder / f"{forcing}.nc")
-            del ds
 
     # Get WFlow forcing data
     for forcing in wf_forcings:
@@ -337,18 +777,70 @@ def create_event_config(database: FloodAdapt, event_dict: dict):
             if "orography" not in forcing
             else forcing_vars["orography"]
         )
-        ds = get_event_forcing_data(
-            dataset=wf_forcings[forcing],
-            start_date=start_warmup if "warmup" in forcing else start_time,
-            end_date=start_time if "warmup" in forcing else end_time,
-            data_vars=forcing_vars["wflow"]
-            if "orography" not in forcing
-            else forcing_vars["orography"],
+        if warmup_archive and "warmup" in forcing:
+            archived.setdefault(wf_forcings[forcing], []).append(forcing)
+            continue
+        requests.append(
+            ForcingRequest(
+                name=f"wflow_{forcing}",
+                dataset=wf_forcings[forcing],
+                data_vars=forcing_vars["wflow"]
+                if "orography" not in forcing
+                else forcing_vars["orography"],
+                start_date=start_warmup if "warmup" in forcing else start_time,
+                end_date=start_time if "warmup" in forcing else end_time,
+                bounds=wf_bounds,
+            )
+        )
+
+    # Only fetch the warm-up days missing from the site archive
+    for dataset in archived:
+        windows = get_missing_windows(
+            archive,
+            dataset=dataset,
+            start_date=start_warmup,
+            end_date=start_time,
             bounds=wf_bounds,
         )
-        ds.to_netcdf(event_folder / f"{forcing}.nc")
+        print(f"Fetching {len(windows)} missing warm-up windows of {dataset}")
+        for i, (start, end) in enumerate(windows):
+            requests.append(
+                ForcingRequest(
+                    name=f"archive_{dataset}_{i}",
+                    dataset=dataset,
+                    data_vars=forcing_vars["wflow"],
+                    start_date=start,
+                    end_date=end,
+                    bounds=wf_bounds,
+                )
+            )
+
+    # Download and read each file once for all gridded forcings
+    forcing_data = get_planned_forcing_data(requests, refresh=refresh)
+    for request in requests:
+        model, forcing = request.name.split("_", maxsplit=1)
+        ds = forcing_data.pop(request.name)
+        if model == "sfincs":
+            if "latitude" in ds.coords:
+                ds = ds.rename({"latitude": "lat"})
+            if "longitude" in ds.coords:
+                ds = ds.rename({"longitude": "lon"})
+            write_forcing(ds, data_folder / f"{forcing}.nc", profile=encoding)
+        elif model == "archive":
+            add_to_archive(ds, archive, dataset=request.dataset, bounds=wf_bounds)
+        else:
+            _write_wflow_forcing(
+                ds, event_folder, forcing, request.dataset, store, encoding
+            )
         del ds
 
+    # Slice the warm-up window from the archive
+    for dataset, forcing_list in archived.items():
+        ds = open_archive_window(archive, dataset, start_warmup, start_time)
+        for forcing in forcing_list:
+            _write_wflow_forcing(ds, event_folder, forcing, dataset, store, encoding)
+        ds.close()
+
     if (data_folder / "meteo.nc").exists():
         wind_forcing = wind.WindNetCDF(
             unit=units.default_velocity_units, path=data_folder / "meteo.nc"
@@ -406,11 +898,8 @@ def create_projection(
     IProjection
         FloodAdapt Projection object
     """
-    # Load existing projections
-    projections_existing = database.get_projections()
-
     # If necessary create new projection, save it and return object, otherwise load existing and return object
-    if name not in projections_existing["name"]:
+    if not object_exists(database, "projection", name):
         projection_new = create_projection_config(
             database,
             name=name,
@@ -419,7 +908,7 @@ def create_projection(
             population_growth=population_growth,
             economic_growth=economic_growth,
         )
-        database.save_projection(projection_new)
+        _save_object(database, "projection", projection_new)
         return projection_new
     else:
         return database.get_projection(name)
@@ -513,9 +1002,7 @@ def create_measure(
     _type_
         _description_
     """
-    measures_existing = database.get_measures()
-
-    if name not in measures_existing["name"]:
+    if not object_exists(database, "measure", name):
         # unpack selected geom singleton list
         # catch empty list (=no selection made)
         try:
@@ -530,7 +1017,7 @@ def create_measure(
             property_type=property_type,
             geom=geom,
         )
-        database.save_measure(measure_new)
+        _save_object(database, "measure", measure_new)
         return measure_new
     else:
         return database.get_measure(name)
@@ -581,6 +1068,8 @@ def create_measure_config(
     ValueError
         _description_
     """
+    import geojson
+
     aggregation_area_type = None
     aggregation_area_name = None
     if geom is None:
@@ -682,15 +1171,12 @@ def create_strategy(database: FloodAdapt, name: str, measure_list: list):
     IStrategy
         FloodAdapt Strategy object
     """
-    # Load existing strategies
-    strategies_existing = database.get_strategies()
-
     # If necessary create new strategy, save it and return object, otherwise load existing and return object
-    if name not in strategies_existing["name"]:
+    if not object_exists(database, "strategy", name):
         strategy_new = create_strategy_config(
             database=database, name=name, measure_list=measure_list
         )
-        database.save_strategy(strategy_new)
+        _save_object(database, "strategy", strategy_new)
         return strategy_new
     else:
         return database.get_strategy(name)
@@ -0,0 +1 @@
+"""Module with utilities for fetching and storing forcing data."""
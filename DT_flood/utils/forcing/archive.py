@@ -0,0 +1,200 @@
+"""Rolling site-level archive of Wflow warm-up forcing.
+
+Every event needs a year of daily forcing before its start to warm up Wflow, and
+events close in time share most of that year. The archive keeps the warm-up forcing
+of a site in a Zarr store, one group per dataset, covering one contiguous period.
+New events only fetch the days outside that period and slice their warm-up window
+from the archive.
+"""
+
+import os
+import shutil
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Union
+
+import numpy as np
+import pandas as pd
+import xarray as xr
+
+from DT_flood.utils.forcing.zarr_store import write_zarr_forcing
+
+ARCHIVE_NAME = "warmup_forcing.zarr"
+
+
+@contextmanager
+def _archive_lock(store: Union[str, os.PathLike]):
+    """Hold an exclusive lock on the archive across processes."""
+    lock_fn = Path(store).with_suffix(".lock")
+    lock_fn.parent.mkdir(parents=True, exist_ok=True)
+    with open(lock_fn, "a+b") as f:
+        if os.name == "nt":
+            import msvcrt
+
+            f.seek(0)
+            msvcrt.locking(f.fileno(), msvcrt.LK_LOCK, 1)
+            try:
+                yield
+            finally:
+                f.seek(0)
+                msvcrt.locking(f.fileno(), msvcrt.LK_UNLCK, 1)
+        else:
+            import fcntl
+
+            fcntl.flock(f, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(f, fcntl.LOCK_UN)
+
+
+def get_coverage(
+    store: Union[str, os.PathLike], dataset: str, bounds: list, update: bool = True
+) -> Union[tuple[pd.Timestamp, pd.Timestamp], None]:
+    """Get the period covered by a dataset in the archive.
+
+    Parameters
+    ----------
+    store : Union[str, os.PathLike]
+        Path of the archive.
+    dataset : str
+        Name of the dataset.
+    bounds : list
+        Bounding box the forcing is needed for. An archived dataset stored for
+        different bounds is removed, as it can not be extended.
+    update : bool, optional
+        If False leave a dataset that can not be extended in the archive, e.g. when
+        only planning downloads. The default is True.
+
+    Returns
+    -------
+    Union[tuple[pd.Timestamp, pd.Timestamp], None]
+        First and last archived time step, or None if the dataset is not archived.
+    """
+    group_dir = Path(store) / dataset
+    if not group_dir.exists():
+        return None
+    with xr.open_zarr(store, group=dataset) as ds:
+        archived_bounds = ds.attrs.get("bounds")
+        if archived_bounds is None or not np.allclose(archived_bounds, bounds):
+            coverage = None
+        else:
+            coverage = (
+                pd.Timestamp(ds["time"].values.min()),
+                pd.Timestamp(ds["time"].values.max()),
+            )
+    if coverage is None and update:
+        print(f"Bounds of archived {dataset} changed, removing it from the archive")
+        shutil.rmtree(group_dir)
+    return coverage
+
+
+def get_missing_windows(
+    store: Union[str, os.PathLike],
+    dataset: str,
+    start_date: str,
+    end_date: str,
+    bounds: list,
+    update: bool = True,
+) -> list[tuple[str, str]]:
+    """Get the time windows to fetch to cover a window with the archive.
+
+    The archive stays contiguous: missing windows reach up to the archived period.
+    If the requested window does not overlap or touch the archived period the
+    dataset is dropped from the archive and the full window is fetched.
+
+    Parameters
+    ----------
+    store : Union[str, os.PathLike]
+        Path of the archive.
+    dataset : str
+        Name of the dataset.
+    start_date : str
+        Start of the window.
+    end_date : str
+        End of the window (inclusive).
+    bounds : list
+        Bounding box the forcing is needed for.
+    update : bool, optional
+        If False leave a dataset that can not be extended in the archive, e.g. when
+        only planning downloads. The default is True.
+
+    Returns
+    -------
+    list[tuple[str, str]]
+        Start and end of the windows to fetch, empty if the window is archived.
+    """
+    start_date = pd.Timestamp(start_date)
+    end_date = pd.Timestamp(end_date)
+    coverage = get_coverage(store, dataset, bounds, update=update)
+    if coverage is not None and (
+        end_date < coverage[0] - pd.Timedelta(days=1)
+        or start_date > coverage[1] + pd.Timedelta(days=1)
+    ):
+        if update:
+            print(f"Window outside archived {dataset}, starting a new archive period")
+            shutil.rmtree(Path(store) / dataset)
+        coverage = None
+    if coverage is None:
+        windows = [(start_date, end_date)]
+    else:
+        windows = []
+        if start_date < coverage[0]:
+            windows.append((start_date, coverage[0]))
+        if end_date > coverage[1]:
+            windows.append((coverage[1], end_date))
+    return [
+        (start.strftime("%Y-%m-%d %H:%M:%S"), end.strftime("%Y-%m-%d %H:%M:%S"))
+        for start, end in windows
+    ]
+
+
+def add_to_archive(
+    ds: xr.Dataset, store: Union[str, os.PathLike], dataset: str, bounds: list
+):
+    """Add fetched forcing of a dataset to the archive.
+
+    The archive is locked while the dataset is extended, as events created in
+    other processes can add to it at the same time.
+
+    Parameters
+    ----------
+    ds : xr.Dataset
+        Fetched forcing.
+    store : Union[str, os.PathLike]
+        Path of the archive.
+    dataset : str
+        Name of the dataset.
+    bounds : list
+        Bounding box the forcing was fetched for.
+    """
+    ds = ds.assign_attrs(bounds=[float(b) for b in bounds])
+    with _archive_lock(store):
+        write_zarr_forcing(ds, store, forcing=dataset, group=dataset)
+
+
+def open_archive_window(
+    store: Union[str, os.PathLike], dataset: str, start_date: str, end_date: str
+) -> xr.Dataset:
+    """Lazily slice a time window of a dataset from the archive.
+
+    Parameters
+    ----------
+    store : Union[str, os.PathLike]
+        Path of the archive.
+    dataset : str
+        Name of the dataset.
+    start_date : str
+        Start of the window.
+    end_date : str
+        End of the window (inclusive).
+
+    Returns
+    -------
+    xr.Dataset
+        Dask-backed forcing in the window.
+    """
+    ds = xr.open_zarr(store, group=dataset)
+    ds = ds.sel(time=slice(start_date, end_date))
+    ds.attrs.pop("bounds", None)
+    return ds
@@ -0,0 +1,250 @@
+"""Persistent content-addressed cache for forcing files fetched from Rucio."""
+
+import hashlib
+import os
+import sqlite3
+import time
+import uuid
+from contextlib import contextmanager
+from pathlib import Path
+from shutil import copy2, move
+from typing import Union
+
+CACHE_DIR_ENV = "DT_FLOOD_CACHE_DIR"
+CACHE_SIZE_ENV = "DT_FLOOD_CACHE_SIZE_GB"
+
+DEFAULT_CACHE_DIR = Path.home() / ".cache" / "DT_flood" / "forcing"
+DEFAULT_CACHE_SIZE_GB = 50.0
+
+# Entries read less than this many seconds ago are never evicted, so a file handed
+# out to one process is not removed by another process filling the cache.
+EVICTION_GRACE_SECONDS = 60.0
+
+
+class ForcingCache:
+    """Content-addressed on-disk cache of Rucio files with an LRU size budget.
+
+    Files are keyed by their DID and checksum and stored under ``root/objects``.
+    The index, access times and hit/miss counters live in a SQLite database, which
+    makes the cache safe to share between processes.
+
+    Parameters
+    ----------
+    root : Union[str, os.PathLike]
+        Cache directory.
+    max_size_gb : float, optional
+        Size budget of the cache in GB. Least recently used files are evicted
+        when the budget is exceeded.
+    """
+
+    def __init__(
+        self,
+        root: Union[str, os.PathLike],
+        max_size_gb: float = DEFAULT_CACHE_SIZE_GB,
+    ):
+        self.root = Path(root)
+        self.max_size = int(max_size_gb * 1e9)
+        self.object_dir = self.root / "objects"
+        self.tmp_dir = self.root / "tmp"
+        self.object_dir.mkdir(parents=True, exist_ok=True)
+        self.tmp_dir.mkdir(parents=True, exist_ok=True)
+        self.db_path = self.root / "index.sqlite"
+        with self._connect() as con:
+            con.execute(
+                "CREATE TABLE IF NOT EXISTS entries ("
+                "key TEXT PRIMARY KEY, did TEXT, checksum TEXT, path TEXT, "
+                "size INTEGER, last_access REAL)"
+            )
+            con.execute(
+                "CREATE TABLE IF NOT EXISTS counters (name TEXT PRIMARY KEY, value INTEGER)"
+            )
+
+    @contextmanager
+    def _connect(self):
+        con = sqlite3.connect(self.db_path, timeout=60, isolation_level=None)
+        try:
+            con.execute("BEGIN IMMEDIATE")
+            yield con
+            con.execute("COMMIT")
+        except BaseException:
+            con.execute("ROLLBACK")
+            raise
+        finally:
+            con.close()
+
+    @staticmethod
+    def key(did: str, checksum: str = None) -> str:
+        """Return the cache key of a DID with a given checksum."""
+        return hashlib.sha256(f"{did}:{checksum or ''}".encode()).hexdigest()
+
+    @staticmethod
+    def _increment(con, name: str, value: int = 1):
+        con.execute(
+            "INSERT INTO counters (name, value) VALUES (?, ?) "
+            "ON CONFLICT(name) DO UPDATE SET value = value + excluded.value",
+            (name, value),
+        )
+
+    def get(self, did: str, checksum: str = None) -> Union[Path, None]:
+        """Look up a file in the cache.
+
+        Parameters
+        ----------
+        did : str
+            Rucio DID of the file, as ``scope:name``.
+        checksum : str, optional
+            Checksum of the file as reported by Rucio.
+
+        Returns
+        -------
+        Union[Path, None]
+            Path to the cached file, or None if the file is not cached.
+        """
+        key = self.key(did, checksum)
+        with self._connect() as con:
+            row = con.execute(
+                "SELECT path FROM entries WHERE key = ?", (key,)
+            ).fetchone()
+            if row is not None and (self.root / row[0]).exists():
+                con.execute(
+                    "UPDATE entries SET last_access = ? WHERE key = ?",
+                    (time.time(), key),
+                )
+                self._increment(con, "hits")
+                return self.root / row[0]
+            if row is not None:
+                con.execute("DELETE FROM entries WHERE key = ?", (key,))
+            self._increment(con, "misses")
+        return None
+
+    def contains(self, did: str, checksum: str = None) -> bool:
+        """Check whether a file is cached, without counting a hit or miss.
+
+        Unlike get, the access time of the file is not updated either, so checking
+        which files to download does not affect the statistics or evictions.
+        """
+        with self._connect() as con:
+            row = con.execute(
+                "SELECT path FROM entries WHERE key = ?", (self.key(did, checksum),)
+            ).fetchone()
+        return row is not None and (self.root / row[0]).exists()
+
+    def put(
+        self,
+        did: str,
+        file: Union[str, os.PathLike],
+        checksum: str = None,
+        keep_source: bool = False,
+    ) -> Path:
+        """Add a file to the cache.
+
+        Parameters
+        ----------
+        did : str
+            Rucio DID of the file, as ``scope:name``.
+        file : Union[str, os.PathLike]
+            Path to the downloaded file.
+        checksum : str, optional
+            Checksum of the file as reported by Rucio.
+        keep_source : bool, optional
+            If True copy the file into the cache, otherwise move it.
+
+        Returns
+        -------
+        Path
+            Path to the file in the cache.
+        """
+        file = Path(file)
+        key = self.key(did, checksum)
+        rel_path = Path("objects", key[:2], key, file.name)
+        target = self.root / rel_path
+        target.parent.mkdir(parents=True, exist_ok=True)
+
+        # Stage inside the cache folder so the final rename is atomic
+        tmp = self.tmp_dir / f"{key}.{uuid.uuid4().hex}.part"
+        if keep_source:
+            copy2(file, tmp)
+        else:
+            move(file, tmp)
+        os.replace(tmp, target)
+
+        size = target.stat().st_size
+        with self._connect() as con:
+            con.execute(
+                "INSERT OR REPLACE INTO entries VALUES (?, ?, ?, ?, ?, ?)",
+                (key, did, checksum, rel_path.as_posix(), size, time.time()),
+            )
+            self._increment(con, "bytes_added", size)
+            evicted = self._evict(con, keep=key)
+        for path in evicted:
+            self._remove(path)
+        return target
+
+    def _evict(self, con, keep: str = None) -> list[Path]:
+        (total,) = con.execute("SELECT COALESCE(SUM(size), 0) FROM entries").fetchone()
+        if total <= self.max_size:
+            return []
+        evicted = []
+        rows = con.execute(
+            "SELECT key, path, size FROM entries WHERE last_access < ? "
+            "ORDER BY last_access ASC",
+            (time.time() - EVICTION_GRACE_SECONDS,),
+        ).fetchall()
+        for key, path, size in rows:
+            if total <= self.max_size:
+                break
+            if key == keep:
+                continue
+            con.execute("DELETE FROM entries WHERE key = ?", (key,))
+            self._increment(con, "evictions")
+            evicted.append(self.root / path)
+            total -= size
+        return evicted
+
+    @staticmethod
+    def _remove(path: Path):
+        path.unlink(missing_ok=True)
+        try:
+            path.parent.rmdir()
+        except OSError:
+            pass
+
+    def stats(self) -> dict:
+        """Return cache counters and current size."""
+        with self._connect() as con:
+            stats = dict(con.execute("SELECT name, value FROM counters").fetchall())
+            n_files, size = con.execute(
+                "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM entries"
+            ).fetchone()
+        stats.update({"files": n_files, "size": size, "max_size": self.max_size})
+        for name in ["hits", "misses", "evictions", "bytes_added"]:
+            stats.setdefault(name, 0)
+        return stats
+
+    def clear(self):
+        """Remove all files from the cache and reset the counters."""
+        with self._connect() as con:
+            paths = [p for (p,) in con.execute("SELECT path FROM entries")]
+            con.execute("DELETE FROM entries")
+            con.execute("DELETE FROM counters")
+        for path in paths:
+            self._remove(self.root / path)
+
+
+def get_default_cache() -> Union[ForcingCache, None]:
+    """Get the forcing cache configured through environment variables.
+
+    The cache location is read from ``DT_FLOOD_CACHE_DIR`` and the size budget in GB
+    from ``DT_FLOOD_CACHE_SIZE_GB``. Setting ``DT_FLOOD_CACHE_DIR`` to an empty
+    string disables the cache.
+
+    Returns
+    -------
+    Union[ForcingCache, None]
+        The cache, or None if caching is disabled.
+    """
+    root = os.environ.get(CACHE_DIR_ENV, str(DEFAULT_CACHE_DIR))
+    if not root:
+        return None
+    max_size_gb = float(os.environ.get(CACHE_SIZE_ENV, DEFAULT_CACHE_SIZE_GB))
+    return ForcingCache(root=root, max_size_gb=max_size_gb)
@@ -0,0 +1,233 @@
+"""Locally cached catalogue of the datasets in a Rucio scope."""
+
+import json
+import os
+import time
+import uuid
+from contextlib import contextmanager
+from pathlib import Path
+
+from DT_flood.utils.forcing.clients import use_rucio_client
+from DT_flood.utils.forcing.manifest import get_manifest_dir
+
+CATALOGUE_TTL_ENV = "DT_FLOOD_CATALOGUE_TTL_HOURS"
+OFFLINE_ENV = "DT_FLOOD_OFFLINE"
+DEFAULT_CATALOGUE_TTL_HOURS = 24.0
+
+
+def is_offline() -> bool:
+    """Check whether remote Rucio calls are disabled through ``DT_FLOOD_OFFLINE``."""
+    return os.environ.get(OFFLINE_ENV, "").lower() in ["1", "true", "yes"]
+
+
+def _catalogue_fn(rucio_scope: str) -> Path:
+    return get_manifest_dir() / rucio_scope / "_catalogue.json"
+
+
+def _ttl_seconds(ttl_hours: float = None) -> float:
+    if ttl_hours is None:
+        ttl_hours = float(
+            os.environ.get(CATALOGUE_TTL_ENV, DEFAULT_CATALOGUE_TTL_HOURS)
+        )
+    return ttl_hours * 3600
+
+
+@contextmanager
+def _catalogue_lock(rucio_scope: str):
+    """Hold an exclusive lock on the stored catalogue of a scope across processes."""
+    lock_fn = _catalogue_fn(rucio_scope).with_suffix(".lock")
+    lock_fn.parent.mkdir(parents=True, exist_ok=True)
+    with open(lock_fn, "a+b") as f:
+        if os.name == "nt":
+            import msvcrt
+
+            f.seek(0)
+            msvcrt.locking(f.fileno(), msvcrt.LK_LOCK, 1)
+            try:
+                yield
+            finally:
+                f.seek(0)
+                msvcrt.locking(f.fileno(), msvcrt.LK_UNLCK, 1)
+        else:
+            import fcntl
+
+            fcntl.flock(f, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(f, fcntl.LOCK_UN)
+
+
+def _read_catalogue(rucio_scope: str) -> dict:
+    catalogue_fn = _catalogue_fn(rucio_scope)
+    if not catalogue_fn.exists():
+        return None
+    with open(catalogue_fn, "r") as f:
+        return json.load(f)
+
+
+def _write_catalogue(rucio_scope: str, catalogue: dict):
+    catalogue_fn = _catalogue_fn(rucio_scope)
+    catalogue_fn.parent.mkdir(parents=True, exist_ok=True)
+    tmp_fn = catalogue_fn.with_suffix(f".{uuid.uuid4().hex}.tmp")
+    with open(tmp_fn, "w") as f:
+        json.dump(catalogue, f, indent=1)
+    os.replace(tmp_fn, catalogue_fn)
+
+
+def load_catalogue(
+    rucio_scope: str = "wtromp",
+    rucio_client=None,
+    ttl_hours: float = None,
+    offline: bool = None,
+    refresh: bool = False,
+) -> dict:
+    """Load the catalogue of datasets in a Rucio scope.
+
+    The catalogue is listed from Rucio once and stored locally. It is only listed
+    again when it is older than the TTL or when refresh is True. Listing the
+    catalogue again also drops the stored file metadata.
+
+    Parameters
+    ----------
+    rucio_scope : str, optional
+        The Rucio scope to use. The default is 'wtromp'.
+    rucio_client : Client, optional
+        Rucio client. By default a client is borrowed from the shared pool when the
+        catalogue has to be listed.
+    ttl_hours : float, optional
+        Maximum age of the stored catalogue in hours. Defaults to the value of
+        ``DT_FLOOD_CATALOGUE_TTL_HOURS``, or 24 hours.
+    offline : bool, optional
+        If True never contact Rucio and use the stored catalogue regardless of its
+        age. Defaults to the value of ``DT_FLOOD_OFFLINE``.
+    refresh : bool, optional
+        If True list the catalogue again even when the stored one is fresh.
+
+    Returns
+    -------
+    dict
+        Dataset metadata (bytes, number of files) by dataset name.
+
+    Raises
+    ------
+    FileNotFoundError
+        If no catalogue is stored while running offline.
+    """
+    ttl = _ttl_seconds(ttl_hours)
+    if offline is None:
+        offline = is_offline()
+
+    catalogue = _read_catalogue(rucio_scope)
+    if offline:
+        if catalogue is None:
+            raise FileNotFoundError(
+                f"No dataset catalogue stored for scope {rucio_scope} in offline mode"
+            )
+        return catalogue["datasets"]
+    if (
+        catalogue is not None
+        and not refresh
+        and time.time() - catalogue["created"] < ttl
+    ):
+        return catalogue["datasets"]
+
+    print(f"Listing datasets in Rucio scope {rucio_scope}")
+    with use_rucio_client(rucio_client) as client:
+        dids = list(
+            client.list_dids(
+                scope=rucio_scope, filters={"name": "*"}, did_type="dataset", long=True
+            )
+        )
+    datasets = {}
+    for did in dids:
+        datasets[did["name"]] = {
+            "bytes": did.get("bytes"),
+            "length": did.get("length"),
+        }
+    with _catalogue_lock(rucio_scope):
+        _write_catalogue(
+            rucio_scope, {"created": time.time(), "datasets": datasets, "files": {}}
+        )
+    return datasets
+
+
+def get_file_metadata(
+    name: str,
+    rucio_scope: str = "wtromp",
+    rucio_client=None,
+    ttl_hours: float = None,
+    offline: bool = None,
+) -> dict:
+    """Get the metadata of a file in a Rucio scope, stored with the catalogue.
+
+    Stored metadata expires after the catalogue TTL and is removed together with
+    the catalogue.
+
+    Parameters
+    ----------
+    name : str
+        Name of the file.
+    rucio_scope : str, optional
+        The Rucio scope to use. The default is 'wtromp'.
+    rucio_client : Client, optional
+        Rucio client. By default a client is borrowed from the shared pool when the
+        metadata is not stored yet.
+    ttl_hours : float, optional
+        Maximum age of the stored metadata in hours. Defaults to the value of
+        ``DT_FLOOD_CATALOGUE_TTL_HOURS``, or 24 hours.
+    offline : bool, optional
+        If True never contact Rucio and use the stored metadata regardless of its
+        age. Defaults to the value of ``DT_FLOOD_OFFLINE``.
+
+    Returns
+    -------
+    dict
+        File metadata, with at least scope, name, bytes and adler32.
+    """
+    ttl = _ttl_seconds(ttl_hours)
+    if offline is None:
+        offline = is_offline()
+
+    catalogue = _read_catalogue(rucio_scope) or {}
+    stored = catalogue.get("files", {}).get(name)
+    if stored is not None and (offline or time.time() - stored.get("created", 0) < ttl):
+        return stored
+    if offline:
+        raise FileNotFoundError(
+            f"No metadata stored for {rucio_scope}:{name} in offline mode"
+        )
+
+    with use_rucio_client(rucio_client) as client:
+        meta = client.get_metadata(scope=rucio_scope, name=name)
+    stored = {
+        "scope": rucio_scope,
+        "name": name,
+        "bytes": meta.get("bytes"),
+        "adler32": meta.get("adler32"),
+        "md5": meta.get("md5"),
+        "created": time.time(),
+    }
+    # Read again under the lock, other processes may have added files meanwhile
+    with _catalogue_lock(rucio_scope):
+        catalogue = _read_catalogue(rucio_scope) or {"created": 0, "datasets": {}}
+        catalogue.setdefault("files", {})[name] = stored
+        _write_catalogue(rucio_scope, catalogue)
+    return stored
+
+
+def invalidate_catalogue(rucio_scope: str = "wtromp", manifests: bool = False):
+    """Remove the stored catalogue and file metadata of a Rucio scope.
+
+    Parameters
+    ----------
+    rucio_scope : str, optional
+        The Rucio scope to use. The default is 'wtromp'.
+    manifests : bool, optional
+        If True also remove the stored dataset manifests of the scope.
+    """
+    with _catalogue_lock(rucio_scope):
+        _catalogue_fn(rucio_scope).unlink(missing_ok=True)
+    if manifests:
+        for manifest_fn in (get_manifest_dir() / rucio_scope).glob("*.json"):
+            manifest_fn.unlink()
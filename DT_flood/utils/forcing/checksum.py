@@ -0,0 +1,76 @@
+"""Checksum verification of downloaded forcing files."""
+
+import hashlib
+import os
+import zlib
+from pathlib import Path
+from typing import Union
+
+BLOCK_SIZE = 2**24
+
+
+def file_checksums(
+    path: Union[str, os.PathLike], adler32: bool = True, md5: bool = False
+) -> dict:
+    """Compute the adler32 and/or md5 checksum of a file in a single pass.
+
+    Parameters
+    ----------
+    path : Union[str, os.PathLike]
+        Path to the file.
+    adler32 : bool, optional
+        If True compute the adler32 checksum. The default is True.
+    md5 : bool, optional
+        If True compute the md5 checksum. The default is False.
+
+    Returns
+    -------
+    dict
+        Checksums as lowercase hex strings, formatted as Rucio reports them.
+    """
+    adler_value = 1
+    md5_hash = hashlib.md5() if md5 else None
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(BLOCK_SIZE), b""):
+            if adler32:
+                adler_value = zlib.adler32(block, adler_value)
+            if md5_hash is not None:
+                md5_hash.update(block)
+    checksums = {}
+    if adler32:
+        checksums["adler32"] = f"{adler_value:08x}"
+    if md5_hash is not None:
+        checksums["md5"] = md5_hash.hexdigest()
+    return checksums
+
+
+def verify_file(path: Union[str, os.PathLike], meta: dict) -> bool:
+    """Check a file against the size and checksums in its Rucio metadata.
+
+    The size is compared first, so truncated files are rejected without reading
+    them. The adler32 checksum is preferred over md5 when both are known.
+
+    Parameters
+    ----------
+    path : Union[str, os.PathLike]
+        Path to the file.
+    meta : dict
+        File metadata with optional bytes, adler32 and md5 entries.
+
+    Returns
+    -------
+    bool
+        False if the file is missing or does not match its metadata.
+    """
+    path = Path(path)
+    if not path.is_file():
+        return False
+    if meta.get("bytes") is not None and path.stat().st_size != int(meta["bytes"]):
+        return False
+    if meta.get("adler32"):
+        checksum = file_checksums(path, adler32=True)["adler32"]
+        return checksum == meta["adler32"].lower().zfill(8)
+    if meta.get("md5"):
+        checksum = file_checksums(path, adler32=False, md5=True)["md5"]
+        return checksum == meta["md5"].lower()
+    return True
@@ -0,0 +1,111 @@
+"""Process-wide pools of Rucio clients.
+
+Creating a Rucio ``Client`` or ``DownloadClient`` parses the Rucio config and
+authenticates, so clients are kept in pools and reused across calls and threads.
+Every client is used by one thread at a time. The factories creating the clients
+can be replaced, e.g. by the local stand-ins in ``local_backend``::
+
+    set_rucio_backend(
+        client_factory=lambda: LocalRucioClient(root),
+        download_client_factory=lambda: LocalDownloadClient(root),
+    )
+"""
+
+import threading
+from contextlib import contextmanager
+from typing import Callable
+
+
+def _default_client():
+    from rucio.client import Client
+
+    return Client()
+
+
+def _default_download_client():
+    from rucio.client.downloadclient import DownloadClient
+
+    return DownloadClient(client=_default_client())
+
+
+class ClientPool:
+    """Thread-safe pool of reusable client objects.
+
+    Parameters
+    ----------
+    factory : Callable
+        Callable creating a new client.
+    max_idle : int, optional
+        Maximum number of idle clients kept for reuse.
+    """
+
+    def __init__(self, factory: Callable, max_idle: int = 8):
+        self.factory = factory
+        self.max_idle = max_idle
+        self._idle = []
+        self._lock = threading.Lock()
+        self.created = 0
+
+    @contextmanager
+    def borrow(self):
+        """Borrow a client from the pool, creating one if none is idle."""
+        with self._lock:
+            client = self._idle.pop() if self._idle else None
+        if client is None:
+            client = self.factory()
+            with self._lock:
+                self.created += 1
+        try:
+            yield client
+        finally:
+            with self._lock:
+                if len(self._idle) < self.max_idle:
+                    self._idle.append(client)
+
+    def clear(self, factory: Callable = None):
+        """Drop all idle clients, optionally replacing the factory."""
+        with self._lock:
+            self._idle = []
+            if factory is not None:
+                self.factory = factory
+
+
+rucio_pool = ClientPool(_default_client)
+download_pool = ClientPool(_default_download_client)
+
+
+def set_rucio_backend(
+    client_factory: Callable = None, download_client_factory: Callable = None
+):
+    """Replace the factories of the client pools.
+
+    Parameters
+    ----------
+    client_factory : Callable, optional
+        Callable creating a Rucio ``Client`` replacement. Defaults to ``Client``.
+    download_client_factory : Callable, optional
+        Callable creating a ``DownloadClient`` replacement. Defaults to
+        ``DownloadClient``.
+    """
+    rucio_pool.clear(factory=client_factory or _default_client)
+    download_pool.clear(factory=download_client_factory or _default_download_client)
+
+
+@contextmanager
+def use_rucio_client(client=None):
+    """Yield the given Rucio client, or borrow one from the pool if it is None."""
+    if client is not None:
+        yield client
+        return
+    with rucio_pool.borrow() as client:
+        yield client
+
+
+@contextmanager
+def use_download_client(client=None):
+    """Yield the given download client, or borrow one from the pool if it is None."""
+    if client is not None:
+        yield client
+        return
+    with download_pool.borrow() as client:
+        yield client
@@ -0,0 +1,121 @@
+"""Concurrent file downloads from Rucio."""
+
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Callable, Union
+
+from DT_flood.utils.forcing.checksum import verify_file
+from DT_flood.utils.forcing.clients import use_download_client
+
+
+@dataclass
+class DownloadResult:
+    """Outcome of downloading a single file."""
+
+    did: str
+    path: Path
+    size: int
+    seconds: float
+    attempts: int
+
+    @property
+    def throughput(self) -> float:
+        """Download throughput in MB/s."""
+        return self.size / 1e6 / max(self.seconds, 1e-6)
+
+
+def download_files(
+    dids: list[str],
+    download_client_factory: Callable = None,
+    base_dir: Union[str, os.PathLike] = ".",
+    max_workers: int = 4,
+    retries: int = 3,
+    metadata: dict[str, dict] = None,
+) -> list[DownloadResult]:
+    """Download files from Rucio with a bounded pool of workers.
+
+    Every download uses its own download client, either created per worker thread
+    by download_client_factory or borrowed from the shared pool. Failed downloads
+    are retried with an exponential backoff.
+
+    Files with known metadata are verified against their size and checksum in the
+    worker that downloaded them. A corrupt file is removed and downloaded again,
+    and a file left complete by an interrupted earlier run is kept.
+
+    Parameters
+    ----------
+    dids : list[str]
+        Rucio DIDs of the files to download, as ``scope:name``.
+    download_client_factory : Callable, optional
+        Callable returning a new Rucio ``DownloadClient`` or compatible object. By
+        default clients are borrowed from the pool in ``clients``.
+    base_dir : Union[str, os.PathLike], optional
+        Folder to download into. Files end up in ``base_dir/scope/name``.
+    max_workers : int, optional
+        Maximum number of concurrent downloads.
+    retries : int, optional
+        Number of retries per file after the first attempt fails.
+    metadata : dict[str, dict], optional
+        File metadata (bytes, adler32, md5) by DID, used to verify the files.
+
+    Returns
+    -------
+    list[DownloadResult]
+        Download results in the same order as dids.
+
+    Raises
+    ------
+    FileNotFoundError
+        If a file could not be downloaded, or failed verification, after all
+        retries.
+    """
+    base_dir = Path(base_dir)
+    local = threading.local()
+    metadata = metadata or {}
+
+    def _download(did: str) -> DownloadResult:
+        if download_client_factory is not None and not hasattr(local, "client"):
+            local.client = download_client_factory()
+        path = base_dir.joinpath(*did.split(":", maxsplit=1))
+        meta = metadata.get(did)
+        if path.exists():
+            if meta is not None and verify_file(path, meta):
+                print(f"Reusing verified file for {did}")
+                return DownloadResult(
+                    did=did, path=path, size=path.stat().st_size, seconds=0, attempts=0
+                )
+            # the download client skips existing files, so remove partial ones
+            path.unlink()
+        for attempt in range(1, retries + 2):
+            tic = time.perf_counter()
+            try:
+                with use_download_client(getattr(local, "client", None)) as client:
+                    client.download_dids([{"did": did, "base_dir": str(base_dir)}])
+            except Exception as err:
+                print(f"Download of {did} failed (attempt {attempt}): {err}")
+            if path.exists() and meta is not None and not verify_file(path, meta):
+                print(f"Checksum of {did} does not match (attempt {attempt})")
+                path.unlink()
+            if path.exists():
+                result = DownloadResult(
+                    did=did,
+                    path=path,
+                    size=path.stat().st_size,
+                    seconds=time.perf_counter() - tic,
+                    attempts=attempt,
+                )
+                print(
+                    f"Downloaded {did}: {result.size / 1e6:.1f} MB in "
+                    f"{result.seconds:.1f} s ({result.throughput:.1f} MB/s)"
+                )
+                return result
+            if attempt <= retries:
+                time.sleep(2 ** (attempt - 1))
+        raise FileNotFoundError(f"File {path} does not exist. Download failed.")
+
+    with ThreadPoolExecutor(max_workers=max(1, max_workers)) as pool:
+        return list(pool.map(_download, dids))
@@ -0,0 +1,185 @@
+"""Encoding profiles for writing event forcing to NetCDF."""
+
+import os
+import tempfile
+import time
+from pathlib import Path
+from typing import Union
+
+import numpy as np
+import pandas as pd
+import xarray as xr
+
+ENCODING_ENV = "DT_FLOOD_FORCING_ENCODING"
+DEFAULT_PROFILE = "zlib"
+TIME_CHUNK = 24
+
+# Per variable encoding of the floating point data variables for each profile
+PROFILES = {
+    "none": {},
+    "float32": {"dtype": "float32"},
+    "zlib": {"dtype": "float32", "zlib": True, "complevel": 4, "shuffle": True},
+    "zstd": {
+        "dtype": "float32",
+        "compression": "zstd",
+        "complevel": 4,
+        "shuffle": True,
+    },
+    "packed": {"dtype": "int16", "zlib": True, "complevel": 4, "shuffle": True},
+}
+
+
+def get_default_profile() -> str:
+    """Get the encoding profile set through ``DT_FLOOD_FORCING_ENCODING``."""
+    return os.environ.get(ENCODING_ENV, DEFAULT_PROFILE)
+
+
+def _packing(da: xr.DataArray) -> dict:
+    """Get int16 scale factor and offset covering the range of a variable."""
+    vmin = float(da.min()) if da.size else np.nan
+    vmax = float(da.max()) if da.size else np.nan
+    if not np.isfinite(vmin) or not np.isfinite(vmax):
+        vmin, vmax = 0.0, 0.0
+    scale = (vmax - vmin) / (2**16 - 2) if vmax > vmin else 1.0
+    return {
+        "scale_factor": scale,
+        "add_offset": (vmax + vmin) / 2,
+        "_FillValue": np.int16(-(2**15)),
+    }
+
+
+def get_encoding(ds: xr.Dataset, profile: str = None) -> dict:
+    """Get the NetCDF encoding of a forcing dataset for an encoding profile.
+
+    Floating point data variables get the compression and dtype of the profile
+    and, except for the 'none' profile, time-major chunks: a few time steps of
+    the full spatial domain per chunk, matching how the models read forcing.
+
+    Parameters
+    ----------
+    ds : xr.Dataset
+        Forcing dataset.
+    profile : str, optional
+        One of 'none', 'float32', 'zlib', 'zstd' or 'packed'. Defaults to the
+        profile set through ``DT_FLOOD_FORCING_ENCODING``, or 'zlib'.
+
+    Returns
+    -------
+    dict
+        Encoding per data variable, to pass to ``to_netcdf``.
+    """
+    if profile is None:
+        profile = get_default_profile()
+    if profile not in PROFILES:
+        raise ValueError(
+            f"Encoding profile {profile} not valid, choose from {list(PROFILES)}"
+        )
+
+    encoding = {}
+    if profile == "none":
+        return encoding
+    for name, da in ds.data_vars.items():
+        if not np.issubdtype(da.dtype, np.floating):
+            continue
+        var_encoding = dict(PROFILES[profile])
+        if profile == "packed":
+            var_encoding.update(_packing(da))
+        if da.ndim > 0 and profile != "float32":
+            var_encoding["chunksizes"] = tuple(
+                max(1, min(size, TIME_CHUNK) if dim == "time" else size)
+                for dim, size in da.sizes.items()
+            )
+        encoding[name] = var_encoding
+    return encoding
+
+
+def write_forcing(
+    ds: xr.Dataset, path: Union[str, os.PathLike], profile: str = None
+) -> Path:
+    """Write a forcing dataset to NetCDF with an encoding profile.
+
+    Parameters
+    ----------
+    ds : xr.Dataset
+        Forcing dataset.
+    path : Union[str, os.PathLike]
+        Output file.
+    profile : str, optional
+        Encoding profile, see get_encoding.
+
+    Returns
+    -------
+    Path
+        Path of the written file.
+    """
+    path = Path(path)
+    ds = ds.copy()
+    for da in ds.data_vars.values():
+        # drop encoding inherited from the source files
+        da.encoding = {}
+    ds.to_netcdf(path, encoding=get_encoding(ds, profile=profile))
+    return path
+
+
+def benchmark_encodings(
+    ds: xr.Dataset, profiles: list[str] = None, repeats: int = 3
+) -> pd.DataFrame:
+    """Compare file size and read speed of encoding profiles for a forcing dataset.
+
+    Two read patterns are timed: loading the full file, as the Wflow update
+    scripts do through hydromt, and reading one time step at a time over the first
+    day, as SFINCS meteo forcing is interpolated per time step.
+
+    Parameters
+    ----------
+    ds : xr.Dataset
+        Forcing dataset.
+    profiles : list[str], optional
+        Profiles to compare, by default all profiles.
+    repeats : int, optional
+        Number of repeats per timing, the fastest is reported.
+
+    Returns
+    -------
+    pd.DataFrame
+        File size in MB, write time and read times in seconds per profile.
+    """
+    if profiles is None:
+        profiles = list(PROFILES)
+    ds = ds.load()
+
+    records = []
+    with tempfile.TemporaryDirectory() as tmpdir:
+        for profile in profiles:
+            path = Path(tmpdir, f"{profile}.nc")
+            tic = time.perf_counter()
+            write_forcing(ds, path, profile=profile)
+            write_time = time.perf_counter() - tic
+
+            full_read = []
+            step_read = []
+            for _ in range(repeats):
+                tic = time.perf_counter()
+                with xr.open_dataset(path) as ds_read:
+                    ds_read.load()
+                full_read.append(time.perf_counter() - tic)
+
+                tic = time.perf_counter()
+                with xr.open_dataset(path) as ds_read:
+                    if "time" in ds_read.dims:
+                        for i in range(min(ds_read.sizes["time"], TIME_CHUNK)):
+                            ds_read.isel(time=i).load()
+                    else:
+                        ds_read.load()
+                step_read.append(time.perf_counter() - tic)
+
+            records.append(
+                {
+                    "profile": profile,
+                    "size_mb": path.stat().st_size / 1e6,
+                    "write_s": write_time,
+                    "read_full_s": min(full_read),
+                    "read_steps_s": min(step_read),
+                }
+            )
+    return pd.DataFrame.from_records(records, index="profile")
@@ -0,0 +1,96 @@
+"""Local stand-in for the Rucio clients, serving files from a folder.
+
+The folder is laid out as ``root/<scope>/<dataset>/<file>``. Files directly under
+``root/<scope>`` do not belong to a dataset but can still be downloaded.
+"""
+
+import os
+from pathlib import Path
+from shutil import copyfile
+from typing import Union
+
+from DT_flood.utils.forcing.checksum import file_checksums
+
+
+class LocalRucioClient:
+    """Replacement for ``rucio.client.Client`` backed by a local folder."""
+
+    def __init__(self, root: Union[str, os.PathLike]):
+        self.root = Path(root)
+
+    def _find(self, scope: str, name: str) -> Path:
+        candidates = [self.root / scope / name, *self.root.glob(f"{scope}/*/{name}")]
+        for path in candidates:
+            if path.is_file():
+                return path
+        raise FileNotFoundError(f"DID {scope}:{name} not found in {self.root}")
+
+    def list_dids(
+        self,
+        scope: str,
+        filters: dict = None,
+        did_type: str = "dataset",
+        long: bool = False,
+    ):
+        """List the datasets in a scope."""
+        for path in sorted((self.root / scope).iterdir()):
+            if not path.is_dir():
+                continue
+            if not long:
+                yield path.name
+                continue
+            files = [file for file in path.iterdir() if file.is_file()]
+            yield {
+                "scope": scope,
+                "name": path.name,
+                "did_type": "DATASET",
+                "bytes": sum(file.stat().st_size for file in files),
+                "length": len(files),
+            }
+
+    def get_metadata(self, scope: str, name: str) -> dict:
+        """Get size and checksums of a file."""
+        path = self._find(scope, name)
+        return {
+            "scope": scope,
+            "name": name,
+            "did_type": "FILE",
+            "bytes": path.stat().st_size,
+            **file_checksums(path, adler32=True, md5=True),
+        }
+
+    def list_content(self, scope: str, name: str):
+        """List the files in a dataset."""
+        for path in sorted((self.root / scope / name).iterdir()):
+            if path.is_file():
+                meta = self.get_metadata(scope, path.name)
+                yield {**meta, "type": "FILE"}
+
+    def list_replicas(self, dids: list[dict], schemes: list[str] = None):
+        """List the replicas of files, as ``file://`` URLs into the folder."""
+        for did in dids:
+            path = self._find(did["scope"], did["name"]).resolve()
+            yield {
+                "scope": did["scope"],
+                "name": did["name"],
+                "pfns": {path.as_uri(): {"type": "DISK", "rse": "LOCAL"}},
+                "rses": {"LOCAL": [path.as_uri()]},
+            }
+
+
+class LocalDownloadClient:
+    """Replacement for ``rucio.client.downloadclient.DownloadClient``."""
+
+    def __init__(self, root: Union[str, os.PathLike]):
+        self.client = LocalRucioClient(root)
+
+    def download_dids(self, items: list[dict]) -> list[dict]:
+        """Copy files to ``base_dir/scope/name``."""
+        results = []
+        for item in items:
+            scope, name = item["did"].split(":", maxsplit=1)
+            target = Path(item.get("base_dir", "."), scope, name)
+            target.parent.mkdir(parents=True, exist_ok=True)
+            copyfile(self.client._find(scope, name), target)
+            results.append({**item, "clientState": "DONE"})
+        return results
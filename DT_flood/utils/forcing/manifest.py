@@ -0,0 +1,227 @@
+"""Time-coverage manifests of Rucio datasets."""
+
+import json
+import os
+import re
+import uuid
+from pathlib import Path
+from typing import Union
+
+import pandas as pd
+
+from DT_flood.utils.forcing.clients import use_rucio_client
+
+MANIFEST_DIR_ENV = "DT_FLOOD_MANIFEST_DIR"
+DEFAULT_MANIFEST_DIR = Path.home() / ".cache" / "DT_flood" / "manifests"
+MANIFEST_VERSION = 1
+
+
+def get_manifest_dir() -> Path:
+    """Get the folder where dataset manifests are stored."""
+    return Path(os.environ.get(MANIFEST_DIR_ENV) or DEFAULT_MANIFEST_DIR)
+
+
+def parse_time_coverage(name: str) -> tuple[str, Union[str, None], Union[str, None]]:
+    """Parse variable and time coverage from a forcing file name.
+
+    Recognized time tokens are a four digit year followed by an optional month and
+    day (e.g. ``era5_precip_2020_1.nc``, ``gtsm_waterlevel_2020_01_31.nc``), or
+    the compact forms ``YYYYMM`` and ``YYYYMMDD``. The remaining tokens make up
+    the variable label.
+
+    Parameters
+    ----------
+    name : str
+        File name.
+
+    Returns
+    -------
+    tuple[str, Union[str, None], Union[str, None]]
+        Variable label, start and (exclusive) end of the covered period. Start and
+        end are None for files without a time dimension.
+    """
+    tokens = re.split(r"[_.\-]", Path(name).stem)
+    label, year, parts = [], None, []
+    for token in tokens:
+        if year is None and re.fullmatch(r"(18|19|20|21)\d{2}", token):
+            year = int(token)
+        elif year is None and re.fullmatch(r"(18|19|20|21)\d{4}(\d{2})?", token):
+            year = int(token[:4])
+            parts = [int(token[i : i + 2]) for i in range(4, len(token), 2)]
+        elif year is not None and re.fullmatch(r"\d{1,2}", token) and len(parts) < 2:
+            parts.append(int(token))
+        elif not re.fullmatch(r"\d{1,2}", token):
+            label.append(token)
+    label = "_".join(label)
+
+    if year is None:
+        return label, None, None
+    if len(parts) == 0:
+        start = pd.Timestamp(year=year, month=1, day=1)
+        end = start + pd.DateOffset(years=1)
+    elif len(parts) == 1:
+        start = pd.Timestamp(year=year, month=parts[0], day=1)
+        end = start + pd.DateOffset(months=1)
+    else:
+        start = pd.Timestamp(year=year, month=parts[0], day=parts[1])
+        end = start + pd.DateOffset(days=1)
+    return label, start.isoformat(), end.isoformat()
+
+
+def build_manifest(rucio_client, dataset: str, rucio_scope: str = "wtromp") -> dict:
+    """List a Rucio dataset and record the variable and time coverage of each file.
+
+    Parameters
+    ----------
+    rucio_client : Client
+        Rucio client.
+    dataset : str
+        Name of the dataset.
+    rucio_scope : str, optional
+        The Rucio scope to use. The default is 'wtromp'.
+
+    Returns
+    -------
+    dict
+        Manifest with one entry per file.
+    """
+    files = []
+    for file in rucio_client.list_content(scope=rucio_scope, name=dataset):
+        variable, start, end = parse_time_coverage(file["name"])
+        files.append(
+            {
+                "did": file["scope"] + ":" + file["name"],
+                "scope": file["scope"],
+                "name": file["name"],
+                "variable": variable,
+                "start": start,
+                "end": end,
+                "bytes": file.get("bytes"),
+                "adler32": file.get("adler32"),
+                "md5": file.get("md5"),
+            }
+        )
+    return {
+        "version": MANIFEST_VERSION,
+        "scope": rucio_scope,
+        "dataset": dataset,
+        "created": pd.Timestamp.now().isoformat(),
+        "files": files,
+    }
+
+
+def load_manifest(
+    rucio_client,
+    dataset: str,
+    rucio_scope: str = "wtromp",
+    refresh: bool = False,
+    manifest_dir: Union[str, os.PathLike] = None,
+    offline: bool = False,
+    end_date: str = None,
+) -> dict:
+    """Load the manifest of a dataset, building and storing it when missing.
+
+    A stored manifest is built again when it does not cover a requested window
+    ending after the latest time covered by its files, as new files may have been
+    added to the dataset since it was built.
+
+    Parameters
+    ----------
+    rucio_client : Client
+        Rucio client, only used when the manifest has to be built. If None a client
+        is borrowed from the shared pool.
+    dataset : str
+        Name of the dataset.
+    rucio_scope : str, optional
+        The Rucio scope to use. The default is 'wtromp'.
+    refresh : bool, optional
+        If True rebuild the manifest even if a stored one exists.
+    manifest_dir : Union[str, os.PathLike], optional
+        Folder with stored manifests. Defaults to get_manifest_dir().
+    offline : bool, optional
+        If True never build the manifest from Rucio, also when it does not cover
+        end_date.
+    end_date : str, optional
+        End of the requested time window (inclusive).
+
+    Returns
+    -------
+    dict
+        Dataset manifest.
+
+    Raises
+    ------
+    FileNotFoundError
+        If no manifest is stored while running offline.
+    """
+    manifest_dir = Path(manifest_dir) if manifest_dir else get_manifest_dir()
+    manifest_fn = manifest_dir / rucio_scope / f"{dataset}.json"
+
+    if manifest_fn.exists() and not refresh:
+        with open(manifest_fn, "r") as f:
+            manifest = json.load(f)
+        if manifest.get("version") == MANIFEST_VERSION and (
+            offline or end_date is None or _covers(manifest, end_date)
+        ):
+            return manifest
+    if offline:
+        raise FileNotFoundError(
+            f"No manifest stored for {rucio_scope}:{dataset} in offline mode"
+        )
+    print(f"Building manifest for dataset {rucio_scope}:{dataset}")
+    with use_rucio_client(rucio_client) as client:
+        manifest = build_manifest(client, dataset=dataset, rucio_scope=rucio_scope)
+    manifest_fn.parent.mkdir(parents=True, exist_ok=True)
+    tmp_fn = manifest_fn.with_suffix(f".{uuid.uuid4().hex}.tmp")
+    with open(tmp_fn, "w") as f:
+        json.dump(manifest, f, indent=1)
+    os.replace(tmp_fn, manifest_fn)
+    return manifest
+
+
+def _covers(manifest: dict, end_date: str) -> bool:
+    """Check whether the files of a manifest cover a time up to end_date."""
+    ends = [pd.Timestamp(file["end"]) for file in manifest["files"] if file["end"]]
+    # datasets without time coverage are complete
+    return not ends or pd.Timestamp(end_date) < max(ends)
+
+
+def _matches_variable(label: str, data_vars: list) -> bool:
+    return any(f"_{var}_" in f"_{label}_" for var in data_vars)
+
+
+def select_files(
+    manifest: dict, start_date: str, end_date: str, data_vars: list
+) -> list[dict]:
+    """Select the files in a manifest covering a time window.
+
+    Parameters
+    ----------
+    manifest : dict
+        Dataset manifest.
+    start_date : str
+        Start of the time window.
+    end_date : str
+        End of the time window (inclusive).
+    data_vars : list
+        Data variables to select.
+
+    Returns
+    -------
+    list[dict]
+        Manifest entries of files with a matching variable overlapping the window.
+        Files without time coverage are selected on variable only.
+    """
+    start_date = pd.to_datetime(start_date)
+    end_date = pd.to_datetime(end_date)
+    selected = []
+    for file in manifest["files"]:
+        if not _matches_variable(file["variable"], data_vars):
+            continue
+        if file["start"] is not None and not (
+            pd.Timestamp(file["start"]) <= end_date
+            and pd.Timestamp(file["end"]) > start_date
+        ):
+            continue
+        selected.append(file)
+    return selected
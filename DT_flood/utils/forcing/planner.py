@@ -0,0 +1,83 @@
+"""Planning of forcing downloads and reads shared by several forcings."""
+
+from dataclasses import dataclass, field
+
+import pandas as pd
+
+
+@dataclass
+class ForcingRequest:
+    """Forcing data needed for a single forcing file of an event."""
+
+    name: str
+    dataset: str
+    data_vars: list
+    start_date: str
+    end_date: str
+    bounds: list
+
+
+@dataclass
+class FileRead:
+    """Part of a file that has to be read to serve all requests using it."""
+
+    file: dict
+    start_date: pd.Timestamp
+    end_date: pd.Timestamp
+    bounds: list
+    requests: list = field(default_factory=list)
+
+    @property
+    def did(self) -> str:
+        """Rucio DID of the file."""
+        return self.file["scope"] + ":" + self.file["name"]
+
+
+def merge_bounds(bounds: list[list]) -> list:
+    """Get the bounding box enclosing all given bounding boxes."""
+    return [
+        min(b[0] for b in bounds),
+        min(b[1] for b in bounds),
+        max(b[2] for b in bounds),
+        max(b[3] for b in bounds),
+    ]
+
+
+def plan_reads(
+    requests: list[ForcingRequest], files: dict[str, list[dict]]
+) -> dict[str, FileRead]:
+    """Merge forcing requests into one read per unique file.
+
+    Parameters
+    ----------
+    requests : list[ForcingRequest]
+        Forcing requests of an event.
+    files : dict[str, list[dict]]
+        Files selected for each request, by request name.
+
+    Returns
+    -------
+    dict[str, FileRead]
+        Reads by file DID. Each read covers the union of the time windows and
+        bounding boxes of the requests using the file.
+    """
+    reads = {}
+    for request in requests:
+        start_date = pd.to_datetime(request.start_date)
+        end_date = pd.to_datetime(request.end_date)
+        for file in files[request.name]:
+            did = file["scope"] + ":" + file["name"]
+            if did not in reads:
+                reads[did] = FileRead(
+                    file=file,
+                    start_date=start_date,
+                    end_date=end_date,
+                    bounds=list(request.bounds),
+                )
+            else:
+                read = reads[did]
+                read.start_date = min(read.start_date, start_date)
+                read.end_date = max(read.end_date, end_date)
+                read.bounds = merge_bounds([read.bounds, request.bounds])
+            reads[did].requests.append(request.name)
+    return reads
@@ -0,0 +1,177 @@
+"""Kerchunk byte-range references for reading Rucio-hosted NetCDF files remotely.
+
+A reference maps every chunk of a NetCDF4/HDF5 file to a byte range in a replica
+of the file. Opened as a virtual Zarr store, only the chunks inside the requested
+bounding box and time window are read from the replica, instead of downloading
+the whole file. References are built once per file and stored next to the dataset
+manifests. Building them requires the optional ``kerchunk`` package.
+"""
+
+import json
+import os
+import uuid
+from pathlib import Path
+
+import fsspec
+import xarray as xr
+
+from DT_flood.utils.forcing.clients import use_rucio_client
+from DT_flood.utils.forcing.manifest import get_manifest_dir
+
+REPLICA_SCHEMES = ["https", "davs", "file"]
+INLINE_THRESHOLD = 300
+
+
+def get_reference_fn(file: dict) -> Path:
+    """Get the path of the stored reference of a file, keyed by its checksum."""
+    checksum = file.get("adler32") or file.get("md5") or "unknown"
+    return (
+        get_manifest_dir()
+        / file["scope"]
+        / "references"
+        / f"{file['name']}.{checksum}.json"
+    )
+
+
+def resolve_replica_url(
+    file: dict, rucio_client=None, schemes: list[str] = None
+) -> str:
+    """Get the URL of a replica of a file that can be read with byte ranges.
+
+    Parameters
+    ----------
+    file : dict
+        File description with scope and name.
+    rucio_client : Client, optional
+        Rucio client. By default a client is borrowed from the shared pool.
+    schemes : list[str], optional
+        Accepted replica schemes in order of preference. The default is https,
+        davs and file.
+
+    Returns
+    -------
+    str
+        Replica URL, with davs mapped to https.
+    """
+    if schemes is None:
+        schemes = REPLICA_SCHEMES
+    with use_rucio_client(rucio_client) as client:
+        replicas = list(
+            client.list_replicas(
+                [{"scope": file["scope"], "name": file["name"]}], schemes=schemes
+            )
+        )
+    pfns = [pfn for replica in replicas for pfn in replica.get("pfns", {})]
+    for scheme in schemes:
+        for pfn in pfns:
+            if pfn.startswith(f"{scheme}://"):
+                if scheme == "davs":
+                    pfn = "https://" + pfn[len("davs://") :]
+                return pfn
+    raise FileNotFoundError(
+        f"No replica of {file['scope']}:{file['name']} with schemes {schemes}"
+    )
+
+
+def build_reference(url: str, storage_options: dict = None) -> dict:
+    """Build the Kerchunk reference of a NetCDF4/HDF5 file.
+
+    Parameters
+    ----------
+    url : str
+        URL of the file.
+    storage_options : dict, optional
+        fsspec options to read the file, e.g. authentication headers.
+
+    Returns
+    -------
+    dict
+        Kerchunk reference.
+    """
+    try:
+        from kerchunk.hdf import SingleHdf5ToZarr
+    except ImportError:
+        raise ImportError("Building forcing references requires kerchunk")
+
+    with fsspec.open(url, "rb", **(storage_options or {})) as f:
+        return SingleHdf5ToZarr(f, url, inline_threshold=INLINE_THRESHOLD).translate()
+
+
+def load_reference(
+    file: dict,
+    rucio_client=None,
+    storage_options: dict = None,
+    refresh: bool = False,
+) -> dict:
+    """Load the reference of a file, building and storing it when missing.
+
+    Parameters
+    ----------
+    file : dict
+        File description with scope, name and checksum, as in dataset manifests.
+    rucio_client : Client, optional
+        Rucio client used to resolve the replica. By default a client is borrowed
+        from the shared pool.
+    storage_options : dict, optional
+        fsspec options to read the replica.
+    refresh : bool, optional
+        If True rebuild the reference even if a stored one exists.
+
+    Returns
+    -------
+    dict
+        Kerchunk reference.
+    """
+    reference_fn = get_reference_fn(file)
+    if reference_fn.exists() and not refresh:
+        with open(reference_fn, "r") as f:
+            return json.load(f)
+
+    url = resolve_replica_url(file, rucio_client=rucio_client)
+    print(f"Building reference for {file['scope']}:{file['name']}")
+    reference = build_reference(url, storage_options=storage_options)
+    reference_fn.parent.mkdir(parents=True, exist_ok=True)
+    tmp_fn = reference_fn.with_suffix(f".{uuid.uuid4().hex}.tmp")
+    with open(tmp_fn, "w") as f:
+        json.dump(reference, f)
+    os.replace(tmp_fn, reference_fn)
+    return reference
+
+
+def open_virtual_dataset(
+    file: dict, rucio_client=None, storage_options: dict = None
+) -> xr.Dataset:
+    """Lazily open a remote file through its reference as a virtual Zarr store.
+
+    Parameters
+    ----------
+    file : dict
+        File description with scope, name and checksum.
+    rucio_client : Client, optional
+        Rucio client used to resolve the replica when the reference is built.
+    storage_options : dict, optional
+        fsspec options to read the replica.
+
+    Returns
+    -------
+    xr.Dataset
+        Dask-backed dataset with the chunks of the original file.
+    """
+    reference = load_reference(
+        file, rucio_client=rucio_client, storage_options=storage_options
+    )
+    urls = [ref[0] for ref in reference["refs"].values() if isinstance(ref, list)]
+    protocol = fsspec.utils.get_protocol(urls[0]) if urls else "file"
+    return xr.open_dataset(
+        "reference://",
+        engine="zarr",
+        chunks={},
+        backend_kwargs={
+            "consolidated": False,
+            "storage_options": {
+                "fo": reference,
+                "remote_protocol": protocol,
+                "remote_options": storage_options or {},
+            },
+        },
+    )
@@ -0,0 +1,136 @@
+"""Spatial index of the stations of point (GeoDataset) forcing such as GTSM."""
+
+import os
+import threading
+from pathlib import Path
+from typing import Union
+
+import numpy as np
+import xarray as xr
+from scipy.spatial import cKDTree
+
+from DT_flood.utils.forcing.manifest import get_manifest_dir
+
+X_NAMES = ["station_x_coordinate", "lon", "longitude", "x"]
+Y_NAMES = ["station_y_coordinate", "lat", "latitude", "y"]
+
+_indexes = {}
+_lock = threading.Lock()
+
+
+def get_station_coords(ds: xr.Dataset) -> tuple[str, str, str]:
+    """Get the station dimension and x/y coordinate names of a point dataset.
+
+    Parameters
+    ----------
+    ds : xr.Dataset
+        Dataset with a station dimension and 1D x/y coordinates along it.
+
+    Returns
+    -------
+    tuple[str, str, str]
+        Name of the station dimension, x coordinate and y coordinate.
+    """
+    x_name = next((name for name in X_NAMES if name in ds.variables), None)
+    y_name = next((name for name in Y_NAMES if name in ds.variables), None)
+    if x_name is None or y_name is None or ds[x_name].ndim != 1:
+        raise ValueError("No 1D station x/y coordinates found in dataset")
+    return ds[x_name].dims[0], x_name, y_name
+
+
+class StationIndex:
+    """KD-tree over station coordinates.
+
+    Parameters
+    ----------
+    x : np.ndarray
+        Station x coordinates.
+    y : np.ndarray
+        Station y coordinates.
+    """
+
+    def __init__(self, x: np.ndarray, y: np.ndarray):
+        self.x = np.asarray(x, dtype=float)
+        self.y = np.asarray(y, dtype=float)
+        self.tree = cKDTree(np.column_stack([self.x, self.y]))
+
+    def __len__(self) -> int:
+        return self.x.size
+
+    @classmethod
+    def from_dataset(cls, ds: xr.Dataset) -> "StationIndex":
+        """Build the index from the station coordinates of a dataset."""
+        _, x_name, y_name = get_station_coords(ds)
+        return cls(ds[x_name].values, ds[y_name].values)
+
+    @classmethod
+    def load(cls, path: Union[str, os.PathLike]) -> "StationIndex":
+        """Load station coordinates stored with save."""
+        with np.load(path) as data:
+            return cls(data["x"], data["y"])
+
+    def save(self, path: Union[str, os.PathLike]):
+        """Store the station coordinates."""
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        np.savez(path, x=self.x, y=self.y)
+
+    def within(self, bounds: list, buffer: float = 0.0) -> np.ndarray:
+        """Get the sorted indices of stations inside a buffered bounding box."""
+        xmin, ymin, xmax, ymax = bounds
+        center = [(xmin + xmax) / 2, (ymin + ymax) / 2]
+        radius = np.hypot(xmax - xmin, ymax - ymin) / 2 + buffer * np.sqrt(2)
+        candidates = np.array(self.tree.query_ball_point(center, r=radius), dtype=int)
+        if candidates.size == 0:
+            return candidates
+        inside = (
+            (self.x[candidates] >= xmin - buffer)
+            & (self.x[candidates] <= xmax + buffer)
+            & (self.y[candidates] >= ymin - buffer)
+            & (self.y[candidates] <= ymax + buffer)
+        )
+        return np.sort(candidates[inside])
+
+    def nearest(self, points: np.ndarray, n: int = 1) -> np.ndarray:
+        """Get the sorted unique indices of the n nearest stations to each point."""
+        points = np.atleast_2d(np.asarray(points, dtype=float))
+        _, idx = self.tree.query(points, k=min(n, len(self)))
+        return np.unique(idx)
+
+
+def get_station_index(
+    dataset: str, ds: xr.Dataset, rucio_scope: str = "wtromp"
+) -> StationIndex:
+    """Get the station index of a dataset, building and storing it once.
+
+    The index is kept in memory and stored next to the dataset manifests. It is
+    rebuilt when the number of stations in ds does not match.
+
+    Parameters
+    ----------
+    dataset : str
+        Name of the dataset.
+    ds : xr.Dataset
+        A file of the dataset, used to build the index.
+    rucio_scope : str, optional
+        The Rucio scope to use. The default is 'wtromp'.
+
+    Returns
+    -------
+    StationIndex
+        Spatial index of the dataset stations.
+    """
+    station_dim, _, _ = get_station_coords(ds)
+    n_stations = ds.sizes[station_dim]
+    key = (rucio_scope, dataset)
+    index_fn = get_manifest_dir() / rucio_scope / f"{dataset}_stations.npz"
+    with _lock:
+        index = _indexes.get(key)
+        if index is None and index_fn.exists():
+            index = StationIndex.load(index_fn)
+        if index is None or len(index) != n_stations:
+            print(f"Building station index for dataset {rucio_scope}:{dataset}")
+            index = StationIndex.from_dataset(ds)
+            index.save(index_fn)
+        _indexes[key] = index
+    return index
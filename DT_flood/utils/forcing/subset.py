@@ -0,0 +1,131 @@
+"""Lazy spatial and temporal subsetting of gridded forcing files."""
+
+import os
+from typing import Union
+
+import numpy as np
+import xarray as xr
+
+DEFAULT_CHUNKS = {"time": 24 * 7}
+
+
+def _coord_slice(coord: xr.DataArray, vmin: float, vmax: float) -> slice:
+    """Get the index slice of a 1D coordinate covering [vmin, vmax] plus one cell."""
+    values = coord.values
+    if values.size < 2:
+        return slice(None)
+    delta = np.abs(np.diff(values)).min()
+    [inside] = np.nonzero((values >= vmin - delta) & (values <= vmax + delta))
+    if inside.size == 0:
+        return slice(0, 0)
+    return slice(int(inside.min()), int(inside.max()) + 1)
+
+
+def subset_dataset(
+    ds: xr.Dataset,
+    bounds: list = None,
+    start_date: str = None,
+    end_date: str = None,
+) -> xr.Dataset:
+    """Clip a gridded dataset to a bounding box and time window.
+
+    Selection is done by position, so it works for ascending and descending
+    coordinates and does not require sorting the full dataset first.
+
+    Parameters
+    ----------
+    ds : xr.Dataset
+        Dataset with ``latitude``/``longitude`` coordinates and optionally ``time``.
+    bounds : list, optional
+        Bounding box [xmin, ymin, xmax, ymax] in the dataset CRS.
+    start_date : str, optional
+        Start of the time window.
+    end_date : str, optional
+        End of the time window.
+
+    Returns
+    -------
+    xr.Dataset
+        Clipped dataset, extended by one grid cell around the bounding box.
+    """
+    if bounds is not None:
+        ds = ds.isel(
+            longitude=_coord_slice(ds["longitude"], bounds[0], bounds[2]),
+            latitude=_coord_slice(ds["latitude"], bounds[1], bounds[3]),
+        )
+    if "time" in ds.dims and ds.sizes["time"] > 1:
+        ds = ds.sel(time=slice(start_date, end_date))
+    return ds
+
+
+def open_subset(
+    files: list[Union[str, os.PathLike]],
+    bounds: list = None,
+    start_date: str = None,
+    end_date: str = None,
+    chunks: dict = None,
+) -> xr.Dataset:
+    """Open forcing files, clipping each one before combining them.
+
+    Every file is opened lazily and clipped on its own, so only the data inside the
+    bounding box and time window is ever read. The clipped datasets are chunked,
+    merged and sorted by latitude and longitude.
+
+    Parameters
+    ----------
+    files : list[Union[str, os.PathLike]]
+        Paths to the forcing files.
+    bounds : list, optional
+        Bounding box [xmin, ymin, xmax, ymax] in the dataset CRS.
+    start_date : str, optional
+        Start of the time window.
+    end_date : str, optional
+        End of the time window.
+    chunks : dict, optional
+        Dask chunks of the clipped data. Defaults to weekly chunks for hourly data
+        along time and a single chunk in space.
+
+    Returns
+    -------
+    xr.Dataset
+        Lazy dataset with the clipped forcing data.
+    """
+    datasets = []
+    for file in files:
+        ds = xr.open_dataset(file)
+        datasets.append(
+            subset_dataset(ds, bounds=bounds, start_date=start_date, end_date=end_date)
+        )
+    return combine_subsets(datasets, chunks=chunks)
+
+
+def combine_subsets(datasets: list[xr.Dataset], chunks: dict = None) -> xr.Dataset:
+    """Chunk and merge clipped datasets and sort them by latitude and longitude.
+
+    Parameters
+    ----------
+    datasets : list[xr.Dataset]
+        Clipped datasets, e.g. one per variable and month.
+    chunks : dict, optional
+        Dask chunks of the merged data. Defaults to weekly chunks for hourly data
+        along time and a single chunk in space.
+
+    Returns
+    -------
+    xr.Dataset
+        Merged dataset.
+    """
+    if chunks is None:
+        chunks = DEFAULT_CHUNKS
+
+    datasets = [
+        ds.chunk({dim: chunks.get(dim, -1) for dim in ds.dims}) for ds in datasets
+    ]
+    ds = xr.combine_nested(
+        datasets, concat_dim=None, compat="no_conflicts", join="outer"
+    )
+    if "longitude" in ds.dims:
+        ds = ds.sortby("longitude")
+    if "latitude" in ds.dims:
+        ds = ds.sortby("latitude")
+    return ds
@@ -0,0 +1,217 @@
+"""Zarr-backed store for Wflow forcing.
+
+Forcing datasets are stored as groups of a single Zarr store, one group per source
+dataset, so forcings read from the same dataset (e.g. warm-up precipitation and
+evaporation) share storage. Each forcing name maps to a group and time window in
+the ``forcings.json`` index next to the groups.
+"""
+
+import json
+import os
+import uuid
+from pathlib import Path
+from typing import Union
+
+import numpy as np
+import pandas as pd
+import xarray as xr
+
+from DT_flood.utils.forcing.encoding import TIME_CHUNK
+
+STORE_NAME = "forcing.zarr"
+INDEX_NAME = "forcings.json"
+
+
+def _read_index(store: Path) -> dict:
+    index_fn = store / INDEX_NAME
+    if not index_fn.exists():
+        return {}
+    with open(index_fn, "r") as f:
+        return json.load(f)
+
+
+def _write_index(store: Path, index: dict):
+    index_fn = store / INDEX_NAME
+    tmp_fn = index_fn.with_suffix(f".{uuid.uuid4().hex}.tmp")
+    with open(tmp_fn, "w") as f:
+        json.dump(index, f, indent=1)
+    os.replace(tmp_fn, index_fn)
+
+
+def _prepare(ds: xr.Dataset) -> xr.Dataset:
+    """Drop inherited encoding and chunk time-major over the full spatial domain."""
+    ds = ds.copy()
+    for var in ds.variables.values():
+        var.encoding = {}
+    return ds.chunk({dim: TIME_CHUNK if dim == "time" else -1 for dim in ds.dims})
+
+
+def _can_append(existing: xr.Dataset, ds: xr.Dataset) -> bool:
+    """Check whether ds only extends the time axis of the existing group."""
+    if "time" not in existing.dims or "time" not in ds.dims:
+        return False
+    if set(existing.data_vars) != set(ds.data_vars):
+        return False
+    for dim in ds.dims:
+        if dim == "time":
+            continue
+        if dim not in existing.dims or not np.array_equal(
+            existing[dim].values, ds[dim].values
+        ):
+            return False
+    return ds["time"].values.min() >= existing["time"].values.min()
+
+
+def write_zarr_forcing(
+    ds: xr.Dataset,
+    store: Union[str, os.PathLike],
+    forcing: str,
+    group: str,
+) -> Path:
+    """Write a forcing dataset to a group of a Zarr store.
+
+    If the group already holds the same variables on the same grid only the time
+    steps after its last time step are appended. Otherwise, e.g. when ds starts
+    before the group, the group is rewritten with the union of both.
+
+    Parameters
+    ----------
+    ds : xr.Dataset
+        Forcing dataset.
+    store : Union[str, os.PathLike]
+        Path of the Zarr store.
+    forcing : str
+        Name of the forcing, e.g. 'precip_warmup'.
+    group : str
+        Group to write to, typically the name of the source dataset.
+
+    Returns
+    -------
+    Path
+        Path of the Zarr store.
+    """
+    store = Path(store)
+    ds = _prepare(ds)
+
+    existing = None
+    if (store / group).exists():
+        existing = xr.open_zarr(store, group=group)
+
+    if existing is None or "time" not in ds.dims:
+        ds.to_zarr(store, group=group, mode="w")
+    elif _can_append(existing, ds):
+        new = ds.sel(time=ds["time"] > existing["time"].values.max())
+        if new.sizes["time"] > 0:
+            # fill the last partial chunk on disk first, so no Dask chunk writes
+            # to a Zarr chunk shared with another
+            nt = new.sizes["time"]
+            first = min(TIME_CHUNK - existing.sizes["time"] % TIME_CHUNK, nt)
+            time_chunks = (first,) + (TIME_CHUNK,) * ((nt - first) // TIME_CHUNK)
+            if sum(time_chunks) < nt:
+                time_chunks += (nt - sum(time_chunks),)
+            new = new.chunk({"time": time_chunks})
+            print(f"Appending {new.sizes['time']} time steps to {store.name}/{group}")
+            new.to_zarr(store, group=group, append_dim="time")
+    else:
+        merged = _prepare(ds.combine_first(existing).load())
+        existing.close()
+        merged.to_zarr(store, group=group, mode="w")
+
+    index = _read_index(store)
+    index[forcing] = {"group": group}
+    if "time" in ds.dims:
+        index[forcing]["start"] = pd.Timestamp(ds["time"].values.min()).isoformat()
+        index[forcing]["end"] = pd.Timestamp(ds["time"].values.max()).isoformat()
+    _write_index(store, index)
+    return store
+
+
+def list_zarr_forcings(store: Union[str, os.PathLike]) -> dict:
+    """List the forcings in a Zarr store with their group and time window."""
+    return _read_index(Path(store))
+
+
+def open_zarr_forcing(
+    store: Union[str, os.PathLike], forcing: str, chunks: dict = None
+) -> xr.Dataset:
+    """Lazily open a forcing from a Zarr store.
+
+    Parameters
+    ----------
+    store : Union[str, os.PathLike]
+        Path of the Zarr store.
+    forcing : str
+        Name of the forcing.
+    chunks : dict, optional
+        Dask chunks, by default the chunks on disk.
+
+    Returns
+    -------
+    xr.Dataset
+        Dask-backed forcing dataset, sliced to the time window of the forcing.
+    """
+    store = Path(store)
+    index = _read_index(store)
+    if forcing not in index:
+        raise KeyError(f"Forcing {forcing} not in Zarr store {store}")
+    entry = index[forcing]
+    ds = xr.open_zarr(store, group=entry["group"], chunks=chunks)
+    if "start" in entry and "time" in ds.dims:
+        ds = ds.sel(time=slice(entry["start"], entry["end"]))
+    return ds
+
+
+def get_forcing_sources(
+    event_dir: Union[str, os.PathLike], forcings: list[str], data_catalog=None
+) -> dict:
+    """Get hydromt data sources for the forcings of an event.
+
+    NetCDF forcing files in the event folder are returned as paths. Forcings in the
+    Zarr store of the event are added to data_catalog as zarr RasterDataset sources
+    named after the forcing, so hydromt ``setup_precip_forcing`` and
+    ``setup_temp_pet_forcing`` read them lazily and slice them to the model time.
+
+    Parameters
+    ----------
+    event_dir : Union[str, os.PathLike]
+        Event folder.
+    forcings : list[str]
+        Names of the forcings, e.g. ['precip_warmup', 'orography'].
+    data_catalog : hydromt.DataCatalog, optional
+        Data catalog of the model to add Zarr sources to. Required if any forcing
+        is only found in the Zarr store.
+
+    Returns
+    -------
+    dict
+        Path or data catalog source name per forcing.
+    """
+    event_dir = Path(event_dir)
+    store = event_dir / STORE_NAME
+    index = _read_index(store)
+
+    sources = {}
+    for forcing in forcings:
+        nc_fn = event_dir / f"{forcing}.nc"
+        if nc_fn.exists():
+            sources[forcing] = nc_fn.as_posix()
+        elif forcing in index:
+            if data_catalog is None:
+                raise ValueError(
+                    f"Forcing {forcing} is stored as Zarr, pass a data_catalog"
+                )
+            data_catalog.from_dict(
+                {
+                    forcing: {
+                        "path": store.as_posix(),
+                        "data_type": "RasterDataset",
+                        "driver": "zarr",
+                        "driver_kwargs": {"group": index[forcing]["group"]},
+                        "crs": 4326,
+                    }
+                }
+            )
+            sources[forcing] = forcing
+        else:
+            raise FileNotFoundError(f"No {forcing} forcing found in {event_dir}")
+    return sources
@@ -0,0 +1,153 @@
+"""Import-time budget check of the DT_flood entry points.
+
+Every workflow step starts a fresh Python process, so the time spent importing
+DT_flood modules is paid once per step. This module imports each entry point in
+a new interpreter, compares the import time to its budget and exits with a
+non-zero status when a budget is exceeded::
+
+    python -m DT_flood.utils.import_budget
+"""
+
+import argparse
+import subprocess
+import sys
+
+# Import-time budgets in seconds of the modules imported by workflow scripts and
+# notebooks
+IMPORT_BUDGETS = {
+    "DT_flood.utils.scenario_manifest": 0.2,
+    "DT_flood.utils.fa_scenario_utils": 0.2,
+    "DT_flood.utils.workflow_utils": 0.5,
+    "DT_flood.utils.plot_utils": 0.2,
+    "DT_flood.utils.data_utils": 3.0,
+    "DT_flood.utils.forcing.zarr_store": 3.0,
+}
+
+_TIMER = (
+    "import time; tic = time.perf_counter(); import {module}; "
+    "print(time.perf_counter() - tic)"
+)
+
+
+def measure_import_time(module: str, repeat: int = 3) -> float:
+    """Measure the time to import a module in a fresh interpreter.
+
+    Parameters
+    ----------
+    module : str
+        Name of the module.
+    repeat : int, optional
+        Number of measurements, of which the fastest is returned. The default
+        is 3.
+
+    Returns
+    -------
+    float
+        Import time in seconds.
+    """
+    times = []
+    for _ in range(repeat):
+        result = subprocess.run(
+            [sys.executable, "-c", _TIMER.format(module=module)],
+            capture_output=True,
+            text=True,
+        )
+        if result.returncode != 0:
+            raise ImportError(f"Importing {module} failed:\n{result.stderr}")
+        times.append(float(result.stdout.strip().splitlines()[-1]))
+    return min(times)
+
+
+def slowest_imports(module: str, n: int = 5) -> list[tuple[str, float]]:
+    """Get the packages with the largest cumulative import time under a module.
+
+    Parameters
+    ----------
+    module : str
+        Name of the module.
+    n : int, optional
+        Number of packages to return. The default is 5.
+
+    Returns
+    -------
+    list[tuple[str, float]]
+        Top-level package names, other than DT_flood, and their cumulative
+        import time in seconds. Packages imported by other packages are included,
+        so the times can overlap.
+    """
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        capture_output=True,
+        text=True,
+    )
+    packages = {}
+    for line in result.stderr.splitlines():
+        parts = line.split("|")
+        if len(parts) != 3 or not parts[1].strip().isdigit():
+            continue
+        name = parts[2].strip()
+        if "." in name or name.startswith("_") or name in ["DT_flood", "site"]:
+            continue
+        packages[name] = max(packages.get(name, 0), int(parts[1]) / 1e6)
+    return sorted(packages.items(), key=lambda item: item[1], reverse=True)[:n]
+
+
+def check_import_budgets(
+    budgets: dict[str, float] = None, repeat: int = 3, scale: float = 1.0
+) -> dict[str, dict]:
+    """Measure the import time of each entry point and compare it to its budget.
+
+    Parameters
+    ----------
+    budgets : dict[str, float], optional
+        Budgets in seconds per module. The default is IMPORT_BUDGETS.
+    repeat : int, optional
+        Number of measurements per module. The default is 3.
+    scale : float, optional
+        Factor applied to all budgets, e.g. for slow machines. The default is 1.
+
+    Returns
+    -------
+    dict[str, dict]
+        Per module the import time, the budget and whether it was exceeded.
+    """
+    if budgets is None:
+        budgets = IMPORT_BUDGETS
+    results = {}
+    for module, budget in budgets.items():
+        seconds = measure_import_time(module, repeat=repeat)
+        results[module] = {
+            "seconds": seconds,
+            "budget": budget * scale,
+            "over_budget": seconds > budget * scale,
+        }
+    return results
+
+
+def main(argv: list[str] = None) -> int:
+    """Print the import times of the entry points, returning 1 on an overrun."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--scale", type=float, default=1.0)
+    args = parser.parse_args(argv)
+
+    results = check_import_budgets(repeat=args.repeat, scale=args.scale)
+    width = max(len(module) for module in results)
+    print(f"{'module':<{width}}  {'import [s]':>10}  {'budget [s]':>10}")
+    for module, result in results.items():
+        flag = "  OVER BUDGET" if result["over_budget"] else ""
+        print(
+            f"{module:<{width}}  {result['seconds']:>10.3f}  "
+            f"{result['budget']:>10.3f}{flag}"
+        )
+
+    over = [module for module, result in results.items() if result["over_budget"]]
+    for module in over:
+        print(f"\nSlowest imports of {module}:")
+        for package, seconds in slowest_imports(module):
+            print(f"  {package:<30} {seconds:.3f} s")
+    return 1 if over else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
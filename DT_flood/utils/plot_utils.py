@@ -1,42 +1,8 @@
-"""Plot utility functions."""
-import leafmap.leafmap as leafmap
-import matplotlib as mpl
-import numpy as np
-import xarray as xr
-from ipyleaflet import (
-    ColormapControl,
-    DrawControl,
-    GeoData,
-    GeomanDrawControl,
-    LayersControl,
-    LegendControl,
-    WidgetControl,
-)
-from ipywidgets import Button, Image, Layout, ToggleButtons
-
-from DT_flood.utils.plotting.fiat import add_fiat_impact, list_agg_areas
-from DT_flood.utils.plotting.map_utils import get_layer_by_name, rm_layer_by_name
-from DT_flood.utils.plotting.ra2ce import (
-    add_ra2ce_network,
-    add_ra2ce_orig_dest,
-    add_ra2ce_orig_dest_legend,
-    button_rm_boxes,
-)
-from DT_flood.utils.plotting.sfincs import (
-    add_sfincs_bzs_points,
-    add_sfincs_dep_map,
-    add_sfincs_dis_points,
-    add_sfincs_legend,
-    add_sfincs_riv_map,
-    get_model_bounds,
-    get_sfincs_scenario_model,
-)
-from DT_flood.utils.plotting.wflow import (
-    add_wflow_elev_map,
-    add_wflow_gauges_map,
-    add_wflow_geoms_map,
-    get_wflow_scenario_model,
-)
+"""Plot utility functions.
+
+leafmap, ipyleaflet and the model plotting modules are slow to import and only
+needed in notebooks, so they are imported in the functions that draw the maps.
+"""
 
 
 def _handle_draw(target, action, geo_json, geometry):
@@ -64,8 +30,14 @@ def _handle_click(geometry, agg_area_name, **kwargs):
 
 def create_base_map(database):
     """Create base map layer in database region."""
-    [center] = database.get_model_boundary().dissolve().centroid.to_crs(4326)
-    center = [center.y, center.x]
+    import leafmap.leafmap as leafmap
+    from ipyleaflet import DrawControl
+    from ipywidgets import Layout
+
+    from DT_flood.utils.site_geometry import get_sfincs_domain
+
+    x, y = get_sfincs_domain(database).center
+    center = [y, x]
 
     layout = Layout(height="1200px")
 
@@ -80,6 +52,10 @@ def create_base_map(database):
 
 def draw_database_map(database, agg_area_name=None, **kwargs):
     """Draw interactive map at database location."""
+    from ipyleaflet import GeoData, GeomanDrawControl, LayersControl, LegendControl
+
+    from DT_flood.utils.plotting.sfincs import get_model_bounds
+
     selected_geometry = []
 
     def handle_draw(target, action, geo_json):
@@ -130,6 +106,17 @@ def draw_database_map(database, agg_area_name=None, **kwargs):
 
 def draw_scenario_sfincs(database, scenario, layer="dep"):
     """Plot the SFINCS output maps for a scenario."""
+    from ipyleaflet import LayersControl
+
+    from DT_flood.utils.plotting.sfincs import (
+        add_sfincs_bzs_points,
+        add_sfincs_dep_map,
+        add_sfincs_dis_points,
+        add_sfincs_legend,
+        add_sfincs_riv_map,
+        get_sfincs_scenario_model,
+    )
+
     if layer not in ["dep", "floodmap"]:
         raise ValueError("Select valid SFINCS map data layer")
 
@@ -157,6 +144,10 @@ def draw_scenario_sfincs(database, scenario, layer="dep"):
 
 def draw_scenario_fiat(database, scenario, agg_layer):
     """Plot the FIAT output maps for a scenario."""
+    from ipyleaflet import LayersControl
+
+    from DT_flood.utils.plotting.fiat import add_fiat_impact, list_agg_areas
+
     valid_aggs = ["building_footprints", *list_agg_areas(database)]
     if agg_layer not in valid_aggs:
         raise ValueError(f"{agg_layer} not among valid options {valid_aggs}")
@@ -172,6 +163,13 @@ def draw_scenario_fiat(database, scenario, agg_layer):
 
 def draw_scenario_ra2ce(database, scenario):
     """Plot RA2CE output map for a scenario."""
+    from DT_flood.utils.plotting.ra2ce import (
+        add_ra2ce_network,
+        add_ra2ce_orig_dest,
+        add_ra2ce_orig_dest_legend,
+        button_rm_boxes,
+    )
+
     map = create_base_map(database)
     map = add_floodmap(map, database, scenario)
 
@@ -184,6 +182,17 @@ def draw_scenario_ra2ce(database, scenario):
 
 def draw_scenario_wflow(database, scenario):
     """Plot WFLOW maps for a scenario."""
+    from ipyleaflet import ColormapControl, WidgetControl
+    from ipywidgets import Image, ToggleButtons
+
+    from DT_flood.utils.plotting.map_utils import rm_layer_by_name
+    from DT_flood.utils.plotting.wflow import (
+        add_wflow_elev_map,
+        add_wflow_gauges_map,
+        add_wflow_geoms_map,
+        get_wflow_scenario_model,
+    )
+
     map = create_base_map(database)
 
     toggle = ToggleButtons(options=["Warmup", "Event"])
@@ -224,6 +233,13 @@ def draw_scenario_wflow(database, scenario):
 
 def add_floodmap(map, database, scenario):
     """Add Floodmap layer to map."""
+    import matplotlib as mpl
+    import numpy as np
+    import xarray as xr
+    from ipyleaflet import LegendControl
+
+    from DT_flood.utils.plotting.map_utils import get_layer_by_name
+
     database = database.database
     flood_fn = (
         database.scenarios.output_path.joinpath(scenario)
@@ -278,6 +294,10 @@ def add_floodmap(map, database, scenario):
 
 def button_rm_plots(map):
     """Add button to map to remove plot box."""
+    from ipyleaflet import WidgetControl
+    from ipywidgets import Button, Image
+
+    from DT_flood.utils.plotting.map_utils import rm_layer_by_name
 
     def _rm_plot(button, **kwargs):
         controls = [
@@ -27,11 +27,12 @@ from DT_flood.utils.plotting.sfincs_styling import (
     geodata_dis_style_point,
     hover_style,
 )
+from DT_flood.utils.site_geometry import get_sfincs_domain
 
 
 def get_model_bounds(database):
     """Get SFINCS boundaries."""
-    return database.get_model_boundary().dissolve().to_crs(4326)
+    return get_sfincs_domain(database).boundary
 
 
 def get_sfincs_scenario_model(database, scenario):
@@ -0,0 +1,451 @@
+"""Content-addressed store of scenario results.
+
+Scenarios with different names can have identical inputs. The content hash of a
+scenario covers its resolved inputs: the event attributes and forcing files, the
+projection values, the measure definitions and geometries, and the parts of the
+static folder read by the model steps (STEP_READS of the step cache), such as the
+model templates, the DEM and the site configuration. Scenario names are not part of it. After a run the results are added
+to the store under their content hash as hard links, so a later scenario with
+the same hash can link to them instead of running the models again.
+
+The hazard store works the same way for the Flooding folder, keyed on the
+inputs of the hazard models only. Scenarios that only differ in impact measures
+share their flood hazard and only run the impact models.
+
+Files in the store share their data with the scenario output folders, so output
+files should be replaced rather than modified in place.
+"""
+
+import hashlib
+import json
+import os
+import re
+import shutil
+import threading
+import uuid
+from datetime import datetime
+from pathlib import Path
+from typing import Union
+
+from DT_flood.utils.forcing.checksum import file_checksums
+from DT_flood.utils.scenario_manifest import MANIFEST_NAME, write_scenario_manifest
+
+STORE_NAME = "results_store"
+HAZARD_STORE_NAME = "hazard_store"
+ENTRY_NAME = "entry.json"
+DIGESTS_NAME = "file_digests.json"
+HASH_VERSION = 2
+# Measures that only change the impact models, not the hazard
+IMPACT_MEASURE_TYPES = [
+    "elevate_properties",
+    "floodproof_properties",
+    "buyout_properties",
+]
+IMPACT_TEMPLATES = ["fiat", "ra2ce"]
+
+_digests = {}
+_lock = threading.Lock()
+
+
+def get_results_store(database) -> Path:
+    """Get the results store folder of a database."""
+    return Path(database.database.output_path) / STORE_NAME
+
+
+def load_file_digests(store: Path) -> dict:
+    """Load the file digests stored in a folder, once per process."""
+    with _lock:
+        if store not in _digests:
+            digests = {}
+            if (store / DIGESTS_NAME).exists():
+                with open(store / DIGESTS_NAME, "r") as f:
+                    digests = json.load(f)
+            _digests[store] = digests
+        return _digests[store]
+
+
+def save_file_digests(store: Path):
+    """Store the file digests of a folder, see load_file_digests."""
+    store.mkdir(parents=True, exist_ok=True)
+    tmp_fn = store / f"{DIGESTS_NAME}.{uuid.uuid4().hex}.tmp"
+    with _lock:
+        with open(tmp_fn, "w") as f:
+            json.dump(_digests[store], f)
+    os.replace(tmp_fn, store / DIGESTS_NAME)
+
+
+def folder_digest(folder: Path, digests: dict, exclude: list[str] = None) -> dict:
+    """Get the adler32 checksums of the files in a folder, by relative path.
+
+    Checksums are reused while the modification time and size of a file are
+    unchanged.
+    """
+    exclude = exclude or []
+    result = {}
+    if not folder.exists():
+        return result
+    for path in sorted(p for p in folder.rglob("*") if p.is_file()):
+        rel = path.relative_to(folder).as_posix()
+        if rel in exclude:
+            continue
+        stat = path.stat()
+        key = os.fspath(path.resolve())
+        signature = [stat.st_mtime_ns, stat.st_size]
+        entry = digests.get(key)
+        if entry is None or entry[:2] != signature:
+            entry = [*signature, file_checksums(path)["adler32"]]
+            digests[key] = entry
+        result[rel] = f"{entry[1]}:{entry[2]}"
+    return result
+
+
+def _attrs(obj) -> dict:
+    """Dump the attributes of a FloodAdapt object, without name and description."""
+    attrs = obj.model_dump(mode="json")
+    attrs.pop("name", None)
+    attrs.pop("description", None)
+    return attrs
+
+
+def _object_inputs(db, object_type: str, name: str, digests: dict) -> dict:
+    """Get the attributes and input files of a stored FloodAdapt object."""
+    objects = {
+        "event": db.events,
+        "projection": db.projections,
+        "measure": db.measures,
+    }[object_type]
+    folder = Path(db.input_path) / f"{object_type}s" / name
+    return {
+        "attrs": _attrs(objects.get(name)),
+        "files": folder_digest(folder, digests, exclude=[f"{name}.toml"]),
+    }
+
+
+def _static_inputs(db, digests: dict, hazard: bool = False) -> dict:
+    """Get the input files of the static folders read by the model steps.
+
+    The folders follow STEP_READS of the step cache. With hazard, only the folders
+    of the hazard steps are included, without the impact model templates.
+    """
+    # Imported here, the step cache builds on this module
+    from DT_flood.utils.step_cache import HAZARD_STEPS, static_reads
+
+    static = Path(db.static_path)
+    folders = []
+    for folder in static_reads(HAZARD_STEPS if hazard else None):
+        if folder == "templates" and hazard:
+            folders += [
+                f"templates/{path.name}"
+                for path in sorted((static / "templates").glob("*"))
+                if path.name not in IMPACT_TEMPLATES
+            ]
+        else:
+            folders.append(folder)
+    return {folder: folder_digest(static / folder, digests) for folder in folders}
+
+
+def _hash(inputs: dict) -> str:
+    """Hash a JSON-serializable dict of inputs."""
+    content = json.dumps(inputs, sort_keys=True, default=str)
+    return hashlib.sha256(content.encode()).hexdigest()
+
+
+def scenario_inputs(database, scenario) -> dict:
+    """Collect the resolved inputs of a scenario that determine its results.
+
+    Parameters
+    ----------
+    database : FloodAdapt
+        FloodAdapt object of the database.
+    scenario : Scenario
+        FloodAdapt scenario.
+
+    Returns
+    -------
+    dict
+        Event, projection and measure attributes with the checksums of their
+        input files, and the checksums of the static files read by the models.
+    """
+    db = database.database
+    store = get_results_store(database)
+    digests = load_file_digests(store)
+    strategy = db.strategies.get(scenario.strategy)
+    inputs = {
+        "version": HASH_VERSION,
+        "event": _object_inputs(db, "event", scenario.event, digests),
+        "projection": _object_inputs(db, "projection", scenario.projection, digests),
+        "measures": [
+            _object_inputs(db, "measure", measure, digests)
+            for measure in strategy.measures
+        ],
+        "static": _static_inputs(db, digests),
+    }
+    save_file_digests(store)
+    return inputs
+
+
+def scenario_content_hash(database, scenario) -> str:
+    """Get the content hash of a scenario, see scenario_inputs."""
+    return _hash(scenario_inputs(database, scenario))
+
+
+def _is_hazard_measure(measure) -> bool:
+    measure_type = getattr(measure.type, "value", measure.type)
+    return measure_type not in IMPACT_MEASURE_TYPES
+
+
+def hazard_inputs(database, scenario) -> dict:
+    """Collect the resolved inputs of a scenario that determine its flood hazard.
+
+    Impact measures and the FIAT and RA2CE templates are left out, so scenarios
+    that only differ in these share their Wflow and SFINCS results.
+
+    Parameters
+    ----------
+    database : FloodAdapt
+        FloodAdapt object of the database.
+    scenario : Scenario
+        FloodAdapt scenario.
+
+    Returns
+    -------
+    dict
+        Event, projection and hazard measure attributes with the checksums of
+        their input files, and the checksums of the static files read by the
+        hazard models.
+    """
+    db = database.database
+    store = get_results_store(database)
+    digests = load_file_digests(store)
+    strategy = db.strategies.get(scenario.strategy)
+    inputs = {
+        "version": HASH_VERSION,
+        "event": _object_inputs(db, "event", scenario.event, digests),
+        "projection": _object_inputs(db, "projection", scenario.projection, digests),
+        "measures": [
+            _object_inputs(db, "measure", measure, digests)
+            for measure in strategy.measures
+            if _is_hazard_measure(db.measures.get(measure))
+        ],
+        "static": _static_inputs(db, digests, hazard=True),
+    }
+    save_file_digests(store)
+    return inputs
+
+
+def scenario_hazard_key(database, scenario) -> str:
+    """Get the hazard key of a scenario, see hazard_inputs."""
+    return _hash(hazard_inputs(database, scenario))
+
+
+def link_or_copy(src: str, dst: str):
+    """Hard link a file, copying it when linking is not possible."""
+    try:
+        os.link(src, dst)
+    except OSError:
+        shutil.copy2(src, dst)
+
+
+def rename_scenario(name: str, old: str, new: str) -> str:
+    """Replace a scenario name in a file name generated for that scenario.
+
+    Only whole name tokens are replaced: the old name has to start the file name
+    or follow an underscore, and end it or precede an underscore or the
+    extension. E.g. with old name 'a', 'Impacts_detailed_a.csv' and
+    'a_metrics.html' are renamed, 'Impacts_detailed_b.csv' is not.
+    """
+    pattern = rf"(?:(?<=_)|^){re.escape(old)}(?=[_.]|$)"
+    return re.sub(pattern, lambda _: new, name)
+
+
+def link_tree(src: Path, dst: Path, rename: tuple[str, str] = None, skip=()):
+    """Hard link the files of a folder to another folder.
+
+    Parameters
+    ----------
+    src : Path
+        Source folder.
+    dst : Path
+        Destination folder, created if missing.
+    rename : tuple[str, str], optional
+        Old and new scenario name in file and folder names, see rename_scenario.
+    skip : list[str], optional
+        Names of files in the top folder to skip.
+    """
+    for path in sorted(src.rglob("*")):
+        rel = path.relative_to(src)
+        if len(rel.parts) == 1 and rel.name in skip:
+            continue
+        if rename is not None:
+            rel = Path(*[rename_scenario(part, *rename) for part in rel.parts])
+        target = dst / rel
+        if path.is_dir():
+            target.mkdir(parents=True, exist_ok=True)
+        else:
+            target.parent.mkdir(parents=True, exist_ok=True)
+            if target.exists():
+                target.unlink()
+            link_or_copy(path, target)
+
+
+def get_stored_results(database, content_hash: str) -> Union[Path, None]:
+    """Get the stored results of a content hash, or None if there are none."""
+    entry = get_results_store(database) / content_hash
+    if (entry / ENTRY_NAME).exists():
+        return entry
+    return None
+
+
+def store_results(database, scenario, content_hash: str = None) -> Path:
+    """Add the results of a finished scenario to the results store.
+
+    Parameters
+    ----------
+    database : FloodAdapt
+        FloodAdapt object of the database.
+    scenario : Scenario
+        FloodAdapt scenario with results in the scenario output folder.
+    content_hash : str, optional
+        Content hash of the scenario. By default it is computed.
+
+    Returns
+    -------
+    Path
+        Folder of the stored results.
+    """
+    if content_hash is None:
+        content_hash = scenario_content_hash(database, scenario)
+    existing = get_stored_results(database, content_hash)
+    if existing is not None:
+        return existing
+
+    results_path = database.database.scenarios.output_path.joinpath(scenario.name)
+    entry = get_results_store(database) / content_hash
+    _add_entry(entry, results_path, scenario.name, skip=[MANIFEST_NAME])
+    print(f"Stored results of scenario {scenario.name} as {content_hash}")
+    return entry
+
+
+def _add_entry(entry: Path, src: Path, scenario_name: str, skip=()):
+    """Hard link a folder of scenario results into a store entry."""
+    tmp_entry = entry.with_name(f"{entry.name}.{uuid.uuid4().hex}.tmp")
+    link_tree(src, tmp_entry / "results", skip=skip)
+    with open(tmp_entry / ENTRY_NAME, "w") as f:
+        json.dump(
+            {
+                "scenario": scenario_name,
+                "key": entry.name,
+                "created": datetime.now().isoformat(),
+            },
+            f,
+            indent=1,
+        )
+    try:
+        os.rename(tmp_entry, entry)
+    except OSError:
+        # Stored concurrently by another run
+        shutil.rmtree(tmp_entry)
+
+
+def link_results(database, scenario, content_hash: str = None) -> bool:
+    """Link stored results with the same content hash to a scenario.
+
+    Parameters
+    ----------
+    database : FloodAdapt
+        FloodAdapt object of the database.
+    scenario : Scenario
+        FloodAdapt scenario.
+    content_hash : str, optional
+        Content hash of the scenario. By default it is computed.
+
+    Returns
+    -------
+    bool
+        True if stored results were linked to the scenario output folder.
+    """
+    if content_hash is None:
+        content_hash = scenario_content_hash(database, scenario)
+    entry = get_stored_results(database, content_hash)
+    if entry is None:
+        return False
+
+    with open(entry / ENTRY_NAME, "r") as f:
+        source = json.load(f)["scenario"]
+    results_path = database.database.scenarios.output_path.joinpath(scenario.name)
+    if results_path.exists():
+        shutil.rmtree(results_path)
+    print(f"Linking results of scenario {source} to scenario {scenario.name}")
+    link_tree(entry / "results", results_path, rename=(source, scenario.name))
+    write_scenario_manifest(database, scenario, results_path)
+    return True
+
+
+def store_hazard(database, scenario, hazard_key: str = None) -> Path:
+    """Add the flood hazard results of a finished scenario to the hazard store.
+
+    Parameters
+    ----------
+    database : FloodAdapt
+        FloodAdapt object of the database.
+    scenario : Scenario
+        FloodAdapt scenario with a Flooding folder in the scenario output folder.
+    hazard_key : str, optional
+        Hazard key of the scenario. By default it is computed.
+
+    Returns
+    -------
+    Path
+        Folder of the stored hazard results.
+    """
+    if hazard_key is None:
+        hazard_key = scenario_hazard_key(database, scenario)
+    entry = Path(database.database.output_path) / HAZARD_STORE_NAME / hazard_key
+    if not (entry / ENTRY_NAME).exists():
+        results_path = database.database.scenarios.output_path.joinpath(scenario.name)
+        _add_entry(entry, results_path / "Flooding", scenario.name)
+        print(f"Stored hazard of scenario {scenario.name} as {hazard_key}")
+    return entry
+
+
+def link_hazard(
+    database, scenario, target: Union[str, os.PathLike], hazard_key: str = None
+) -> Union[dict, None]:
+    """Link stored flood hazard results with the same hazard key to a folder.
+
+    Parameters
+    ----------
+    database : FloodAdapt
+        FloodAdapt object of the database.
+    scenario : Scenario
+        FloodAdapt scenario.
+    target : Union[str, os.PathLike]
+        Folder to link the Flooding folder of the stored results to. File names
+        are renamed to the scenario.
+    hazard_key : str, optional
+        Hazard key of the scenario. By default it is computed.
+
+    Returns
+    -------
+    Union[dict, None]
+        Paths of the linked 'flooding_dir', 'floodmap' and 'waterlevel_map', or
+        None if no hazard results with this key are stored.
+    """
+    if hazard_key is None:
+        hazard_key = scenario_hazard_key(database, scenario)
+    entry = Path(database.database.output_path) / HAZARD_STORE_NAME / hazard_key
+    if not (entry / ENTRY_NAME).exists():
+        return None
+
+    with open(entry / ENTRY_NAME, "r") as f:
+        source = json.load(f)["scenario"]
+    flooding_dir = Path(target) / "Flooding"
+    if flooding_dir.exists():
+        shutil.rmtree(flooding_dir)
+    print(f"Linking hazard of scenario {source} to scenario {scenario.name}")
+    link_tree(entry / "results", flooding_dir, rename=(source, scenario.name))
+    return {
+        "flooding_dir": flooding_dir,
+        "floodmap": flooding_dir / f"FloodMap_{scenario.name}.tif",
+        "waterlevel_map": flooding_dir / "max_water_level_map.nc",
+    }
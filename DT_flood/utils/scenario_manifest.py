@@ -0,0 +1,200 @@
+"""Compact scenario manifest for the workflow scripts.
+
+Instantiating a FloodAdapt database is slow, and most workflow steps only need a
+few paths and event attributes. The init step writes these to a small JSON file in
+the scenario output folder, which later steps load instead of the database.
+"""
+
+import json
+import os
+from dataclasses import dataclass
+from datetime import datetime
+from pathlib import Path
+from typing import Union
+
+MANIFEST_NAME = "scenario_manifest.json"
+MANIFEST_VERSION = 1
+
+
+def _dump(obj) -> dict:
+    """Dump a FloodAdapt object to a JSON-serializable dict."""
+    if hasattr(obj, "model_dump"):
+        return obj.model_dump(mode="json")
+    return json.loads(json.dumps(obj, default=str))
+
+
+def build_scenario_manifest(database, scenario) -> dict:
+    """Collect the scenario attributes and paths used by the workflow scripts.
+
+    Parameters
+    ----------
+    database : FloodAdapt
+        FloodAdapt object of the database.
+    scenario : Scenario
+        FloodAdapt scenario.
+
+    Returns
+    -------
+    dict
+        Scenario manifest. Paths are relative to the database root, so the
+        manifest stays valid when the database is staged elsewhere.
+    """
+    db = database.database
+    root = Path(db.base_path)
+    event = db.events.get(scenario.event)
+    site = db.site
+
+    def _rel(path) -> str:
+        return Path(os.path.relpath(path, root)).as_posix()
+
+    return {
+        "version": MANIFEST_VERSION,
+        "created": datetime.now().isoformat(),
+        "scenario": _dump(scenario),
+        "event": {
+            **_dump(event),
+            "start_time": event.time.start_time.isoformat(),
+            "end_time": event.time.end_time.isoformat(),
+        },
+        "projection": _dump(db.projections.get(scenario.projection)),
+        "strategy": _dump(db.strategies.get(scenario.strategy)),
+        "site": {
+            "sfincs_dem": site.sfincs.dem.filename,
+            "sfincs_overland_model": site.sfincs.config.overland_model.name,
+            "fiat_floodmap_type": site.fiat.config.floodmap_type,
+        },
+        "paths": {
+            "input": _rel(db.input_path),
+            "static": _rel(db.static_path),
+            "output": _rel(db.output_path),
+            "results": _rel(db.scenarios.output_path.joinpath(scenario.name)),
+            "event": _rel(db.input_path / "events" / scenario.event),
+        },
+    }
+
+
+def write_scenario_manifest(database, scenario, path: Union[str, os.PathLike]) -> Path:
+    """Write the manifest of a scenario to a folder and return its path."""
+    manifest_fn = Path(path) / MANIFEST_NAME
+    with open(manifest_fn, "w") as f:
+        json.dump(build_scenario_manifest(database, scenario), f, indent=1)
+    return manifest_fn
+
+
+@dataclass
+class ScenarioManifest:
+    """Scenario attributes and paths, resolved against a database root."""
+
+    database_root: Path
+    manifest: dict
+
+    @property
+    def name(self) -> str:
+        """Name of the scenario."""
+        return self.manifest["scenario"]["name"]
+
+    @property
+    def event(self) -> dict:
+        """Attributes of the scenario event."""
+        return self.manifest["event"]
+
+    @property
+    def projection(self) -> dict:
+        """Attributes of the scenario projection."""
+        return self.manifest["projection"]
+
+    @property
+    def strategy(self) -> dict:
+        """Attributes of the scenario strategy."""
+        return self.manifest["strategy"]
+
+    @property
+    def site(self) -> dict:
+        """Subset of the site configuration."""
+        return self.manifest["site"]
+
+    @property
+    def start_time(self) -> datetime:
+        """Start time of the event."""
+        return datetime.fromisoformat(self.event["start_time"])
+
+    @property
+    def end_time(self) -> datetime:
+        """End time of the event."""
+        return datetime.fromisoformat(self.event["end_time"])
+
+    def path(self, key: str) -> Path:
+        """Resolve a path ('input', 'static', 'output', 'results' or 'event')."""
+        return self.database_root / self.manifest["paths"][key]
+
+
+def load_scenario_manifest(
+    database_root: Union[str, os.PathLike],
+    scenario_name: str,
+    output_dir: Union[str, os.PathLike] = None,
+) -> Union[ScenarioManifest, None]:
+    """Load the manifest written by the init step of a scenario.
+
+    Parameters
+    ----------
+    database_root : Union[str, os.PathLike]
+        Path to the FloodAdapt database.
+    scenario_name : str
+        Name of the scenario.
+    output_dir : Union[str, os.PathLike], optional
+        Output folder of the init step. By default the output folder of the
+        database is searched.
+
+    Returns
+    -------
+    Union[ScenarioManifest, None]
+        The manifest, or None if it is missing or has another version.
+    """
+    database_root = Path(database_root)
+    candidates = [database_root / "output"]
+    if output_dir is not None:
+        candidates.insert(0, Path(output_dir))
+    for candidate in candidates:
+        manifest_fn = candidate / "scenarios" / scenario_name / MANIFEST_NAME
+        if not manifest_fn.exists():
+            continue
+        with open(manifest_fn, "r") as f:
+            manifest = json.load(f)
+        if manifest.get("version") == MANIFEST_VERSION:
+            return ScenarioManifest(database_root=database_root, manifest=manifest)
+    return None
+
+
+def get_scenario_manifest(
+    database_root: Union[str, os.PathLike],
+    scenario_name: str,
+    output_dir: Union[str, os.PathLike] = None,
+) -> ScenarioManifest:
+    """Load the scenario manifest, building it from the database if it is missing.
+
+    Parameters
+    ----------
+    database_root : Union[str, os.PathLike]
+        Path to the FloodAdapt database.
+    scenario_name : str
+        Name of the scenario.
+    output_dir : Union[str, os.PathLike], optional
+        Output folder of the init step.
+
+    Returns
+    -------
+    ScenarioManifest
+        Scenario manifest.
+    """
+    manifest = load_scenario_manifest(database_root, scenario_name, output_dir)
+    if manifest is not None:
+        return manifest
+
+    print("No scenario manifest found, reading the FloodAdapt database")
+    from DT_flood.utils.fa_scenario_utils import init_scenario
+
+    database, scenario = init_scenario(Path(database_root), scenario_name)
+    return ScenarioManifest(
+        database_root=Path(database_root),
+        manifest=build_scenario_manifest(database, scenario),
+    )
@@ -0,0 +1,145 @@
+"""Cached model domain geometries of a FloodAdapt site.
+
+Reading the SFINCS model boundary or the Wflow region and reprojecting it is
+repeated for every event and every map. The geometries are kept in memory per
+database and rebuilt when a file of the model template they are read from has
+changed.
+"""
+
+from __future__ import annotations
+
+import os
+import threading
+from dataclasses import dataclass
+from pathlib import Path
+from typing import TYPE_CHECKING, Callable
+
+if TYPE_CHECKING:
+    import geopandas as gpd
+    import numpy as np
+
+_geometries = {}
+_lock = threading.Lock()
+
+
+@dataclass
+class DomainGeometry:
+    """Model domain in EPSG:4326."""
+
+    boundary: gpd.GeoDataFrame
+    bounds: np.ndarray
+    center: tuple[float, float]
+
+    @classmethod
+    def from_boundary(cls, boundary: gpd.GeoDataFrame) -> "DomainGeometry":
+        """Dissolve and reproject a boundary, with the center taken in its own CRS."""
+        boundary = boundary.dissolve()
+        [center] = boundary.centroid.to_crs(4326)
+        boundary = boundary.to_crs(4326)
+        return cls(
+            boundary=boundary,
+            bounds=boundary.total_bounds,
+            center=(center.x, center.y),
+        )
+
+
+def _signature(paths: list[Path]) -> tuple:
+    """Get the modification times and sizes of the files under some paths."""
+    signature = []
+    for path in paths:
+        if path.is_dir():
+            files = sorted(p for p in path.rglob("*") if p.is_file())
+        else:
+            files = [path]
+        for file in files:
+            try:
+                stat = file.stat()
+            except FileNotFoundError:
+                continue
+            signature.append((os.fspath(file), stat.st_mtime_ns, stat.st_size))
+    return tuple(signature)
+
+
+def _get_geometry(
+    database, domain: str, paths: list[Path], build: Callable[[], DomainGeometry]
+) -> DomainGeometry:
+    """Get a cached domain geometry, rebuilding it when its files have changed."""
+    key = (Path(database.database.base_path).resolve(), domain)
+    signature = _signature(paths)
+    with _lock:
+        cached = _geometries.get(key)
+        if cached is not None and cached[0] == signature:
+            return cached[1]
+    geometry = build()
+    with _lock:
+        _geometries[key] = (signature, geometry)
+    return geometry
+
+
+def get_sfincs_domain(database) -> DomainGeometry:
+    """Get the SFINCS model boundary of a database.
+
+    Parameters
+    ----------
+    database : FloodAdapt
+        FloodAdapt object.
+
+    Returns
+    -------
+    DomainGeometry
+        Dissolved boundary, bounds and center in EPSG:4326. The object is shared
+        between callers and should not be modified.
+    """
+    site = database.database.site
+    template = (
+        Path(database.database.static_path)
+        / "templates"
+        / site.sfincs.config.overland_model.name
+    )
+    return _get_geometry(
+        database,
+        "sfincs",
+        [template],
+        lambda: DomainGeometry.from_boundary(database.get_model_boundary()),
+    )
+
+
+def get_wflow_domain(database) -> DomainGeometry:
+    """Get the Wflow model region of a database.
+
+    Parameters
+    ----------
+    database : FloodAdapt
+        FloodAdapt object.
+
+    Returns
+    -------
+    DomainGeometry
+        Dissolved region, bounds and center in EPSG:4326. The object is shared
+        between callers and should not be modified.
+    """
+    region_fn = (
+        Path(database.database.static_path)
+        / "templates"
+        / "wflow"
+        / "staticgeoms"
+        / "region.geojson"
+    )
+
+    def _build() -> DomainGeometry:
+        import geopandas as gpd
+
+        return DomainGeometry.from_boundary(gpd.read_file(region_fn))
+
+    return _get_geometry(database, "wflow", [region_fn], _build)
+
+
+def invalidate_site_geometry(database=None):
+    """Drop the cached geometries of a database, or of all databases."""
+    with _lock:
+        if database is None:
+            _geometries.clear()
+            return
+        root = Path(database.database.base_path).resolve()
+        for key in [key for key in _geometries if key[0] == root]:
+            del _geometries[key]
@@ -0,0 +1,388 @@
+"""Result cache of the steps of the scenario workflow.
+
+cwltool's cache keys a step on all its inputs, including the complete FloodAdapt
+input and static folders, so any edit to the database invalidates every step.
+Here a step is keyed on its tool description and scripts, its parameters, the
+cache keys of the steps it takes outputs from, and only the parts of the input
+and static folders it reads (STEP_READS). Outputs of a step are stored as hard
+links and linked back into the working directory of the step on a hit.
+
+Outputs share their files with the cache, and inputs are linked into the working
+directory of a step. A step that modifies an input has to mark it writable in
+its InitialWorkDirRequirement, so that it gets a copy.
+"""
+
+import hashlib
+import json
+import os
+import shutil
+import threading
+import time
+import tomllib
+import uuid
+from datetime import datetime
+from pathlib import Path
+from typing import Union
+
+from DT_flood.utils.results_store import (
+    folder_digest,
+    link_or_copy,
+    link_tree,
+    load_file_digests,
+    save_file_digests,
+)
+
+CACHE_NAME = "step_cache"
+ENTRY_NAME = "entry.json"
+CACHE_VERSION = 1
+
+# Parts of the FloodAdapt input and static folders read by the cached steps.
+# Placeholders are replaced by the names of the scenario components. Steps that
+# only read outputs of other steps read no folders.
+_SCENARIO_INPUTS = [
+    "events/{event}",
+    "projections/{projection}",
+    "strategies/{strategy}",
+    "measures/{measures}",
+]
+STEP_READS = {
+    "wflow_warmup": {"input": ["events/{event}"], "static": ["templates/wflow"]},
+    "run_wflow_warmup": {},
+    "wflow_event": {"input": ["events/{event}"], "static": ["templates/wflow"]},
+    "run_wflow_event": {},
+    "update_sfincs": {"input": _SCENARIO_INPUTS, "static": ["templates", "config"]},
+    "run_sfincs": {},
+    "post_sfincs": {"input": _SCENARIO_INPUTS, "static": ["dem", "config"]},
+    "update_fiat": {"input": _SCENARIO_INPUTS, "static": ["templates/fiat", "config"]},
+    "run_fiat": {},
+    "postprocess_fiat": {
+        "input": _SCENARIO_INPUTS,
+        "static": ["templates/fiat", "config"],
+    },
+    "update_ra2ce": {
+        "input": _SCENARIO_INPUTS,
+        "static": ["templates/ra2ce", "config"],
+    },
+    "run_ra2ce": {},
+}
+# Steps computing the flood hazard, the other steps compute the impacts
+HAZARD_STEPS = [
+    "wflow_warmup",
+    "run_wflow_warmup",
+    "wflow_event",
+    "run_wflow_event",
+    "update_sfincs",
+    "run_sfincs",
+    "post_sfincs",
+]
+# Step inputs holding the FloodAdapt input and static folders
+FOLDER_INPUTS = {"input_folder": "input", "static_folder": "static"}
+# Inputs not part of the key: credentials, and the output folder of the init step
+# whose scenario manifest is covered by STEP_READS
+IGNORED_INPUTS = ["refreshtoken", "token", "password", "user", "output_folder"]
+
+
+def scenario_components(
+    input_folder: Union[str, os.PathLike], scenario: str
+) -> dict[str, list[str]]:
+    """Read the names of the event, projection, strategy and measures of a scenario.
+
+    Parameters
+    ----------
+    input_folder : Union[str, os.PathLike]
+        FloodAdapt input folder.
+    scenario : str
+        Name of the scenario.
+
+    Returns
+    -------
+    dict[str, list[str]]
+        Names per placeholder of STEP_READS.
+    """
+    input_folder = Path(input_folder)
+    with open(input_folder / "scenarios" / scenario / f"{scenario}.toml", "rb") as f:
+        attrs = tomllib.load(f)
+    strategy_fn = (
+        input_folder / "strategies" / attrs["strategy"] / f"{attrs['strategy']}.toml"
+    )
+    with open(strategy_fn, "rb") as f:
+        measures = tomllib.load(f).get("measures", [])
+    return {
+        "event": [attrs["event"]],
+        "projection": [attrs["projection"]],
+        "strategy": [attrs["strategy"]],
+        "measures": list(measures),
+    }
+
+
+def _hash(content) -> str:
+    return hashlib.sha256(
+        json.dumps(content, sort_keys=True, default=str).encode()
+    ).hexdigest()
+
+
+def _file_hash(path: Union[str, os.PathLike]) -> str:
+    with open(path, "rb") as f:
+        return hashlib.sha256(f.read()).hexdigest()
+
+
+def _tree_size(path: Path) -> int:
+    if path.is_file():
+        return path.stat().st_size
+    return sum(p.stat().st_size for p in path.rglob("*") if p.is_file())
+
+
+def static_reads(steps: list[str] = None) -> list[str]:
+    """List the parts of the static folder read by steps, by default all steps.
+
+    Folders inside another listed folder are left out.
+    """
+    steps = STEP_READS if steps is None else steps
+    folders = {
+        folder for step in steps for folder in STEP_READS[step].get("static", [])
+    }
+    return sorted(
+        folder
+        for folder in folders
+        if not any(folder.startswith(f"{other}/") for other in folders)
+    )
+
+
+class StepCache:
+    """Cache of workflow step outputs.
+
+    Parameters
+    ----------
+    root : Union[str, os.PathLike]
+        Cache folder.
+    max_bytes : int, optional
+        Size above which the least recently used entries are evicted. By default
+        the cache is not limited.
+    """
+
+    def __init__(self, root: Union[str, os.PathLike], max_bytes: int = None):
+        self.root = Path(root)
+        self.root.mkdir(parents=True, exist_ok=True)
+        self.max_bytes = max_bytes
+        self.stats = {}
+        self._digests = load_file_digests(self.root)
+        self._components = {}
+        self._lock = threading.Lock()
+
+    def cacheable(self, step: str) -> bool:
+        """Check if the outputs of a step are cached."""
+        return step in STEP_READS
+
+    def _folder_reads(self, step: str, folder: str, path: Path, job: dict) -> dict:
+        """Get the checksums of the parts of an input or static folder a step reads."""
+        reads = {}
+        for pattern in STEP_READS[step].get(folder, []):
+            rels = [pattern]
+            if "{" in pattern:
+                field = pattern[pattern.index("{") + 1 : pattern.index("}")]
+                names = self._scenario_components(job)[field]
+                rels = [pattern.replace(f"{{{field}}}", name) for name in names]
+            for rel in rels:
+                reads[rel] = folder_digest(path / rel, self._digests)
+        return reads
+
+    def _scenario_components(self, job: dict) -> dict[str, list[str]]:
+        key = (job["fa_input_folder"]["path"], job["scenario"])
+        with self._lock:
+            if key not in self._components:
+                self._components[key] = scenario_components(*key)
+            return self._components[key]
+
+    def step_key(
+        self,
+        step: str,
+        tool_fn: Union[str, os.PathLike],
+        inputs: dict,
+        lineage: dict,
+        job: dict,
+    ) -> Union[str, None]:
+        """Compute the cache key of a step.
+
+        Parameters
+        ----------
+        step : str
+            Name of the step.
+        tool_fn : Union[str, os.PathLike]
+            Path to the CWL tool description of the step.
+        inputs : dict
+            Step inputs, before staging.
+        lineage : dict
+            Per input taken from another step, '<step key>/<output>', or None if
+            that step is not cached.
+        job : dict
+            Workflow inputs.
+
+        Returns
+        -------
+        Union[str, None]
+            The key, or None if the step cannot be cached.
+        """
+        if not self.cacheable(step):
+            return None
+        content = {
+            "version": CACHE_VERSION,
+            "step": step,
+            "tool": _file_hash(tool_fn),
+        }
+        for key, value in sorted(inputs.items()):
+            if key in IGNORED_INPUTS:
+                continue
+            if key in lineage:
+                if lineage[key] is None:
+                    return None
+                content[key] = lineage[key]
+            elif key in FOLDER_INPUTS:
+                content[key] = self._folder_reads(
+                    step, FOLDER_INPUTS[key], Path(value["path"]), job
+                )
+            elif isinstance(value, dict) and value.get("class") == "File":
+                content[key] = _file_hash(value["path"])
+            elif isinstance(value, dict) and value.get("class") == "Directory":
+                content[key] = folder_digest(Path(value["path"]), self._digests)
+            else:
+                content[key] = value
+        save_file_digests(self.root)
+        return _hash(content)
+
+    def _record(self, step: str, outcome: str, seconds: float = 0.0):
+        with self._lock:
+            stats = self.stats.setdefault(step, {"hits": 0, "misses": 0, "saved_s": 0})
+            stats[outcome] += 1
+            stats["saved_s"] += seconds
+
+    def lookup(self, step: str, key: str) -> Union[dict, None]:
+        """Get the cache entry of a step key, counting a hit or miss."""
+        entry_fn = self.root / key / ENTRY_NAME
+        if not entry_fn.exists():
+            self._record(step, "misses")
+            return None
+        with open(entry_fn, "r") as f:
+            entry = json.load(f)
+        entry["last_used"] = time.time()
+        self._write_entry(self.root / key, entry)
+        self._record(step, "hits", entry["duration"])
+        return entry
+
+    def materialize(self, entry: dict, workdir: Path) -> dict:
+        """Hard link the outputs of a cache entry into the working directory."""
+        files = self.root / entry["key"] / "files"
+        outputs = {}
+        for name, output in entry["outputs"].items():
+            if output is None:
+                outputs[name] = None
+                continue
+            src = files / output["rel"]
+            dst = workdir / output["rel"]
+            if output["class"] == "Directory":
+                dst.mkdir(parents=True, exist_ok=True)
+                link_tree(src, dst)
+            else:
+                dst.parent.mkdir(parents=True, exist_ok=True)
+                if dst.exists():
+                    dst.unlink()
+                link_or_copy(src, dst)
+            outputs[name] = {"class": output["class"], "path": str(dst)}
+        return outputs
+
+    def store(
+        self, step: str, key: str, outputs: dict, workdir: Path, duration: float
+    ) -> Path:
+        """Add the outputs of a finished step to the cache.
+
+        Parameters
+        ----------
+        step : str
+            Name of the step.
+        key : str
+            Cache key of the step.
+        outputs : dict
+            File and Directory outputs inside the working directory.
+        workdir : Path
+            Working directory of the step.
+        duration : float
+            Run time of the step in seconds.
+
+        Returns
+        -------
+        Path
+            Folder of the cache entry.
+        """
+        entry_dir = self.root / key
+        if (entry_dir / ENTRY_NAME).exists():
+            return entry_dir
+        tmp_dir = self.root / f"{key}.{uuid.uuid4().hex}.tmp"
+        entry = {
+            "key": key,
+            "step": step,
+            "outputs": {},
+            "duration": duration,
+            "created": datetime.now().isoformat(),
+            "last_used": time.time(),
+        }
+        for name, output in outputs.items():
+            if output is None:
+                entry["outputs"][name] = None
+                continue
+            src = Path(output["path"])
+            rel = Path(os.path.relpath(src, workdir))
+            dst = tmp_dir / "files" / rel
+            if output["class"] == "Directory":
+                dst.mkdir(parents=True, exist_ok=True)
+                link_tree(src, dst)
+            else:
+                dst.parent.mkdir(parents=True, exist_ok=True)
+                link_or_copy(src, dst)
+            entry["outputs"][name] = {"class": output["class"], "rel": rel.as_posix()}
+        entry["bytes"] = _tree_size(tmp_dir / "files") if outputs else 0
+        self._write_entry(tmp_dir, entry)
+        try:
+            os.rename(tmp_dir, entry_dir)
+        except OSError:
+            shutil.rmtree(tmp_dir)
+        self.evict()
+        return entry_dir
+
+    def _write_entry(self, entry_dir: Path, entry: dict):
+        tmp_fn = entry_dir / f"{ENTRY_NAME}.{uuid.uuid4().hex}.tmp"
+        with open(tmp_fn, "w") as f:
+            json.dump(entry, f, indent=1)
+        os.replace(tmp_fn, entry_dir / ENTRY_NAME)
+
+    def entries(self) -> list[dict]:
+        """List the cache entries."""
+        entries = []
+        for entry_fn in self.root.glob(f"*/{ENTRY_NAME}"):
+            try:
+                with open(entry_fn, "r") as f:
+                    entries.append(json.load(f))
+            except (OSError, json.JSONDecodeError):
+                continue
+        return entries
+
+    def evict(self):
+        """Remove the least recently used entries until the cache fits max_bytes."""
+        if self.max_bytes is None:
+            return
+        with self._lock:
+            entries = sorted(self.entries(), key=lambda entry: entry["last_used"])
+            total = sum(entry["bytes"] for entry in entries)
+            while entries and total > self.max_bytes:
+                entry = entries.pop(0)
+                print(f"Evicting cached {entry['step']} output {entry['key'][:12]}")
+                shutil.rmtree(self.root / entry["key"], ignore_errors=True)
+                total -= entry["bytes"]
+
+    def report(self) -> str:
+        """Summarize the hits and misses per step."""
+        lines = [f"{'step':<20}  {'hits':>5}  {'misses':>6}  {'saved [s]':>9}"]
+        for step, stats in self.stats.items():
+            lines.append(
+                f"{step:<20}  {stats['hits']:>5}  {stats['misses']:>6}  "
+                f"{stats['saved_s']:>9.1f}"
+            )
+        return "\n".join(lines)
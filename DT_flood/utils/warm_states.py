@@ -0,0 +1,194 @@
+"""Store of warm Wflow states of a site, indexed by timestamp.
+
+Every scenario starts with a 365-day Wflow warm-up run ending at the event start
+time, of which only the model states are used. After a run the warm-up states
+and the states at the end of the event are added to this store. A scenario whose
+start time matches a stored state within a tolerance links that state and skips
+the warm-up run. Otherwise a shorter warm-up run can start from the nearest
+earlier state.
+
+States are only valid for the Wflow model they were computed with, so the store
+is split per checksum of the Wflow template.
+"""
+
+import hashlib
+import json
+import os
+import uuid
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Union
+
+from DT_flood.utils.results_store import (
+    folder_digest,
+    link_or_copy,
+    load_file_digests,
+    save_file_digests,
+)
+
+STATES_NAME = "wflow_states"
+TIME_FORMAT = "%Y%m%dT%H%M%S"
+# Location of the output states in a Wflow model folder
+OUTSTATE = Path("run_default") / "outstate" / "outstates.nc"
+
+
+@dataclass
+class WarmState:
+    """Stored Wflow state."""
+
+    time: datetime
+    path: Path
+    exact: bool
+
+
+def get_state_store(database) -> Path:
+    """Get the folder with the stored states of the current Wflow template."""
+    db = database.database
+    root = Path(db.output_path) / STATES_NAME
+    root.mkdir(parents=True, exist_ok=True)
+    digests = load_file_digests(root)
+    template = folder_digest(Path(db.static_path) / "templates" / "wflow", digests)
+    save_file_digests(root)
+    checksum = hashlib.sha256(json.dumps(template, sort_keys=True).encode())
+    store = root / checksum.hexdigest()[:16]
+    store.mkdir(exist_ok=True)
+    return store
+
+
+def list_warm_states(database) -> dict[datetime, Path]:
+    """List the stored states by timestamp, in chronological order."""
+    states = {}
+    for path in get_state_store(database).glob("*.nc"):
+        try:
+            states[datetime.strptime(path.stem, TIME_FORMAT)] = path
+        except ValueError:
+            continue
+    return dict(sorted(states.items()))
+
+
+def add_warm_state(
+    database, time: datetime, state_fn: Union[str, os.PathLike]
+) -> Union[Path, None]:
+    """Add a Wflow state file to the store, unless a state at that time is stored.
+
+    Parameters
+    ----------
+    database : FloodAdapt
+        FloodAdapt object of the database.
+    time : datetime
+        Model time of the state.
+    state_fn : Union[str, os.PathLike]
+        Path to the Wflow output states.
+
+    Returns
+    -------
+    Union[Path, None]
+        Path to the stored state, or None if the state file does not exist.
+    """
+    if not Path(state_fn).exists():
+        return None
+    state = get_state_store(database) / f"{time.strftime(TIME_FORMAT)}.nc"
+    if not state.exists():
+        tmp_fn = state.with_name(f"{state.name}.{uuid.uuid4().hex}.tmp")
+        link_or_copy(state_fn, tmp_fn)
+        os.replace(tmp_fn, state)
+        print(f"Stored Wflow state at {time}")
+    return state
+
+
+def find_warm_state(
+    database,
+    time: datetime,
+    tolerance: timedelta = timedelta(0),
+    max_gap: timedelta = timedelta(0),
+) -> Union[WarmState, None]:
+    """Find a stored state to start a Wflow event run from.
+
+    Parameters
+    ----------
+    database : FloodAdapt
+        FloodAdapt object of the database.
+    time : datetime
+        Start time of the event.
+    tolerance : timedelta, optional
+        Maximum difference between the event start time and a state that is used
+        as is. The default is an exact match.
+    max_gap : timedelta, optional
+        Maximum length of a warm-up run from an earlier state. The default is no
+        gap, so only a state within the tolerance is found.
+
+    Returns
+    -------
+    Union[WarmState, None]
+        The nearest state within the tolerance, with exact set, else the latest
+        earlier state within max_gap, else None.
+    """
+    states = list_warm_states(database)
+    nearest = min(states, key=lambda t: abs(t - time), default=None)
+    if nearest is not None and abs(nearest - time) <= tolerance:
+        return WarmState(time=nearest, path=states[nearest], exact=True)
+    earlier = [t for t in states if time - max_gap <= t < time]
+    if earlier:
+        return WarmState(time=earlier[-1], path=states[earlier[-1]], exact=False)
+    return None
+
+
+def stage_warm_state(state: WarmState, target: Union[str, os.PathLike]) -> Path:
+    """Link a stored state into a folder laid out like a Wflow warm-up output.
+
+    Parameters
+    ----------
+    state : WarmState
+        Stored state.
+    target : Union[str, os.PathLike]
+        Folder to stage the state in, passed as the warm-up output to the Wflow
+        event step.
+
+    Returns
+    -------
+    Path
+        The target folder.
+    """
+    target = Path(target)
+    state_fn = target / "model" / OUTSTATE
+    state_fn.parent.mkdir(parents=True, exist_ok=True)
+    if state_fn.exists():
+        state_fn.unlink()
+    link_or_copy(state.path, state_fn)
+    return target
+
+
+def store_scenario_states(database, scenario, warmup: bool = True) -> list[Path]:
+    """Add the warm-up and event end states of a finished scenario to the store.
+
+    Parameters
+    ----------
+    database : FloodAdapt
+        FloodAdapt object of the database.
+    scenario : Scenario
+        FloodAdapt scenario with results in the scenario output folder.
+    warmup : bool, optional
+        If False only the event end state is added, e.g. when the warm-up state
+        was taken from the store. The default is True.
+
+    Returns
+    -------
+    list[Path]
+        Paths to the stored states.
+    """
+    db = database.database
+    event = db.events.get(scenario.event)
+    flooding = db.scenarios.output_path.joinpath(scenario.name, "Flooding")
+    states = [
+        add_warm_state(
+            database, event.time.end_time, flooding / "wflow_event" / OUTSTATE
+        )
+    ]
+    if warmup:
+        states.append(
+            add_warm_state(
+                database, event.time.start_time, flooding / "wflow_warmup" / OUTSTATE
+            )
+        )
+    return [state for state in states if state is not None]
@@ -0,0 +1,535 @@
+"""In-process executor of the scenario CWL workflow.
+
+cwltool runs the steps of run_fa_scenario.cwl one after another, although e.g.
+the FIAT and RA2CE branches only depend on the SFINCS floodmap. This executor
+reads the same workflow, tool descriptions and job file, and runs every step as
+soon as its inputs are available, with at most max_workers steps at a time.
+
+Only the subset of CWL used by the DT_flood workflows is supported: command
+line tools with a base command, prefix/position input bindings, staging of
+inputs with InitialWorkDirRequirement, copying writable entries,
+EnvVarRequirement and output globs with $(inputs.<name>) and
+$(inputs.<name>.basename) references. Conditional steps ('when') and step inputs
+with several sources ('valueFrom') support expressions of inputs.<name>,
+self[<n>] and null, compared with === and !== and combined with && and ||.
+Hints are ignored.
+"""
+
+import os
+import re
+import shutil
+import subprocess
+import tempfile
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Union
+
+import yaml
+
+from DT_flood.utils.step_cache import StepCache
+
+FINISHED = ["done", "cached", "skipped"]
+_REFERENCE = re.compile(r"\$\(inputs\.(\w+)(?:\.(\w+))?\)")
+_EXPRESSION = re.compile(r"\$\((.*)\)", re.DOTALL)
+
+
+def _load_yaml(path: Path) -> dict:
+    with open(path, "r") as f:
+        return yaml.safe_load(f)
+
+
+def _resolve_value(value, base_dir: Path):
+    """Resolve the paths of File and Directory values relative to a folder."""
+    if isinstance(value, dict) and value.get("class") in ["File", "Directory"]:
+        path = Path(value.get("path") or value["location"])
+        if not path.is_absolute():
+            path = base_dir / path
+        return {"class": value["class"], "path": str(path)}
+    return value
+
+
+def _evaluate(expression: str, inputs: dict):
+    """Evaluate $(inputs.<name>) and $(inputs.<name>.<attr>) references."""
+
+    def _get(match):
+        value = inputs.get(match.group(1))
+        attr = match.group(2)
+        if isinstance(value, dict) and "path" in value:
+            if attr == "basename":
+                return Path(value["path"]).name
+            if attr in [None, "path"]:
+                return value["path"]
+        elif attr is None:
+            return value
+        raise ValueError(f"Unsupported CWL expression {match.group(0)}")
+
+    match = _REFERENCE.fullmatch(expression.strip())
+    if match is not None:
+        return _get(match)
+    return _REFERENCE.sub(lambda m: str(_get(m)), expression)
+
+
+def _evaluate_expression(expression: str, inputs: dict, sources: list = None):
+    """Evaluate the JavaScript subset of 'when' and 'valueFrom' expressions.
+
+    self[<n>] refers to the values of the sources of a step input.
+    """
+    match = _EXPRESSION.fullmatch(expression.strip())
+    if match is None:
+        raise ValueError(f"Unsupported CWL expression {expression}")
+
+    def _operand(text: str):
+        text = text.strip()
+        if text == "null":
+            return None
+        reference = re.fullmatch(r"inputs\.(\w+)", text)
+        if reference is not None:
+            return inputs.get(reference.group(1))
+        index = re.fullmatch(r"self\[(\d+)\]", text)
+        if index is not None and sources is not None:
+            return sources[int(index.group(1))]
+        raise ValueError(f"Unsupported CWL expression {expression}")
+
+    def _compare(text: str):
+        for operator in ["===", "!=="]:
+            if operator in text:
+                left, right = text.split(operator)
+                equal = _operand(left) == _operand(right)
+                return equal if operator == "===" else not equal
+        return _operand(text)
+
+    # As in JavaScript, && and || return the operand that decides the result
+    value = None
+    for alternative in match.group(1).split("||"):
+        for term in alternative.split("&&"):
+            value = _compare(term)
+            if not value:
+                break
+        if value:
+            break
+    return value
+
+
+@dataclass
+class StepRecord:
+    """Execution record of a workflow step."""
+
+    name: str
+    depends_on: list[str]
+    status: str = "pending"
+    start: float = None
+    end: float = None
+    returncode: int = None
+    outputs: dict = field(default_factory=dict)
+    cache_key: str = None
+
+    @property
+    def duration(self) -> float:
+        """Run time in seconds."""
+        if self.start is None or self.end is None:
+            return 0.0
+        return self.end - self.start
+
+
+@dataclass
+class WorkflowRun:
+    """Step records and outputs of a workflow run."""
+
+    steps: dict[str, StepRecord]
+    outputs: dict
+    wall_s: float
+
+    @property
+    def succeeded(self) -> bool:
+        """True if all steps finished, were taken from the cache or were skipped."""
+        return all(step.status in FINISHED for step in self.steps.values())
+
+    def critical_path(self) -> tuple[list[str], float]:
+        """Get the chain of dependent steps with the longest total run time."""
+        longest = {}
+
+        def _longest(name: str) -> tuple[float, list[str]]:
+            if name not in longest:
+                step = self.steps[name]
+                best = max(
+                    (_longest(dep) for dep in step.depends_on), default=(0.0, [])
+                )
+                path = best[1] if step.status == "skipped" else [*best[1], name]
+                longest[name] = (best[0] + step.duration, path)
+            return longest[name]
+
+        duration, path = max((_longest(name) for name in self.steps), default=(0.0, []))
+        return path, duration
+
+    def report(self) -> str:
+        """Summarize the step run times and the critical path."""
+        width = max(len(name) for name in self.steps)
+        lines = [f"{'step':<{width}}  {'status':<8}  {'time [s]':>9}"]
+        for name, step in self.steps.items():
+            lines.append(f"{name:<{width}}  {step.status:<9}  {step.duration:>9.1f}")
+        path, duration = self.critical_path()
+        lines.append(f"Critical path: {' -> '.join(path)} ({duration:.1f} s)")
+        lines.append(f"Wall time: {self.wall_s:.1f} s")
+        return "\n".join(lines)
+
+
+class WorkflowExecutor:
+    """Run a CWL workflow with independent steps in parallel.
+
+    Parameters
+    ----------
+    workflow_fn : Union[str, os.PathLike]
+        Path to the CWL workflow.
+    job_fn : Union[str, os.PathLike]
+        Path to the job file with the workflow inputs.
+    max_workers : int, optional
+        Maximum number of concurrent steps. The default is 4.
+    tmp_dir : Union[str, os.PathLike], optional
+        Folder for the step working directories. By default a temporary folder
+        is created and removed after the run.
+    log_dir : Union[str, os.PathLike], optional
+        Folder for the step logs. By default the logs are written to the folder
+        of the working directories.
+    cache : StepCache, optional
+        Cache of step outputs. Steps with a cached result are not run.
+    service_limits : dict[str, threading.Semaphore], optional
+        Semaphores per OSCAR service, acquired while a step with that 'service'
+        input runs. Shared between executors to limit the concurrent jobs per
+        service across workflows.
+    label : str, optional
+        Prefix of the progress messages, e.g. the scenario name.
+
+    Raises
+    ------
+    ValueError
+        If the workflow has steps that are not command line tools.
+    """
+
+    def __init__(
+        self,
+        workflow_fn: Union[str, os.PathLike],
+        job_fn: Union[str, os.PathLike],
+        max_workers: int = 4,
+        tmp_dir: Union[str, os.PathLike] = None,
+        log_dir: Union[str, os.PathLike] = None,
+        cache: StepCache = None,
+        service_limits: dict[str, threading.Semaphore] = None,
+        label: str = None,
+    ):
+        self.workflow_fn = Path(workflow_fn)
+        self.workflow = _load_yaml(self.workflow_fn)
+        if self.workflow.get("class") != "Workflow":
+            raise ValueError(f"{workflow_fn} is not a CWL workflow")
+        job_fn = Path(job_fn)
+        self.job = {
+            key: _resolve_value(value, job_fn.parent)
+            for key, value in (_load_yaml(job_fn) or {}).items()
+        }
+        self.max_workers = max_workers
+        self.tmp_dir = tmp_dir
+        self.log_dir = log_dir
+        self.cache = cache
+        self.service_limits = service_limits or {}
+        self.label = label
+        self.steps = self.workflow["steps"]
+        self.tool_fns = {
+            name: self.workflow_fn.parent / step["run"]
+            for name, step in self.steps.items()
+        }
+        self.tools = {name: _load_yaml(fn) for name, fn in self.tool_fns.items()}
+        unsupported = [
+            name
+            for name, tool in self.tools.items()
+            if tool.get("class") != "CommandLineTool"
+        ]
+        if unsupported:
+            raise ValueError(
+                f"Steps {', '.join(unsupported)} of {workflow_fn} are not "
+                "CommandLineTools, which is the only step class supported"
+            )
+        self._lock = threading.Lock()
+
+    def _print(self, name: str, message: str):
+        prefix = f"{self.label}/{name}" if self.label else name
+        print(f"[{prefix}] {message}")
+
+    def dependencies(self, name: str) -> list[str]:
+        """Get the steps whose outputs a step uses."""
+        sources = []
+        for source in self.steps[name]["in"].values():
+            if isinstance(source, dict):
+                source = source.get("source")
+            for item in source if isinstance(source, list) else [source]:
+                if isinstance(item, str) and "/" in item:
+                    sources.append(item.split("/")[0])
+        return list(dict.fromkeys(sources))
+
+    def _source_value(self, source, records: dict[str, StepRecord]) -> tuple:
+        """Get the value of a step input source and its lineage, see step_key.
+
+        The lineage is False for workflow inputs.
+        """
+        if isinstance(source, str) and "/" in source:
+            step, output = source.split("/")
+            step_key = records[step].cache_key
+            return (
+                records[step].outputs[output],
+                f"{step_key}/{output}" if step_key else None,
+            )
+        return self.job.get(source), False
+
+    def _step_inputs(
+        self, name: str, records: dict[str, StepRecord]
+    ) -> tuple[dict, dict]:
+        """Get the inputs of a step and the cache keys of the outputs among them."""
+        inputs = {}
+        lineage = {}
+        for key, spec in self.steps[name]["in"].items():
+            if not isinstance(spec, dict):
+                spec = {"source": spec}
+            source = spec.get("source")
+            if isinstance(source, list):
+                values = [self._source_value(item, records) for item in source]
+                value = [item[0] for item in values]
+                if "valueFrom" in spec:
+                    value = _evaluate_expression(spec["valueFrom"], {}, sources=value)
+                # Lineage of the source the value was taken from
+                origin = [item[1] for item in values if item[0] is value]
+                origin = origin[0] if origin else False
+            else:
+                value, origin = self._source_value(source, records)
+            inputs[key] = value
+            if origin is not False:
+                lineage[key] = origin
+        return inputs, lineage
+
+    def _stage(self, tool: dict, inputs: dict, workdir: Path) -> dict:
+        """Stage the inputs listed in InitialWorkDirRequirement in the workdir.
+
+        Inputs are linked, unless the entry is marked writable. Those are copied,
+        so the step cannot modify the outputs of other steps, the step cache or
+        the FloodAdapt database.
+        """
+        requirement = tool.get("requirements", {}).get("InitialWorkDirRequirement")
+        if requirement is None:
+            return inputs
+        inputs = dict(inputs)
+        for entry in requirement.get("listing", []):
+            writable = False
+            if isinstance(entry, dict):
+                writable = entry.get("writable", False)
+                entry = entry["entry"]
+            match = _REFERENCE.fullmatch(entry.strip())
+            if match is None or match.group(2) is not None:
+                raise ValueError(f"Unsupported listing entry {entry}")
+            value = inputs.get(match.group(1))
+            if value is None:
+                continue
+            target = workdir / Path(value["path"]).name
+            if not target.exists():
+                _stage_value(value, target, writable)
+            inputs[match.group(1)] = {**value, "path": str(target)}
+        return inputs
+
+    def _command(self, tool: dict, inputs: dict) -> list[str]:
+        base = tool.get("baseCommand", [])
+        command = [base] if isinstance(base, str) else list(base)
+        args = []
+        for key, spec in tool.get("inputs", {}).items():
+            binding = spec.get("inputBinding") if isinstance(spec, dict) else None
+            value = inputs.get(key)
+            if binding is None or value is None:
+                continue
+            if isinstance(value, dict):
+                value = value["path"]
+            arg = [binding["prefix"]] if "prefix" in binding else []
+            args.append((binding.get("position", 0), key, [*arg, str(value)]))
+        for _, _, arg in sorted(args, key=lambda item: item[:2]):
+            command.extend(arg)
+        return command
+
+    def _collect_outputs(self, tool: dict, inputs: dict, workdir: Path) -> dict:
+        outputs = {}
+        for key, spec in tool.get("outputs", {}).items():
+            pattern = _evaluate(spec["outputBinding"]["glob"], inputs)
+            matches = sorted(workdir.glob(pattern.rstrip("/")))
+            if not matches:
+                if str(spec["type"]).endswith("?"):
+                    outputs[key] = None
+                    continue
+                raise FileNotFoundError(f"No output {key} matching {pattern}")
+            outputs[key] = {
+                "class": spec["type"].rstrip("?"),
+                "path": str(matches[0]),
+            }
+        return outputs
+
+    def run_step(self, name: str, records: dict[str, StepRecord], root: Path) -> str:
+        """Run a single step in its own working directory.
+
+        Returns 'skipped' if the condition of the step is false, 'cached' if the
+        outputs were taken from the cache, else 'done'.
+        """
+        tool = self.tools[name]
+        record = records[name]
+        with self._lock:
+            raw_inputs, lineage = self._step_inputs(name, records)
+        condition = self.steps[name].get("when")
+        if condition is not None and not _evaluate_expression(condition, raw_inputs):
+            with self._lock:
+                record.outputs = {output: None for output in self.steps[name]["out"]}
+            self._print(name, "skipped")
+            return "skipped"
+        workdir = root / name
+        workdir.mkdir(parents=True)
+
+        key = None
+        if self.cache is not None:
+            key = self.cache.step_key(
+                name, self.tool_fns[name], raw_inputs, lineage, self.job
+            )
+            entry = self.cache.lookup(name, key) if key is not None else None
+            if entry is not None:
+                outputs = self.cache.materialize(entry, workdir)
+                with self._lock:
+                    record.cache_key = key
+                    record.outputs = outputs
+                self._print(name, "taken from cache")
+                return "cached"
+
+        # Staged after the cache lookup, writable inputs are copied
+        inputs = self._stage(tool, raw_inputs, workdir)
+        command = self._command(tool, inputs)
+
+        env = dict(os.environ)
+        env_requirement = tool.get("requirements", {}).get("EnvVarRequirement")
+        if env_requirement is not None:
+            env.update({k: str(v) for k, v in env_requirement["envDef"].items()})
+
+        log_fn = Path(self.log_dir or root) / f"{name}.log"
+        log_fn.parent.mkdir(parents=True, exist_ok=True)
+        limit = self.service_limits.get(inputs.get("service"))
+        if limit is not None and not limit.acquire(blocking=False):
+            self._print(name, f"waiting for service {inputs['service']}")
+            limit.acquire()
+        try:
+            self._print(name, "started")
+            record.start = time.perf_counter()
+            with open(log_fn, "w") as log:
+                result = subprocess.run(
+                    command, cwd=workdir, env=env, stdout=log, stderr=subprocess.STDOUT
+                )
+            record.end = time.perf_counter()
+        finally:
+            if limit is not None:
+                limit.release()
+        record.returncode = result.returncode
+        if result.returncode != 0:
+            raise RuntimeError(
+                f"Step {name} failed with exit code {result.returncode}, see {log_fn}"
+            )
+        outputs = self._collect_outputs(tool, inputs, workdir)
+        if self.cache is not None and key is not None:
+            try:
+                self.cache.store(name, key, outputs, workdir, record.duration)
+                record.cache_key = key
+            except OSError as err:
+                self._print(name, f"caching outputs failed: {err}")
+        with self._lock:
+            record.outputs = outputs
+        self._print(name, f"finished in {record.duration:.1f} s")
+        return "done"
+
+    def run(self, outdir: Union[str, os.PathLike] = None) -> WorkflowRun:
+        """Run the workflow.
+
+        Steps are started when all steps they depend on have finished. After a
+        failure no new steps are started, running steps are completed.
+
+        Parameters
+        ----------
+        outdir : Union[str, os.PathLike], optional
+            Folder to copy the workflow outputs to, as cwltool --outdir.
+
+        Returns
+        -------
+        WorkflowRun
+            Step records, workflow outputs and wall time.
+        """
+        records = {
+            name: StepRecord(name=name, depends_on=self.dependencies(name))
+            for name in self.steps
+        }
+        tic = time.perf_counter()
+        tmp = tempfile.mkdtemp(prefix="dt_flood_workflow_", dir=self.tmp_dir)
+        root = Path(tmp)
+        failed = False
+        try:
+            with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+                running = {}
+                while True:
+                    if not failed:
+                        for name, record in records.items():
+                            if record.status == "pending" and all(
+                                records[dep].status in FINISHED
+                                for dep in record.depends_on
+                            ):
+                                record.status = "running"
+                                future = executor.submit(
+                                    self.run_step, name, records, root
+                                )
+                                running[future] = name
+                    if not running:
+                        break
+                    done, _ = wait(running, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        name = running.pop(future)
+                        try:
+                            records[name].status = future.result()
+                        except Exception as err:
+                            self._print(name, str(err))
+                            records[name].status = "failed"
+                            failed = True
+            for record in records.values():
+                if record.status == "pending":
+                    record.status = "cancelled"
+
+            outputs = {}
+            if not failed:
+                for key, spec in self.workflow.get("outputs", {}).items():
+                    step, output = spec["outputSource"].split("/")
+                    outputs[key] = records[step].outputs[output]
+                    if outdir is not None and outputs[key] is not None:
+                        outputs[key] = _copy_output(outputs[key], Path(outdir))
+        finally:
+            if self.tmp_dir is None:
+                shutil.rmtree(tmp, ignore_errors=True)
+
+        return WorkflowRun(
+            steps=records, outputs=outputs, wall_s=time.perf_counter() - tic
+        )
+
+
+def _stage_value(value: dict, target: Path, writable: bool):
+    """Link a File or Directory input into a workdir, or copy it if writable."""
+    if not writable:
+        os.symlink(value["path"], target)
+    elif value["class"] == "Directory":
+        shutil.copytree(value["path"], target)
+    else:
+        shutil.copy2(value["path"], target)
+
+
+def _copy_output(value: dict, outdir: Path) -> dict:
+    """Copy a File or Directory output to a folder, following links."""
+    src = Path(value["path"])
+    dst = outdir / src.name
+    outdir.mkdir(parents=True, exist_ok=True)
+    if value["class"] == "Directory":
+        shutil.copytree(src, dst, dirs_exist_ok=True)
+    else:
+        shutil.copy2(src, dst)
+    return {**value, "path": str(dst)}
@@ -1,16 +1,45 @@
 """Workflow util functions."""
 
+from __future__ import annotations
+
 import os
+import shutil
 import subprocess
+import sys
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from datetime import datetime, timedelta
 from pathlib import Path
-from typing import Union
+from typing import TYPE_CHECKING, Union
 
 import yaml
-from flood_adapt.dbs_classes.interface.database import IDatabase
 
-from DT_flood.utils.fa_scenario_utils import init_scenario
+from DT_flood.utils.fa_scenario_utils import get_database, init_scenario
+from DT_flood.utils.results_store import (
+    link_hazard,
+    link_results,
+    scenario_content_hash,
+    scenario_hazard_key,
+    store_hazard,
+    store_results,
+)
+from DT_flood.utils.step_cache import CACHE_NAME, StepCache
+from DT_flood.utils.warm_states import (
+    find_warm_state,
+    stage_warm_state,
+    store_scenario_states,
+)
+from DT_flood.utils.workflow_executor import WorkflowExecutor, WorkflowRun
 from DT_flood.workflows import SCRIPT_DIR, WORFKFLOW_DIR
 
+if TYPE_CHECKING:
+    import pandas as pd
+    from flood_adapt.dbs_classes.interface.database import IDatabase
+
+# Default maximum number of concurrent jobs per OSCAR service of run_scenarios
+SERVICE_LIMITS = {"wflow": 2, "sfincs": 2, "ra2ce": 2}
+
 
 class quoted(str):
     """Represent string with helper class."""
@@ -32,8 +61,17 @@ def run_scenario(
     oscar_endpoint: str,
     oscar_token: str,
     debug: bool = False,
+    reuse_results: bool = False,
+    reuse_hazard: bool = False,
+    reuse_warm_state: bool = False,
+    warm_state_tolerance: timedelta = timedelta(0),
+    warm_state_max_gap: timedelta = timedelta(0),
+    executor: str = "cwltool",
+    max_workers: int = 4,
+    step_cache: bool = True,
+    cache_max_bytes: int = None,
     **kwargs,
-) -> None:
+) -> Union[WorkflowRun, int, None]:
     """Run FloodAdapt scenario.
 
     Parameters
@@ -42,15 +80,399 @@ def run_scenario(
         FloodAdapt database containing the scenario
     scenario_name : str
         name of scenario to execute
+    reuse_results : bool, optional
+        If True link the results of an earlier scenario with the same content
+        hash instead of running the workflow, and add the results of a new run
+        to the results store. The default is False.
+    reuse_hazard : bool, optional
+        If True run only the impact models when the flood hazard of a scenario
+        with the same hazard key is stored, see results_store.hazard_inputs, and
+        add the flood hazard of a new run to the hazard store. The default is
+        False.
+    reuse_warm_state : bool, optional
+        If True start Wflow from a stored state of an earlier run, see
+        DT_flood.utils.warm_states, and add the states of a new run to the
+        store. The default is False.
+    warm_state_tolerance : timedelta, optional
+        Maximum difference between the event start time and a stored state that
+        replaces the warm-up run. The default is an exact match.
+    warm_state_max_gap : timedelta, optional
+        Maximum length of a warm-up run from the latest earlier stored state.
+        The default is no gap, so only a state within warm_state_tolerance is
+        used.
+    executor : str, optional
+        Workflow executor, 'cwltool' or 'native', see run_fa_scenario_workflow.
+    max_workers : int, optional
+        Maximum number of concurrent steps of the native executor.
+    step_cache : bool, optional
+        If True the native executor reuses cached step outputs.
+    cache_max_bytes : int, optional
+        Size limit of the step cache.
+
+    Returns
+    -------
+    Union[WorkflowRun, int, None]
+        Step timings and outputs of the native executor, or the exit code of
+        cwltool. None if the results were linked from the results store.
     """
+    db, scenario = init_scenario(database, scenario_name)
+    plan = _plan_scenario(
+        db,
+        scenario,
+        reuse_results=reuse_results,
+        reuse_hazard=reuse_hazard,
+        reuse_warm_state=reuse_warm_state,
+        warm_state_tolerance=warm_state_tolerance,
+        warm_state_max_gap=warm_state_max_gap,
+    )
+    if plan is None:
+        return None
+
     create_workflow_config(
         database=database,
         scenario=scenario_name,
         oscar_endpoint=oscar_endpoint,
         oscar_token=oscar_token,
+        inputs=plan["inputs"],
         **kwargs,
     )
-    run_fa_scenario_workflow(database=database, scenario=scenario_name, debug=debug)
+    run = run_fa_scenario_workflow(
+        database=database,
+        scenario=scenario_name,
+        debug=debug,
+        executor=executor,
+        max_workers=max_workers,
+        step_cache=step_cache,
+        cache_max_bytes=cache_max_bytes,
+    )
+    if isinstance(run, WorkflowRun):
+        _finish_scenario(plan, succeeded=run.succeeded)
+    else:
+        _finish_scenario(plan, succeeded=run == 0)
+    return run
+
+
+def _plan_scenario(
+    database,
+    scenario,
+    reuse_results: bool = False,
+    reuse_hazard: bool = False,
+    reuse_warm_state: bool = False,
+    warm_state_tolerance: timedelta = timedelta(0),
+    warm_state_max_gap: timedelta = timedelta(0),
+    content_hash: str = None,
+    hazard_key: str = None,
+) -> Union[dict, None]:
+    """Check the stores for a scenario and select the workflow inputs.
+
+    The content hash and hazard key are computed unless given. Returns None if
+    the results were linked from the results store, else the extra 'inputs' of
+    run_fa_scenario.cwl, which skips the steps whose outputs are reused, what
+    was 'reused', the 'staged' folders to remove after the run, the 'output' the
+    run has to write and the keys to store the outputs under, see
+    _finish_scenario.
+    """
+    results_path = database.database.scenarios.output_path.joinpath(scenario.name)
+    plan = {
+        "database": database,
+        "scenario": scenario,
+        "inputs": {},
+        "reused": None,
+        "staged": [],
+        "content_hash": None,
+        "hazard_key": None,
+        "store_states": reuse_warm_state,
+        "store_warmup": reuse_warm_state,
+        "output": results_path / "Flooding" / f"FloodMap_{scenario.name}.tif",
+        "planned": time.time(),
+    }
+    scenario_dir = database.database.input_path / "scenarios" / scenario.name
+
+    if reuse_results:
+        if content_hash is None:
+            content_hash = scenario_content_hash(database, scenario)
+        print(f"Content hash of scenario {scenario.name}: {content_hash}")
+        if link_results(database, scenario, content_hash):
+            return None
+        plan["content_hash"] = content_hash
+
+    if reuse_hazard:
+        if hazard_key is None:
+            hazard_key = scenario_hazard_key(database, scenario)
+        print(f"Hazard key of scenario {scenario.name}: {hazard_key}")
+        hazard = link_hazard(database, scenario, scenario_dir / "hazard", hazard_key)
+        if hazard is not None:
+            # run_fa_scenario.cwl skips the Wflow and SFINCS steps
+            plan["inputs"] = {
+                "hazard": hazard["flooding_dir"],
+                "hazard_floodmap": hazard["floodmap"],
+                "hazard_waterlevel_map": hazard["waterlevel_map"],
+            }
+            plan["reused"] = "hazard"
+            plan["staged"].append(scenario_dir / "hazard")
+            # The floodmap is copied from the store, only the impacts are new
+            plan["output"] = results_path / "Impacts"
+            # Wflow does not run, so there are no new states either
+            plan["store_states"] = plan["store_warmup"] = False
+            return plan
+        plan["hazard_key"] = hazard_key
+
+    if reuse_warm_state:
+        start_time = database.database.events.get(scenario.event).time.start_time
+        warm_state = find_warm_state(
+            database,
+            start_time,
+            tolerance=warm_state_tolerance,
+            max_gap=warm_state_max_gap,
+        )
+        if warm_state is not None and warm_state.exact:
+            print(f"Reusing Wflow state at {warm_state.time}, skipping warm-up run")
+            state_dir = stage_warm_state(warm_state, scenario_dir / "wflow_state")
+            # run_fa_scenario.cwl skips the Wflow warm-up steps
+            plan["inputs"] = {"warmup_dir": state_dir}
+            plan["reused"] = "warm state"
+            plan["staged"].append(state_dir)
+            plan["store_warmup"] = False
+        elif warm_state is not None:
+            print(f"Running Wflow warm-up from stored state at {warm_state.time}")
+            plan["inputs"] = {
+                "wflow_state": warm_state.path,
+                "wflow_state_time": warm_state.time.isoformat(),
+            }
+    return plan
+
+
+def _written_since(path: Path, since: float) -> bool:
+    """Check whether a file, or any file in a folder, was modified after a time."""
+    files = path.rglob("*") if path.is_dir() else [path]
+    return any(file.is_file() and file.stat().st_mtime >= since for file in files)
+
+
+def _finish_scenario(plan: dict, succeeded: bool = True):
+    """Remove the staged inputs of a run and add its outputs to the stores.
+
+    Outputs are only stored after a successful run that wrote the planned
+    output, so results left over from an earlier run are never stored.
+    """
+    for folder in plan["staged"]:
+        shutil.rmtree(folder, ignore_errors=True)
+
+    database, scenario = plan["database"], plan["scenario"]
+    if not succeeded or not _written_since(plan["output"], plan["planned"]):
+        print(f"No results of scenario {scenario.name} found to store")
+        return
+    if plan["hazard_key"] is not None:
+        store_hazard(database, scenario, plan["hazard_key"])
+    if plan["store_states"]:
+        store_scenario_states(database, scenario, warmup=plan["store_warmup"])
+    if plan["content_hash"] is not None:
+        store_results(database, scenario, plan["content_hash"])
+
+
+def run_scenarios(
+    database: Union[str, os.PathLike],
+    scenario_names: list[str],
+    oscar_endpoint: str,
+    oscar_token: str,
+    max_parallel: int = 2,
+    service_limits: dict[str, int] = None,
+    max_workers: int = 4,
+    step_cache: bool = True,
+    cache_max_bytes: int = None,
+    reuse_results: bool = False,
+    reuse_hazard: bool = False,
+    reuse_warm_state: bool = False,
+    warm_state_tolerance: timedelta = timedelta(0),
+    warm_state_max_gap: timedelta = timedelta(0),
+    **kwargs,
+) -> pd.DataFrame:
+    """Run several FloodAdapt scenarios concurrently with the native executor.
+
+    Scenarios are checked against the stores and configured one at a time in
+    this thread, and their workflows run in a pool of max_parallel workflows. A
+    scenario with the same content hash or hazard key as a running scenario
+    waits until that one has finished, so it can reuse its results. A failed
+    scenario is reported and the other scenarios continue.
+
+    Parameters
+    ----------
+    database : Union[str, os.PathLike]
+        FloodAdapt database containing the scenarios
+    scenario_names : list[str]
+        Names of the scenarios to execute
+    oscar_endpoint : str
+        URL of Oscar endpoint
+    oscar_token : str
+        EGI-SSO refresh token for authentication
+    max_parallel : int, optional
+        Maximum number of concurrent workflows. The default is 2.
+    service_limits : dict[str, int], optional
+        Maximum number of concurrent jobs per OSCAR service ('wflow', 'sfincs'
+        and 'ra2ce') over all workflows. The default is SERVICE_LIMITS.
+    max_workers : int, optional
+        Maximum number of concurrent steps per workflow. The default is 4.
+    step_cache : bool, optional
+        If True cached step outputs are reused, see run_fa_scenario_workflow.
+    cache_max_bytes : int, optional
+        Size limit of the step cache.
+    reuse_results, reuse_hazard, reuse_warm_state : bool, optional
+        Reuse stored outputs of earlier runs, see run_scenario.
+    warm_state_tolerance, warm_state_max_gap : timedelta, optional
+        Selection of stored Wflow states, see run_scenario.
+    **kwargs
+        Passed to create_workflow_config.
+
+    Returns
+    -------
+    pd.DataFrame
+        Per scenario the status ('done', 'linked' or 'failed'), exit code, the
+        stored outputs the run reused ('hazard' or 'warm state'), start time,
+        duration in seconds, failed step and error.
+    """
+    import pandas as pd
+
+    if service_limits is None:
+        service_limits = SERVICE_LIMITS
+    semaphores = {}
+    for service, limit in service_limits.items():
+        # Interlink services offload the same models
+        semaphores[service] = semaphores[f"{service}-interlink"] = threading.Semaphore(
+            limit
+        )
+    cache = None
+    if step_cache:
+        base_path = get_database(database).database.base_path
+        cache = StepCache(base_path / CACHE_NAME, max_bytes=cache_max_bytes)
+
+    rows = []
+
+    def _report(name: str, start: datetime, **row):
+        row = {
+            "scenario": name,
+            "start": start,
+            "duration_s": (datetime.now() - start).total_seconds(),
+            **row,
+        }
+        rows.append(row)
+        print(
+            f"[{len(rows)}/{len(scenario_names)}] Scenario {name} {row['status']} "
+            f"in {row['duration_s']:.1f} s (exit code {row['exit_code']})"
+        )
+
+    # Keys of the stored outputs each scenario can reuse
+    keys = {}
+    for name in scenario_names:
+        start = datetime.now()
+        try:
+            db, scenario = init_scenario(database, name)
+            keys[name] = {
+                "content_hash": scenario_content_hash(db, scenario)
+                if reuse_results
+                else None,
+                "hazard_key": scenario_hazard_key(db, scenario)
+                if reuse_hazard
+                else None,
+            }
+        except Exception as err:
+            _report(name, start, status="failed", exit_code=1, error=str(err))
+
+    def _busy_keys(name: str) -> set:
+        return {key for key in keys[name].values() if key is not None}
+
+    pending = [name for name in scenario_names if name in keys]
+    running = {}
+    with ThreadPoolExecutor(max_workers=max_parallel) as pool:
+        while pending or running:
+            busy = set().union(*(_busy_keys(name) for name, _, _ in running.values()))
+            for name in list(pending):
+                if len(running) >= max_parallel:
+                    break
+                if _busy_keys(name) & busy:
+                    continue
+                pending.remove(name)
+                start = datetime.now()
+                try:
+                    db, scenario = init_scenario(database, name)
+                    plan = _plan_scenario(
+                        db,
+                        scenario,
+                        reuse_results=reuse_results,
+                        reuse_hazard=reuse_hazard,
+                        reuse_warm_state=reuse_warm_state,
+                        warm_state_tolerance=warm_state_tolerance,
+                        warm_state_max_gap=warm_state_max_gap,
+                        **keys[name],
+                    )
+                    if plan is None:
+                        _report(name, start, status="linked", exit_code=0)
+                        continue
+                    create_workflow_config(
+                        database=db,
+                        scenario=name,
+                        oscar_endpoint=oscar_endpoint,
+                        oscar_token=oscar_token,
+                        inputs=plan["inputs"],
+                        **kwargs,
+                    )
+                except Exception as err:
+                    _report(name, start, status="failed", exit_code=1, error=str(err))
+                    continue
+                reused = f" with stored {plan['reused']}" if plan["reused"] else ""
+                print(f"Starting scenario {name}{reused}")
+                future = pool.submit(
+                    run_fa_scenario_workflow,
+                    database=db,
+                    scenario=name,
+                    executor="native",
+                    max_workers=max_workers,
+                    step_cache=cache or False,
+                    service_limits=semaphores,
+                    label=name,
+                )
+                running[future] = (name, plan, start)
+                busy |= _busy_keys(name)
+
+            if not running:
+                continue
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                name, plan, start = running.pop(future)
+                row = {"reused": plan["reused"]}
+                try:
+                    run = future.result()
+                except Exception as err:
+                    _finish_scenario(plan, succeeded=False)
+                    _report(name, start, status="failed", exit_code=1, error=str(err))
+                    continue
+                row["status"] = "done" if run.succeeded else "failed"
+                row["exit_code"] = 0
+                for step in run.steps.values():
+                    if step.status == "failed":
+                        row["failed_step"] = step.name
+                        row["exit_code"] = step.returncode or 1
+                        break
+                try:
+                    _finish_scenario(plan, succeeded=run.succeeded)
+                except Exception as err:
+                    print(f"Storing the outputs of scenario {name} failed: {err}")
+                _report(name, start, **row)
+
+    if cache is not None:
+        print(cache.report())
+    columns = [
+        "scenario",
+        "status",
+        "exit_code",
+        "reused",
+        "start",
+        "duration_s",
+        "failed_step",
+        "error",
+    ]
+    rows.sort(key=lambda row: scenario_names.index(row["scenario"]))
+    results = pd.DataFrame(rows, columns=columns)
+    print(results.to_string(index=False))
+    return results
 
 
 def create_workflow_config(
@@ -62,6 +484,7 @@ def create_workflow_config(
     script_folder: Union[str, os.PathLike] = SCRIPT_DIR,
     oscar_output: str = "output",
     interlink_offload: bool = False,
+    inputs: dict = None,
 ) -> None:
     """Write Config file for CWL workflow to FloodAdapt database.
 
@@ -83,6 +506,9 @@ def create_workflow_config(
         Name of output folder in Oscar
     interlink_offlaoad : bool, optional
         If True, use Oscar interlink service for offloading
+    inputs : dict, optional
+        Values of further workflow inputs, as Path for File and Directory inputs.
+        Optional inputs that are not given are set to null.
     """
     # Parse inputs
     if isinstance(database, str) or isinstance(database, Path):
@@ -140,6 +566,20 @@ def create_workflow_config(
         quoted("ra2ce-interlink") if interlink_offload else quoted("ra2ce")
     )
 
+    with open(cwl_workflow, "r") as f:
+        workflow_inputs = yaml.safe_load(f)["inputs"]
+    for key, input_type in workflow_inputs.items():
+        if str(input_type).endswith("?"):
+            cwl_config[key] = None
+    for key, value in (inputs or {}).items():
+        if isinstance(value, Path):
+            cwl_config[key] = {
+                "class": "Directory" if value.is_dir() else "File",
+                "path": quoted(str(value)),
+            }
+        else:
+            cwl_config[key] = quoted(value)
+
     print(f"Write Config file {config_fn} to folder {config_fn}")
     with open(config_fn, "w+") as f:
         yaml.dump(cwl_config, f, default_flow_style=False, sort_keys=True)
@@ -149,18 +589,50 @@ def run_fa_scenario_workflow(
     database: Union[str, os.PathLike, IDatabase],
     scenario: str,
     debug: bool = False,
-) -> None:
+    executor: str = "cwltool",
+    max_workers: int = 4,
+    step_cache: Union[bool, StepCache] = True,
+    cache_max_bytes: int = None,
+    service_limits: dict[str, threading.Semaphore] = None,
+    label: str = None,
+) -> Union[WorkflowRun, int]:
     """Execute FloodAdapt scenario.
 
-    Path to CWL workflow description is hardcoded relative to database location.
-
     Parameters
     ----------
     database : Union[str, os.PathLike, IDatabase]
         FloodAdapt database being used
     scenario : str
         Name of scenario to execute
+    executor : str, optional
+        'cwltool' to run the steps one after another with cwltool, or 'native'
+        to run independent steps in parallel in this process. The default is
+        'cwltool'.
+    max_workers : int, optional
+        Maximum number of concurrent steps of the native executor. The default
+        is 4.
+    step_cache : Union[bool, StepCache], optional
+        If True the native executor takes the outputs of steps whose inputs are
+        unchanged from the step cache in the database folder, see
+        DT_flood.utils.step_cache. A StepCache can be passed to share it between
+        runs. The default is True.
+    cache_max_bytes : int, optional
+        Size above which the least recently used cache entries are evicted. By
+        default the cache is not limited.
+    service_limits : dict[str, threading.Semaphore], optional
+        Semaphores limiting the concurrent jobs per OSCAR service of the native
+        executor, see WorkflowExecutor.
+    label : str, optional
+        Prefix of the progress messages of the native executor.
+
+    Returns
+    -------
+    Union[WorkflowRun, int]
+        Step timings and outputs of the native executor, or the exit code of
+        cwltool.
     """
+    if executor not in ["cwltool", "native"]:
+        raise ValueError(f"Executor {executor} not valid, choose 'cwltool' or 'native'")
     if isinstance(database, str) or isinstance(database, Path):
         database, _ = init_scenario(database, scenario)
 
@@ -170,6 +642,30 @@ def run_fa_scenario_workflow(
     config_fn = (
         database.input_path / "scenarios" / scenario / f"cwl_config_{scenario}.yml"
     )
+    if executor == "native":
+        cache = None
+        if isinstance(step_cache, StepCache):
+            cache = step_cache
+        elif step_cache:
+            cache = StepCache(
+                database.base_path / CACHE_NAME, max_bytes=cache_max_bytes
+            )
+        print(f"Executing workflow of scenario {scenario}")
+        run = WorkflowExecutor(
+            workflow_fn,
+            config_fn,
+            max_workers=max_workers,
+            log_dir=database.input_path / "scenarios" / scenario / "logs",
+            cache=cache,
+            service_limits=service_limits,
+            label=label,
+        ).run(outdir=database.base_path)
+        print(run.report())
+        # A shared cache is reported by its owner
+        if cache is not None and cache is not step_cache:
+            print(cache.report())
+        return run
+
     cmd_validate = f'cwltool --validate "{str(workflow_fn)}" "{str(config_fn)}"'
     print("Validating workflow")
     print(f"Running {cmd_validate}")
@@ -180,10 +676,22 @@ def run_fa_scenario_workflow(
         database.input_path / "scenarios" / scenario / f"log_workflow_{scenario}.txt"
     )
 
+    cmd_run = ["cwltool", "--outdir", str(database.base_path)]
     if debug:
-        cmd_run = f"cwltool --outdir {str(database.base_path)} --cachedir {database.base_path.joinpath('cachedir').as_posix()} {str(workflow_fn)} {str(config_fn)} | tee {str(logfile)}"
-    else:
-        cmd_run = f"cwltool --outdir {str(database.base_path)} {str(workflow_fn)} {str(config_fn)} | tee {str(logfile)}"
+        cmd_run += ["--cachedir", database.base_path.joinpath("cachedir").as_posix()]
+    cmd_run += [str(workflow_fn), str(config_fn)]
     print("Executing workflow")
-    print(f"Running {cmd_run}")
-    subprocess.run(cmd_run, shell=True)
+    print(f"Running {' '.join(cmd_run)}")
+    # Copy the output to the log file ourselves, a shell pipe to tee would hide
+    # the exit code of cwltool
+    with open(logfile, "w") as log:
+        process = subprocess.Popen(
+            cmd_run, stdout=subprocess.PIPE, stderr=subprocess.STDOUT, text=True
+        )
+        for line in process.stdout:
+            sys.stdout.write(line)
+            log.write(line)
+        returncode = process.wait()
+    if returncode != 0:
+        print(f"Workflow of scenario {scenario} failed with exit code {returncode}")
+    return returncode
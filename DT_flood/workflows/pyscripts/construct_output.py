@@ -14,18 +14,14 @@ parser.add_argument("--fiatdir")
 parser.add_argument("--ra2cedir")
 parser.add_argument("--floodmap")
 parser.add_argument("--waterlevels")
+parser.add_argument("--flooding")
 
 args = parser.parse_args()
 
 output = Path(args.output)
 scenario = args.scenario
-sfincsdir = Path(args.sfincsdir) / "data"
-wflowwarmup = Path(args.wflowwarmup) / "model"
-wflowevent = Path(args.wflowevent) / "model"
 fiatdir = Path(args.fiatdir)
 ra2cedir = Path(args.ra2cedir) / "data"
-floodmap = Path(args.floodmap)
-waterlevels = Path(args.waterlevels)
 
 scenario_out_dir = output / "scenarios" / scenario
 flooding_dir = scenario_out_dir / "Flooding"
@@ -39,20 +35,37 @@ if not impact_dir.exists():
 print(f"Copying FIAT out from {fiatdir} to {scenario_out_dir}")
 copytree(fiatdir, scenario_out_dir, dirs_exist_ok=True)
 
-print(f"Copying SFINCS dir from {sfincsdir} to {flooding_dir}")
-copytree(sfincsdir, flooding_dir / "overland", dirs_exist_ok=True)
+# Flooding of a stored hazard, the Wflow and SFINCS steps did not run
+if args.flooding is not None:
+    flooding = Path(args.flooding)
+    print(f"Copying reused flooding from {flooding} to {flooding_dir}")
+    copytree(flooding, flooding_dir, dirs_exist_ok=True)
 
-print(f"Copying WFLOW warmup from {wflowwarmup} to {flooding_dir}")
-copytree(wflowwarmup, flooding_dir / "wflow_warmup", dirs_exist_ok=True)
+if args.sfincsdir is not None:
+    sfincsdir = Path(args.sfincsdir) / "data"
+    print(f"Copying SFINCS dir from {sfincsdir} to {flooding_dir}")
+    copytree(sfincsdir, flooding_dir / "overland", dirs_exist_ok=True)
 
-print(f"Copying WFLOW event from {wflowevent} to {flooding_dir}")
-copytree(wflowevent, flooding_dir / "wflow_event", dirs_exist_ok=True)
+# No warm-up run when it started from a stored state
+if args.wflowwarmup is not None:
+    wflowwarmup = Path(args.wflowwarmup) / "model"
+    print(f"Copying WFLOW warmup from {wflowwarmup} to {flooding_dir}")
+    copytree(wflowwarmup, flooding_dir / "wflow_warmup", dirs_exist_ok=True)
 
-print(f"Copying floodmap from {floodmap} to {flooding_dir}")
-copy(floodmap, flooding_dir / floodmap.name)
+if args.wflowevent is not None:
+    wflowevent = Path(args.wflowevent) / "model"
+    print(f"Copying WFLOW event from {wflowevent} to {flooding_dir}")
+    copytree(wflowevent, flooding_dir / "wflow_event", dirs_exist_ok=True)
 
-print(f"Copying waterlevels from {waterlevels} to {flooding_dir}")
-copy(waterlevels, flooding_dir / waterlevels.name)
+if args.floodmap is not None:
+    floodmap = Path(args.floodmap)
+    print(f"Copying floodmap from {floodmap} to {flooding_dir}")
+    copy(floodmap, flooding_dir / floodmap.name)
+
+if args.waterlevels is not None:
+    waterlevels = Path(args.waterlevels)
+    print(f"Copying waterlevels from {waterlevels} to {flooding_dir}")
+    copy(waterlevels, flooding_dir / waterlevels.name)
 
 print(f"Copying RA2CE dir from {ra2cedir} to {impact_dir}")
 copytree(ra2cedir, impact_dir / "ra2ce", dirs_exist_ok=True)
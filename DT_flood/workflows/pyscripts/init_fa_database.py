@@ -8,6 +8,7 @@ from shutil import rmtree
 from flood_adapt.misc.utils import write_finished_file
 
 from DT_flood.utils.fa_scenario_utils import init_scenario
+from DT_flood.utils.scenario_manifest import write_scenario_manifest
 
 parser = argparse.ArgumentParser()
 parser.add_argument("--input")
@@ -30,4 +31,8 @@ if results_path.exists():
 print(f"Creating output folder at {results_path}")
 makedirs(results_path)
 
+# Later steps read the scenario from this manifest instead of the database
+manifest_fn = write_scenario_manifest(database, scenario, results_path)
+print(f"Wrote scenario manifest to {manifest_fn}")
+
 write_finished_file(results_path)
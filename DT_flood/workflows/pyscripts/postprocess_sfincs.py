@@ -8,13 +8,14 @@ import xarray as xr
 from hydromt.log import setuplog
 from hydromt_sfincs import SfincsModel
 
-from DT_flood.utils.fa_scenario_utils import init_scenario
+from DT_flood.utils.scenario_manifest import get_scenario_manifest
 
 parser = argparse.ArgumentParser()
 parser.add_argument("--input")
 parser.add_argument("--static")
 parser.add_argument("--scenario")
 parser.add_argument("--sfincsdir")
+parser.add_argument("--output")
 
 args = parser.parse_args()
 
@@ -25,10 +26,9 @@ scenario_name = args.scenario
 database_root = Path(args.input).parent
 sf_root = Path(args.sfincsdir) / "data"
 
-# Fetch FA database, misc
-database, scenario = init_scenario(database_root, scenario_name)
-database = database.database
-demfile = database.static_path / "dem" / database.site.sfincs.dem.filename
+# Fetch scenario manifest, misc
+manifest = get_scenario_manifest(database_root, scenario_name, output_dir=args.output)
+demfile = manifest.path("static") / "dem" / manifest.site["sfincs_dem"]
 floodmap_fn = f"FloodMap_{scenario_name}.tif"
 zsmax_fn = "max_water_level_map.nc"
 
@@ -8,13 +8,15 @@ from shutil import copy
 from hydromt.log import setuplog
 from hydromt_wflow import WflowModel
 
-from DT_flood.utils.fa_scenario_utils import init_scenario
+from DT_flood.utils.forcing.zarr_store import get_forcing_sources
+from DT_flood.utils.scenario_manifest import get_scenario_manifest
 
 parser = argparse.ArgumentParser()
 parser.add_argument("--input")
 parser.add_argument("--static")
 parser.add_argument("--scenario")
 parser.add_argument("--warmup_dir")
+parser.add_argument("--output")
 
 args = parser.parse_args()
 
@@ -26,17 +28,14 @@ database_root = Path(args.input).parent
 warmup_dir = Path(args.warmup_dir) / "model"
 warmup_states = warmup_dir / "run_default" / "outstate" / "outstates.nc"
 
-# unpack FA database, scenario, event description
-database, scenario = init_scenario(database_root, scenario_name)
-database = database.database
+# unpack scenario manifest written by the init step
+manifest = get_scenario_manifest(database_root, scenario_name, output_dir=args.output)
 
-results_path = database.scenarios.output_path.joinpath(scenario.name)
+results_path = manifest.path("results")
+event_dir = manifest.path("event")
 
-event = database.events.get(scenario.event)
-event_dir = database.input_path / "events" / scenario.event
 
-
-wflow_root = database.static_path / "templates" / "wflow"
+wflow_root = manifest.path("static") / "templates" / "wflow"
 wf = WflowModel(
     root=wflow_root,
     data_libs=[],
@@ -45,8 +44,15 @@ wf = WflowModel(
 )
 wf.read()
 
-starttime = event.time.start_time
-endtime = event.time.end_time
+# NetCDF files or sources in the Zarr store of the event
+sources = get_forcing_sources(
+    event_dir,
+    forcings=["precip_event", "pet_event", "orography"],
+    data_catalog=wf.data_catalog,
+)
+
+starttime = manifest.start_time
+endtime = manifest.end_time
 opt = {
     "setup_config": {
         "starttime": datetime.strftime(starttime, "%Y-%m-%dT%H:%M:%S"),
@@ -59,16 +65,16 @@ opt = {
 
 forcing_config = {
     "setup_precip_forcing": {
-        "precip_fn": (event_dir / "precip_event.nc").as_posix(),
+        "precip_fn": sources["precip_event"],
         "precip_clim_fn": None,
     },
     "setup_temp_pet_forcing": {
-        "temp_pet_fn": (event_dir / "pet_event.nc").as_posix(),
+        "temp_pet_fn": sources["pet_event"],
         "press_correction": True,
         "temp_correction": True,
         "pet_method": "debruin",
         "skip_pet": False,
-        "dem_forcing_fn": (event_dir / "orography.nc").as_posix(),
+        "dem_forcing_fn": sources["orography"],
     },
 }
 opt.update(forcing_config)
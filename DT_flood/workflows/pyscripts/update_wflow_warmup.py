@@ -3,16 +3,21 @@
 import argparse
 from datetime import datetime, timedelta
 from pathlib import Path
+from shutil import copy
 
 from hydromt.log import setuplog
 from hydromt_wflow import WflowModel
 
-from DT_flood.utils.fa_scenario_utils import init_scenario
+from DT_flood.utils.forcing.zarr_store import get_forcing_sources
+from DT_flood.utils.scenario_manifest import get_scenario_manifest
 
 parser = argparse.ArgumentParser()
 parser.add_argument("--input")
 parser.add_argument("--static")
 parser.add_argument("--scenario")
+parser.add_argument("--output")
+parser.add_argument("--instate")
+parser.add_argument("--starttime")
 
 args = parser.parse_args()
 
@@ -22,18 +27,14 @@ logger = setuplog("update_wflow", log_level=10)
 scenario_name = args.scenario
 database_root = Path(args.input).parent
 
-# unpack FA database, scenario, event description
-database, scenario = init_scenario(database_root, scenario_name)
-database = database.database
+# unpack scenario manifest written by the init step
+manifest = get_scenario_manifest(database_root, scenario_name, output_dir=args.output)
 
-results_path = database.scenarios.output_path.joinpath(scenario.name)
-
-
-event = database.events.get(scenario.event)
-event_dir = database.input_path / "events" / scenario.event
+results_path = manifest.path("results")
+event_dir = manifest.path("event")
 
 # wflow template model
-wflow_root = database.static_path / "templates" / "wflow"
+wflow_root = manifest.path("static") / "templates" / "wflow"
 wf = WflowModel(
     root=wflow_root,
     data_libs=[],
@@ -42,32 +43,44 @@ wf = WflowModel(
 )
 wf.read()
 
+# NetCDF files or sources in the Zarr store of the event
+sources = get_forcing_sources(
+    event_dir,
+    forcings=["precip_warmup", "pet_warmup", "orography"],
+    data_catalog=wf.data_catalog,
+)
+
 print("Updating WFlow model for warmup run")
-endtime = event.time.start_time
+endtime = manifest.start_time
 starttime = endtime - timedelta(days=365)
+# Fill the gap from a stored warm state instead of a full warmup run
+reinit = args.instate is None
+if not reinit:
+    starttime = datetime.fromisoformat(args.starttime)
+    print(f"Starting warmup from stored state at {starttime}")
 
 opt = {
     "setup_config": {
         "starttime": datetime.strftime(starttime, "%Y-%m-%dT%H:%M:%S"),
         "endtime": datetime.strftime(endtime, "%Y-%m-%dT%H:%M:%S"),
         "timestepsecs": 86400,
-        "model.reinit": True,
+        "model.reinit": reinit,
         "input.path_static": "./staticmaps.nc",
     },
 }
 
 forcing_config = {
     "setup_precip_forcing": {
-        "precip_fn": (event_dir / "precip_warmup.nc").as_posix(),
+        "precip_fn": sources["precip_warmup"],
         "precip_clim_fn": None,
     },
     "setup_temp_pet_forcing": {
-        "temp_pet_fn": (event_dir / "pet_warmup.nc").as_posix(),
+        "temp_pet_fn": sources["pet_warmup"],
         "press_correction": True,
         "temp_correction": True,
         "pet_method": "debruin",
         "skip_pet": False,
-        "dem_forcing_fn": (event_dir / "orography.nc").as_posix(),
+        "dem_forcing_fn": sources["orography"],
     },
 }
 opt.update(forcing_config)
@@ -76,3 +89,8 @@ wf_warmup_root = results_path / "Flooding" / "simulations" / "wflow_warmup"
 wf.set_root(wf_warmup_root, mode="w+")
 wf.update(wf_warmup_root, opt=opt, write=False)
 wf.write()
+
+if not reinit:
+    instates = wf_warmup_root / "instate" / "instates.nc"
+    instates.parent.mkdir(parents=True, exist_ok=True)
+    copy(args.instate, instates)
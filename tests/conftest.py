@@ -0,0 +1,131 @@
+import pytest
+
+from DT_flood.utils.forcing.clients import set_rucio_backend
+from DT_flood.utils.forcing.local_backend import LocalDownloadClient, LocalRucioClient
+
+
+@pytest.fixture
+def rucio_root(tmp_path, monkeypatch):
+    """Local Rucio scope 'wtromp' with a dataset of two files and a static file."""
+    monkeypatch.setenv("DT_FLOOD_MANIFEST_DIR", str(tmp_path / "manifests"))
+    monkeypatch.delenv("DT_FLOOD_OFFLINE", raising=False)
+    root = tmp_path / "rucio"
+    dataset = root / "wtromp" / "era5"
+    dataset.mkdir(parents=True)
+    (dataset / "era5_precip_2020_1.nc").write_bytes(b"january" * 100)
+    (dataset / "era5_precip_2020_2.nc").write_bytes(b"february" * 100)
+    (root / "wtromp" / "elevtn.nc").write_bytes(b"elevation" * 100)
+    return root
+
+
+class CountingRucioClient(LocalRucioClient):
+    """Local Rucio client counting the calls to its methods."""
+
+    def __init__(self, root):
+        super().__init__(root)
+        self.calls = {}
+
+    def _count(self, name: str):
+        self.calls[name] = self.calls.get(name, 0) + 1
+
+    def list_dids(self, *args, **kwargs):
+        self._count("list_dids")
+        return super().list_dids(*args, **kwargs)
+
+    def get_metadata(self, *args, **kwargs):
+        self._count("get_metadata")
+        return super().get_metadata(*args, **kwargs)
+
+    def list_content(self, *args, **kwargs):
+        self._count("list_content")
+        return super().list_content(*args, **kwargs)
+
+
+@pytest.fixture
+def rucio_client(rucio_root):
+    return CountingRucioClient(rucio_root)
+
+
+@pytest.fixture
+def local_backend(rucio_root):
+    """Serve the Rucio client pools from the local scope."""
+    set_rucio_backend(
+        client_factory=lambda: LocalRucioClient(rucio_root),
+        download_client_factory=lambda: LocalDownloadClient(rucio_root),
+    )
+    yield
+    set_rucio_backend()
+
+
+class FloodAdaptObject:
+    """Stand-in for a FloodAdapt object with attributes."""
+
+    def __init__(self, **attrs):
+        self.__dict__.update(attrs)
+
+    def model_dump(self, mode: str = None) -> dict:
+        return dict(self.__dict__)
+
+
+class Objects(dict):
+    """Stand-in for a FloodAdapt object collection, looked up with get."""
+
+
+@pytest.fixture
+def database(tmp_path) -> FloodAdaptObject:
+    """Database with an event, a projection and a floodwall and elevation measure."""
+    for folder in [
+        "input/events/event",
+        "input/projections/projection",
+        "input/measures/floodwall",
+        "input/measures/elevate",
+        "input/measures/elevate_more",
+        "static/templates/sfincs",
+        "static/templates/fiat",
+        "static/config",
+    ]:
+        (tmp_path / folder).mkdir(parents=True)
+    (tmp_path / "input/events/event/event.toml").write_text("name = 'event'")
+    (tmp_path / "input/events/event/waterlevel.nc").write_text("waterlevel")
+    (tmp_path / "input/measures/floodwall/floodwall.geojson").write_text("wall")
+    (tmp_path / "static/templates/sfincs/sfincs.inp").write_text("sfincs")
+    (tmp_path / "static/templates/fiat/settings.toml").write_text("fiat")
+    measures = {
+        "floodwall": FloodAdaptObject(name="floodwall", type="floodwall", height=2),
+        "elevate": FloodAdaptObject(name="elevate", type="elevate_properties", h=1),
+        "elevate_more": FloodAdaptObject(
+            name="elevate_more", type="elevate_properties", h=2
+        ),
+    }
+    strategies = {
+        "wall": FloodAdaptObject(name="wall", measures=["floodwall"]),
+        "wall_elevate": FloodAdaptObject(
+            name="wall_elevate", measures=["floodwall", "elevate"]
+        ),
+        "wall_elevate_more": FloodAdaptObject(
+            name="wall_elevate_more", measures=["floodwall", "elevate_more"]
+        ),
+    }
+    db = FloodAdaptObject(
+        input_path=tmp_path / "input",
+        static_path=tmp_path / "static",
+        output_path=tmp_path / "output",
+        events=Objects(event=FloodAdaptObject(name="event", rain=1.0)),
+        projections=Objects(projection=FloodAdaptObject(name="projection", slr=0)),
+        measures=Objects(measures),
+        strategies=Objects(strategies),
+        scenarios=FloodAdaptObject(output_path=tmp_path / "output" / "scenarios"),
+    )
+    return FloodAdaptObject(database=db)
+
+
+@pytest.fixture
+def make_scenario():
+    """Create scenarios of the event and projection in the database fixture."""
+
+    def _make(name: str, strategy: str = "wall") -> FloodAdaptObject:
+        return FloodAdaptObject(
+            name=name, event="event", projection="projection", strategy=strategy
+        )
+
+    return _make
@@ -0,0 +1,78 @@
+import time
+
+from DT_flood.utils.forcing import cache as cache_module
+from DT_flood.utils.forcing.cache import ForcingCache, get_default_cache
+
+
+def _file(path, size: int):
+    path.write_bytes(b"x" * size)
+    return path
+
+
+def test_put_and_get(tmp_path):
+    cache = ForcingCache(tmp_path / "cache")
+    assert cache.get("wtromp:a.nc", "0001") is None
+    cached = cache.put("wtromp:a.nc", _file(tmp_path / "a.nc", 10), checksum="0001")
+    assert not (tmp_path / "a.nc").exists()
+    assert cached.name == "a.nc"
+    assert cache.get("wtromp:a.nc", "0001") == cached
+    # a different checksum is a different file
+    assert cache.get("wtromp:a.nc", "0002") is None
+    stats = cache.stats()
+    assert (stats["hits"], stats["misses"], stats["files"]) == (1, 2, 1)
+    assert stats["size"] == stats["bytes_added"] == 10
+
+
+def test_persistent_across_instances(tmp_path):
+    source = _file(tmp_path / "a.nc", 10)
+    ForcingCache(tmp_path / "cache").put("wtromp:a.nc", source, keep_source=True)
+    assert source.exists()
+    assert ForcingCache(tmp_path / "cache").contains("wtromp:a.nc")
+
+
+def test_missing_object_is_a_miss(tmp_path):
+    cache = ForcingCache(tmp_path / "cache")
+    cache.put("wtromp:a.nc", _file(tmp_path / "a.nc", 10)).unlink()
+    assert cache.get("wtromp:a.nc") is None
+    assert cache.stats()["files"] == 0
+
+
+def test_evicts_least_recently_used(tmp_path, monkeypatch):
+    monkeypatch.setattr(cache_module, "EVICTION_GRACE_SECONDS", 0)
+    cache = ForcingCache(tmp_path / "cache", max_size_gb=25e-9)
+    for name in ["a", "b"]:
+        cache.put(f"wtromp:{name}.nc", _file(tmp_path / f"{name}.nc", 10))
+        time.sleep(0.01)
+    assert cache.get("wtromp:a.nc") is not None
+    time.sleep(0.01)
+    cache.put("wtromp:c.nc", _file(tmp_path / "c.nc", 10))
+    assert cache.contains("wtromp:a.nc")
+    assert not cache.contains("wtromp:b.nc")
+    assert cache.contains("wtromp:c.nc")
+    assert cache.stats()["evictions"] == 1
+
+
+def test_recently_read_files_are_kept(tmp_path):
+    cache = ForcingCache(tmp_path / "cache", max_size_gb=15e-9)
+    cache.put("wtromp:a.nc", _file(tmp_path / "a.nc", 10))
+    cache.put("wtromp:b.nc", _file(tmp_path / "b.nc", 10))
+    assert cache.contains("wtromp:a.nc")
+    assert cache.stats()["size"] == 20
+
+
+def test_clear(tmp_path):
+    cache = ForcingCache(tmp_path / "cache")
+    cached = cache.put("wtromp:a.nc", _file(tmp_path / "a.nc", 10))
+    cache.clear()
+    assert not cached.exists()
+    assert cache.stats()["files"] == 0
+
+
+def test_default_cache(tmp_path, monkeypatch):
+    monkeypatch.setenv("DT_FLOOD_CACHE_DIR", str(tmp_path / "cache"))
+    monkeypatch.setenv("DT_FLOOD_CACHE_SIZE_GB", "1")
+    cache = get_default_cache()
+    assert cache.root == tmp_path / "cache"
+    assert cache.max_size == int(1e9)
+    monkeypatch.setenv("DT_FLOOD_CACHE_DIR", "")
+    assert get_default_cache() is None
@@ -0,0 +1,55 @@
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from DT_flood.utils.forcing.catalogue import (
+    _read_catalogue,
+    get_file_metadata,
+    invalidate_catalogue,
+    load_catalogue,
+)
+
+
+def test_catalogue_is_stored(rucio_client):
+    assert load_catalogue(rucio_client=rucio_client) == {
+        "era5": {"bytes": 1500, "length": 2}
+    }
+    load_catalogue(rucio_client=rucio_client)
+    assert rucio_client.calls["list_dids"] == 1
+    load_catalogue(rucio_client=rucio_client, ttl_hours=0)
+    assert rucio_client.calls["list_dids"] == 2
+
+
+def test_file_metadata_expires(rucio_client):
+    meta = get_file_metadata("elevtn.nc", rucio_client=rucio_client)
+    assert meta["bytes"] == 900
+    get_file_metadata("elevtn.nc", rucio_client=rucio_client)
+    assert rucio_client.calls["get_metadata"] == 1
+    get_file_metadata("elevtn.nc", rucio_client=rucio_client, ttl_hours=0)
+    assert rucio_client.calls["get_metadata"] == 2
+    # stale metadata is still used offline
+    get_file_metadata("elevtn.nc", rucio_client=rucio_client, ttl_hours=0, offline=True)
+    assert rucio_client.calls["get_metadata"] == 2
+
+
+def test_file_metadata_is_invalidated(rucio_client):
+    get_file_metadata("elevtn.nc", rucio_client=rucio_client)
+    load_catalogue(rucio_client=rucio_client, refresh=True)
+    assert _read_catalogue("wtromp")["files"] == {}
+
+    get_file_metadata("elevtn.nc", rucio_client=rucio_client)
+    invalidate_catalogue()
+    with pytest.raises(FileNotFoundError):
+        get_file_metadata("elevtn.nc", rucio_client=rucio_client, offline=True)
+
+
+def test_concurrent_metadata_writes(rucio_client):
+    names = ["elevtn.nc", "era5_precip_2020_1.nc", "era5_precip_2020_2.nc"]
+    with ThreadPoolExecutor(max_workers=3) as pool:
+        list(
+            pool.map(
+                lambda name: get_file_metadata(name, rucio_client=rucio_client),
+                names * 4,
+            )
+        )
+    assert sorted(_read_catalogue("wtromp")["files"]) == names
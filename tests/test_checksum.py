@@ -0,0 +1,102 @@
+import zlib
+from pathlib import Path
+
+import pytest
+
+from DT_flood.utils.forcing import download as download_module
+from DT_flood.utils.forcing.checksum import file_checksums, verify_file
+from DT_flood.utils.forcing.download import download_files
+from DT_flood.utils.forcing.local_backend import LocalDownloadClient, LocalRucioClient
+
+DID = "wtromp:era5_precip_2020_1.nc"
+
+
+class CorruptingDownloadClient(LocalDownloadClient):
+    """Local download client truncating the first downloads."""
+
+    def __init__(self, root, n_corrupt: int = 1):
+        super().__init__(root)
+        self.n_corrupt = n_corrupt
+        self.downloads = 0
+
+    def download_dids(self, items):
+        results = super().download_dids(items)
+        self.downloads += 1
+        if self.downloads <= self.n_corrupt:
+            scope, name = items[0]["did"].split(":")
+            path = Path(items[0]["base_dir"], scope, name)
+            path.write_bytes(path.read_bytes()[:-1] + b"?")
+        return results
+
+
+@pytest.fixture(autouse=True)
+def no_backoff(monkeypatch):
+    monkeypatch.setattr(download_module.time, "sleep", lambda seconds: None)
+
+
+@pytest.fixture
+def metadata(rucio_root):
+    scope, name = DID.split(":")
+    return {DID: LocalRucioClient(rucio_root).get_metadata(scope, name)}
+
+
+def test_file_checksums(tmp_path):
+    path = tmp_path / "file.nc"
+    path.write_bytes(b"forcing" * 10**6)
+    checksums = file_checksums(path, adler32=True, md5=True)
+    assert checksums["adler32"] == f"{zlib.adler32(b'forcing' * 10**6):08x}"
+    assert len(checksums["md5"]) == 32
+
+
+def test_verify_file(tmp_path, metadata):
+    meta = metadata[DID]
+    path = tmp_path / "file.nc"
+    path.write_bytes(b"january" * 100)
+    assert verify_file(path, meta)
+    assert verify_file(path, {**meta, "adler32": None})
+    path.write_bytes(b"january" * 99 + b"januarY")
+    assert not verify_file(path, meta)
+    assert not verify_file(path, {**meta, "adler32": None})
+    path.write_bytes(b"january")
+    assert not verify_file(path, {"bytes": meta["bytes"]})
+    assert not verify_file(tmp_path / "missing.nc", meta)
+
+
+def test_corrupt_download_is_retried(tmp_path, rucio_root, metadata):
+    client = CorruptingDownloadClient(rucio_root, n_corrupt=1)
+    (result,) = download_files(
+        [DID],
+        download_client_factory=lambda: client,
+        base_dir=tmp_path,
+        metadata=metadata,
+    )
+    assert result.attempts == 2
+    assert verify_file(result.path, metadata[DID])
+
+
+def test_corrupt_download_fails(tmp_path, rucio_root, metadata):
+    with pytest.raises(FileNotFoundError):
+        download_files(
+            [DID],
+            download_client_factory=lambda: CorruptingDownloadClient(rucio_root, 9),
+            base_dir=tmp_path,
+            retries=2,
+            metadata=metadata,
+        )
+    assert not (tmp_path / "wtromp" / "era5_precip_2020_1.nc").exists()
+
+
+def test_resume(tmp_path, rucio_root, metadata):
+    path = tmp_path / "wtromp" / "era5_precip_2020_1.nc"
+    path.parent.mkdir()
+    path.write_bytes(b"january" * 100)
+    client = CorruptingDownloadClient(rucio_root, n_corrupt=0)
+    download = {"download_client_factory": lambda: client, "base_dir": tmp_path}
+    (result,) = download_files([DID], metadata=metadata, **download)
+    assert (result.attempts, client.downloads) == (0, 0)
+
+    # partial files are downloaded again
+    path.write_bytes(b"jan")
+    (result,) = download_files([DID], metadata=metadata, **download)
+    assert (result.attempts, client.downloads) == (1, 1)
+    assert verify_file(path, metadata[DID])
@@ -0,0 +1,60 @@
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from DT_flood.utils.forcing.catalogue import load_catalogue
+from DT_flood.utils.forcing.clients import (
+    ClientPool,
+    download_pool,
+    rucio_pool,
+    use_rucio_client,
+)
+from DT_flood.utils.forcing.download import download_files
+from DT_flood.utils.forcing.local_backend import LocalRucioClient
+
+
+def test_pool_reuses_clients():
+    pool = ClientPool(object)
+    with pool.borrow() as first:
+        pass
+    with pool.borrow() as second:
+        assert second is first
+        with pool.borrow() as third:
+            assert third is not first
+    assert pool.created == 2
+
+
+def test_pool_limits_idle_clients():
+    pool = ClientPool(object, max_idle=1)
+
+    def _borrow(_):
+        with pool.borrow() as client:
+            return client
+
+    with ThreadPoolExecutor(max_workers=4) as executor:
+        list(executor.map(_borrow, range(16)))
+    assert len(pool._idle) == 1
+
+
+def test_explicit_client_is_not_pooled(rucio_root):
+    client = LocalRucioClient(rucio_root)
+    with use_rucio_client(client) as used:
+        assert used is client
+    assert client not in rucio_pool._idle
+
+
+@pytest.mark.usefixtures("local_backend")
+def test_local_backend(tmp_path):
+    created = download_pool.created
+    assert list(load_catalogue()) == ["era5"]
+    assert isinstance(rucio_pool._idle[0], LocalRucioClient)
+    results = download_files(
+        ["wtromp:elevtn.nc", "wtromp:era5_precip_2020_1.nc"],
+        base_dir=tmp_path,
+        max_workers=2,
+    )
+    assert [result.path.name for result in results] == [
+        "elevtn.nc",
+        "era5_precip_2020_1.nc",
+    ]
+    assert 1 <= download_pool.created - created <= 2
@@ -0,0 +1,72 @@
+import threading
+
+import pytest
+
+from DT_flood.utils.forcing import download as download_module
+from DT_flood.utils.forcing.download import download_files
+from DT_flood.utils.forcing.local_backend import LocalDownloadClient
+
+DIDS = ["wtromp:era5_precip_2020_1.nc", "wtromp:era5_precip_2020_2.nc"]
+
+
+class FlakyDownloadClient(LocalDownloadClient):
+    """Local download client failing the first downloads of every file."""
+
+    failures = {}
+    lock = threading.Lock()
+
+    def __init__(self, root, n_failures: int = 1):
+        super().__init__(root)
+        self.n_failures = n_failures
+
+    def download_dids(self, items):
+        did = items[0]["did"]
+        with self.lock:
+            failed = self.failures.get(did, 0)
+            self.failures[did] = failed + 1
+        if failed < self.n_failures:
+            raise ConnectionError(f"Connection lost downloading {did}")
+        return super().download_dids(items)
+
+
+@pytest.fixture(autouse=True)
+def no_backoff(monkeypatch):
+    monkeypatch.setattr(download_module.time, "sleep", lambda seconds: None)
+
+
+@pytest.fixture(autouse=True)
+def reset_failures():
+    FlakyDownloadClient.failures = {}
+
+
+def test_concurrent_downloads(tmp_path, rucio_root):
+    results = download_files(
+        DIDS,
+        download_client_factory=lambda: LocalDownloadClient(rucio_root),
+        base_dir=tmp_path / "download",
+        max_workers=2,
+    )
+    assert [result.did for result in results] == DIDS
+    assert [result.attempts for result in results] == [1, 1]
+    assert results[1].path == tmp_path / "download" / "wtromp" / DIDS[1][7:]
+    assert results[1].path.read_bytes() == b"february" * 100
+
+
+def test_retries(tmp_path, rucio_root):
+    results = download_files(
+        DIDS,
+        download_client_factory=lambda: FlakyDownloadClient(rucio_root, 2),
+        base_dir=tmp_path,
+        retries=2,
+    )
+    assert [result.attempts for result in results] == [3, 3]
+
+
+def test_retries_exhausted(tmp_path, rucio_root):
+    with pytest.raises(FileNotFoundError, match="Download failed"):
+        download_files(
+            DIDS[:1],
+            download_client_factory=lambda: FlakyDownloadClient(rucio_root, 3),
+            base_dir=tmp_path,
+            retries=2,
+        )
@@ -0,0 +1,30 @@
+import numpy as np
+import pandas as pd
+import pytest
+import xarray as xr
+
+from DT_flood.utils.forcing.encoding import get_encoding, write_forcing
+
+
+def _forcing(n_time: int) -> xr.Dataset:
+    time = pd.date_range("2020-01-01", periods=n_time, freq="h")
+    data = np.random.default_rng(0).random((n_time, 3, 4))
+    return xr.Dataset(
+        {"precip": (("time", "y", "x"), data)},
+        coords={"time": time, "y": np.arange(3), "x": np.arange(4)},
+    )
+
+
+def test_chunks_are_time_major():
+    encoding = get_encoding(_forcing(48), profile="zlib")
+    assert encoding["precip"]["chunksizes"] == (24, 3, 4)
+
+
+@pytest.mark.parametrize("profile", ["zlib", "zstd", "packed"])
+def test_empty_time_dimension(tmp_path, profile):
+    ds = _forcing(0)
+    encoding = get_encoding(ds, profile=profile)
+    assert encoding["precip"]["chunksizes"] == (1, 3, 4)
+    path = write_forcing(ds, tmp_path / "forcing.nc", profile="zlib")
+    with xr.open_dataset(path) as ds_read:
+        assert ds_read.sizes["time"] == 0
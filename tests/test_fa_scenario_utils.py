@@ -0,0 +1,54 @@
+import sys
+import types
+
+import pytest
+
+from DT_flood.utils import fa_scenario_utils
+from DT_flood.utils.fa_scenario_utils import get_database
+
+
+class Database:
+    """Process-wide database that follows the last opened path, as FloodAdapt's."""
+
+    instance = None
+
+    def __new__(cls, database_path):
+        if cls.instance is None:
+            cls.instance = super().__new__(cls)
+        cls.instance.base_path = database_path
+        return cls.instance
+
+
+class FloodAdapt:
+    def __init__(self, database_path):
+        self.database = Database(database_path)
+
+
+@pytest.fixture
+def flood_adapt(monkeypatch) -> list:
+    """Replace FloodAdapt by stand-ins recording the settings of each call."""
+    settings = []
+    config = types.ModuleType("flood_adapt.config.config")
+    config.Settings = lambda **kwargs: settings.append(kwargs)
+    api = types.ModuleType("flood_adapt.flood_adapt")
+    api.FloodAdapt = FloodAdapt
+    monkeypatch.setitem(sys.modules, "flood_adapt", types.ModuleType("flood_adapt"))
+    monkeypatch.setitem(sys.modules, "flood_adapt.config", types.ModuleType("config"))
+    monkeypatch.setitem(sys.modules, "flood_adapt.config.config", config)
+    monkeypatch.setitem(sys.modules, "flood_adapt.flood_adapt", api)
+    monkeypatch.setattr(fa_scenario_utils, "_active_database", {})
+    monkeypatch.setattr(Database, "instance", None)
+    return settings
+
+
+def test_get_database_switches_databases(tmp_path, flood_adapt):
+    path_a, path_b = tmp_path / "a", tmp_path / "b"
+    db_a = get_database(path_a)
+    assert get_database(path_a) is db_a
+    assert len(flood_adapt) == 1
+
+    get_database(path_b)
+    db = get_database(path_a)
+    assert db.database.base_path == path_a
+    assert flood_adapt[-1]["DATABASE_NAME"] == "a"
+    assert len(flood_adapt) == 3
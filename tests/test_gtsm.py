@@ -0,0 +1,75 @@
+import numpy as np
+import pandas as pd
+import pytest
+import xarray as xr
+
+from DT_flood.utils.data_utils import get_gtsm_forcing_data
+
+hydromt = pytest.importorskip("hydromt")
+
+BOUNDS = [4.0, 51.0, 5.0, 52.0]
+
+
+def _gtsm_file(path, month: int):
+    time = pd.date_range(f"2020-{month:02d}-01", periods=24 * 28, freq="h")
+    x = np.array([3.5, 4.2, 4.8, 5.5, 4.5])
+    y = np.array([51.5, 51.2, 51.8, 51.5, 52.5])
+    waterlevel = np.arange(time.size * x.size, dtype=float).reshape(time.size, -1)
+    ds = xr.Dataset(
+        {"waterlevel": (("time", "stations"), waterlevel + month)},
+        coords={
+            "time": time,
+            "stations": np.arange(x.size),
+            "lon": ("stations", x),
+            "lat": ("stations", y),
+        },
+    )
+    ds.vector.set_crs(4326)
+    ds.to_netcdf(path)
+    return path
+
+
+@pytest.fixture
+def gtsm_files(rucio_root):
+    dataset = rucio_root / "wtromp" / "gtsm"
+    dataset.mkdir()
+    return [
+        _gtsm_file(dataset / f"gtsm_waterlevel_2020_{month:02d}.nc", month)
+        for month in [1, 2]
+    ]
+
+
+@pytest.mark.usefixtures("local_backend")
+def test_matches_full_read(tmp_path, monkeypatch, gtsm_files):
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setenv("DT_FLOOD_CACHE_DIR", "")
+    window = ("2020-01-20", "2020-02-05")
+    ds = get_gtsm_forcing_data("gtsm", *window, data_vars=["waterlevel"], bounds=BOUNDS)
+
+    with xr.open_mfdataset(gtsm_files, combine="by_coords") as ds_full:
+        expected = hydromt.DataCatalog().get_geodataset(
+            ds_full, bbox=BOUNDS, time_tuple=window
+        )
+        xr.testing.assert_identical(ds, expected.load())
+    assert ds.sizes["stations"] == 2
+    assert ds.vector.crs is not None
+
+
+@pytest.mark.usefixtures("local_backend")
+def test_nearest_stations(tmp_path, monkeypatch, gtsm_files):
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setenv("DT_FLOOD_CACHE_DIR", "")
+    ds = get_gtsm_forcing_data(
+        "gtsm",
+        "2020-01-20",
+        "2020-02-05",
+        data_vars=["waterlevel"],
+        bounds=BOUNDS,
+        points=np.array([[3.4, 51.5], [4.6, 52.6]]),
+        n_nearest=1,
+    )
+    assert ds["lon"].values.tolist() == [3.5, 4.5]
+    assert ds["time"].values[[0, -1]].tolist() == [
+        pd.Timestamp("2020-01-20").value,
+        pd.Timestamp("2020-02-05 23:00").value,
+    ]
@@ -0,0 +1,46 @@
+import pytest
+
+from DT_flood.utils.forcing.manifest import (
+    load_manifest,
+    parse_time_coverage,
+    select_files,
+)
+
+
+def test_parse_time_coverage():
+    assert parse_time_coverage("era5_precip_2020_1.nc") == (
+        "era5_precip",
+        "2020-01-01T00:00:00",
+        "2020-02-01T00:00:00",
+    )
+    assert parse_time_coverage("elevtn.nc") == ("elevtn", None, None)
+
+
+def test_manifest_is_stored(rucio_client):
+    manifest = load_manifest(rucio_client, "era5", end_date="2020-02-10")
+    assert len(manifest["files"]) == 2
+    load_manifest(rucio_client, "era5", end_date="2020-02-10")
+    assert rucio_client.calls["list_content"] == 1
+    files = select_files(manifest, "2020-01-30", "2020-02-02", ["precip"])
+    assert [file["name"] for file in files] == [
+        "era5_precip_2020_1.nc",
+        "era5_precip_2020_2.nc",
+    ]
+
+
+def test_manifest_rebuilt_beyond_coverage(rucio_root, rucio_client):
+    load_manifest(rucio_client, "era5", end_date="2020-02-10")
+    (rucio_root / "wtromp" / "era5" / "era5_precip_2020_3.nc").write_bytes(b"march")
+
+    # offline the stored manifest is used as is
+    manifest = load_manifest(rucio_client, "era5", end_date="2020-03-10", offline=True)
+    assert len(manifest["files"]) == 2
+
+    manifest = load_manifest(rucio_client, "era5", end_date="2020-03-10")
+    assert rucio_client.calls["list_content"] == 2
+    assert len(manifest["files"]) == 3
+
+
+def test_offline_without_manifest(rucio_client):
+    with pytest.raises(FileNotFoundError):
+        load_manifest(rucio_client, "era5", offline=True)
@@ -0,0 +1,61 @@
+import numpy as np
+import pandas as pd
+import pytest
+import xarray as xr
+
+from DT_flood.utils import data_utils
+from DT_flood.utils.fa_scenario_utils import _prefetch_files, _select_event_files
+from DT_flood.utils.forcing.archive import add_to_archive
+from DT_flood.utils.forcing.cache import ForcingCache
+from DT_flood.utils.forcing.manifest import load_manifest
+
+
+@pytest.mark.usefixtures("local_backend")
+def test_prefetch_counts_each_file_once(tmp_path, rucio_client):
+    files = load_manifest(rucio_client, "era5")["files"]
+    cache = ForcingCache(tmp_path / "cache")
+    cached = tmp_path / "cached.nc"
+    cached.write_bytes(b"january" * 100)
+    cache.put(files[0]["did"], cached, checksum=files[0]["adler32"])
+
+    moved = _prefetch_files(files, cache, max_workers=2)
+    assert moved["files_downloaded"] == 1
+    stats = cache.stats()
+    assert (stats["hits"], stats["misses"], stats["files"]) == (0, 1, 2)
+    assert all(cache.contains(file["did"], file["adler32"]) for file in files)
+
+
+@pytest.mark.parametrize(
+    ("warmup_archive", "windows"),
+    [
+        (True, [("2020-12-31 00:00:00", "2021-01-10 00:00:00")]),
+        (False, [("2020-01-10 00:00:00", "2021-01-10 00:00:00")]),
+    ],
+)
+def test_select_only_missing_warmup(tmp_path, monkeypatch, warmup_archive, windows):
+    bounds = [4.0, 51.0, 5.0, 52.0]
+    time = pd.date_range("2020-01-01", "2020-12-31", freq="D")
+    ds = xr.Dataset(
+        {"precip": (("time", "lat", "lon"), np.zeros((len(time), 2, 2)))},
+        coords={"time": time, "lat": [51.0, 52.0], "lon": [4.0, 5.0]},
+    )
+    archive = tmp_path / "warmup_forcing.zarr"
+    add_to_archive(ds, archive, dataset="era5_daily", bounds=bounds)
+
+    selected = []
+
+    def select_forcing_files(dataset, start_date, end_date, **kwargs):
+        selected.append((dataset, start_date, end_date))
+        return []
+
+    monkeypatch.setattr(data_utils, "select_forcing_files", select_forcing_files)
+    event_dict = {
+        "start_time": "2021-01-10 00:00:00",
+        "end_time": "2021-01-12 00:00:00",
+        "sfincs_forcing": {},
+        "wflow_forcing": {"precip_warmup": "era5_daily", "pet_warmup": "era5_daily"},
+        "warmup_archive": warmup_archive,
+    }
+    _select_event_files(event_dict, archive, bounds)
+    assert sorted(set(selected)) == [("era5_daily", *window) for window in windows]
+    assert (archive / "era5_daily").exists()
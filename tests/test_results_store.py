@@ -0,0 +1,140 @@
+import pytest
+
+from DT_flood.utils.results_store import (
+    link_hazard,
+    link_tree,
+    rename_scenario,
+    scenario_content_hash,
+    scenario_hazard_key,
+    store_hazard,
+)
+
+
+def test_content_hash_ignores_names(database, make_scenario):
+    content_hash = scenario_content_hash(database, make_scenario("a"))
+    assert len(content_hash) == 64
+    assert scenario_content_hash(database, make_scenario("b")) == content_hash
+    database.database.measures["floodwall"].name = "renamed"
+    assert scenario_content_hash(database, make_scenario("a")) == content_hash
+
+
+def test_content_hash_changes_with_inputs(database, make_scenario):
+    content_hash = scenario_content_hash(database, make_scenario("a"))
+    assert scenario_content_hash(database, make_scenario("a", "wall_elevate")) != (
+        content_hash
+    )
+    database.database.measures["floodwall"].height = 3
+    assert scenario_content_hash(database, make_scenario("a")) != content_hash
+
+
+@pytest.mark.parametrize(
+    "path",
+    [
+        "events/event/waterlevel.nc",
+        "measures/floodwall/floodwall.geojson",
+        "../static/templates/fiat/settings.toml",
+    ],
+)
+def test_content_hash_covers_files(database, path, make_scenario):
+    content_hash = scenario_content_hash(database, make_scenario("a"))
+    (database.database.input_path / path).write_text("changed")
+    assert scenario_content_hash(database, make_scenario("a")) != content_hash
+
+
+def test_content_hash_ignores_object_config(database, make_scenario):
+    content_hash = scenario_content_hash(database, make_scenario("a"))
+    (database.database.input_path / "events/event/event.toml").write_text("")
+    assert scenario_content_hash(database, make_scenario("a")) == content_hash
+
+
+@pytest.mark.parametrize(
+    ("name", "renamed"),
+    [
+        ("FloodMap_a.tif", "FloodMap_new.tif"),
+        ("Impacts_detailed_a.csv", "Impacts_detailed_new.csv"),
+        ("Infometrics_a_subdistrict.csv", "Infometrics_new_subdistrict.csv"),
+        ("a_metrics.html", "new_metrics.html"),
+        ("a", "new"),
+        ("Impacts", "Impacts"),
+        ("max_water_level_map.nc", "max_water_level_map.nc"),
+        ("Impacts_detailed_ab.csv", "Impacts_detailed_ab.csv"),
+    ],
+)
+def test_rename_scenario(name, renamed):
+    assert rename_scenario(name, "a", "new") == renamed
+
+
+def test_link_tree_renames_short_scenario_names(tmp_path):
+    src = tmp_path / "src"
+    for rel in [
+        "Flooding/FloodMap_a.tif",
+        "Flooding/max_water_level_map.nc",
+        "Impacts/Impacts_detailed_a.csv",
+        "Impacts/fiat_model/output/spatial.gpkg",
+        "scenario_manifest.json",
+    ]:
+        (src / rel).parent.mkdir(parents=True, exist_ok=True)
+        (src / rel).write_text(rel)
+
+    link_tree(src, tmp_path / "dst", rename=("a", "b"), skip=["scenario_manifest.json"])
+    linked = sorted(
+        path.relative_to(tmp_path / "dst").as_posix()
+        for path in (tmp_path / "dst").rglob("*")
+        if path.is_file()
+    )
+    assert linked == [
+        "Flooding/FloodMap_b.tif",
+        "Flooding/max_water_level_map.nc",
+        "Impacts/Impacts_detailed_b.csv",
+        "Impacts/fiat_model/output/spatial.gpkg",
+    ]
+    target = tmp_path / "dst" / "Impacts" / "Impacts_detailed_b.csv"
+    assert target.samefile(src / "Impacts" / "Impacts_detailed_a.csv")
+    assert target.read_text() == "Impacts/Impacts_detailed_a.csv"
+
+
+def test_hazard_key_ignores_impact_measures(database, make_scenario):
+    hazard_key = scenario_hazard_key(database, make_scenario("a", "wall_elevate"))
+    assert scenario_hazard_key(database, make_scenario("b", "wall")) == hazard_key
+    assert (
+        scenario_hazard_key(database, make_scenario("c", "wall_elevate_more"))
+        == hazard_key
+    )
+    assert scenario_content_hash(database, make_scenario("a", "wall_elevate")) != (
+        scenario_content_hash(database, make_scenario("c", "wall_elevate_more"))
+    )
+
+
+def test_hazard_key_ignores_impact_templates(database, make_scenario):
+    hazard_key = scenario_hazard_key(database, make_scenario("a"))
+    static = database.database.static_path
+    (static / "templates/fiat/settings.toml").write_text("changed")
+    assert scenario_hazard_key(database, make_scenario("a")) == hazard_key
+    (static / "templates/sfincs/sfincs.inp").write_text("changed")
+    assert scenario_hazard_key(database, make_scenario("a")) != hazard_key
+
+
+def test_keys_cover_static_reads(database, make_scenario):
+    scenario = make_scenario("a")
+    content_hash = scenario_content_hash(database, scenario)
+    hazard_key = scenario_hazard_key(database, scenario)
+    dem = database.database.static_path / "dem"
+    dem.mkdir()
+    (dem / "dep.tif").write_text("dem")
+    assert scenario_content_hash(database, scenario) != content_hash
+    assert scenario_hazard_key(database, scenario) != hazard_key
+
+
+def test_store_and_link_hazard(database, tmp_path, make_scenario):
+    flooding = database.database.scenarios.output_path / "a" / "Flooding"
+    flooding.mkdir(parents=True)
+    (flooding / "FloodMap_a.tif").write_text("floodmap")
+    (flooding / "max_water_level_map.nc").write_text("waterlevel")
+    hazard_key = scenario_hazard_key(database, make_scenario("a", "wall_elevate"))
+
+    assert link_hazard(database, make_scenario("b"), tmp_path / "stage") is None
+    store_hazard(database, make_scenario("a", "wall_elevate"), hazard_key)
+    linked = link_hazard(database, make_scenario("b"), tmp_path / "stage")
+    assert linked["floodmap"] == tmp_path / "stage/Flooding/FloodMap_b.tif"
+    assert linked["floodmap"].read_text() == "floodmap"
+    assert linked["waterlevel_map"].read_text() == "waterlevel"
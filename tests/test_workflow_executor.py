@@ -0,0 +1,191 @@
+import sys
+from pathlib import Path
+
+import pytest
+import yaml
+
+from DT_flood.utils import workflow_executor
+from DT_flood.utils.step_cache import StepCache
+from DT_flood.utils.workflow_executor import WorkflowExecutor
+
+# Appends the text to the lines of the input file, if given, into out.txt
+APPEND = (
+    "import sys; from pathlib import Path; "
+    "src = Path(sys.argv[2]) if len(sys.argv) > 2 else None; "
+    "lines = src.read_text() if src else ''; "
+    "Path('out.txt').write_text(lines + sys.argv[1] + chr(10))"
+)
+
+
+def _dump(path: Path, content: dict) -> Path:
+    with open(path, "w") as f:
+        yaml.safe_dump(content, f)
+    return path
+
+
+@pytest.fixture
+def workflow(tmp_path) -> Path:
+    _dump(
+        tmp_path / "append.cwl",
+        {
+            "cwlVersion": "v1.2",
+            "class": "CommandLineTool",
+            "baseCommand": [sys.executable, "-c", APPEND],
+            "inputs": {
+                "text": {"type": "string", "inputBinding": {"position": 1}},
+                "previous": {"type": "File?", "inputBinding": {"position": 2}},
+            },
+            "outputs": {"out": {"type": "File", "outputBinding": {"glob": "out.txt"}}},
+        },
+    )
+    return _dump(
+        tmp_path / "workflow.cwl",
+        {
+            "cwlVersion": "v1.2",
+            "class": "Workflow",
+            "inputs": {"first": "string", "second": "string"},
+            "outputs": {"out": {"type": "File", "outputSource": "second/out"}},
+            "steps": {
+                "first": {
+                    "run": "append.cwl",
+                    "in": {"text": "first"},
+                    "out": ["out"],
+                },
+                "second": {
+                    "run": "append.cwl",
+                    "in": {"text": "second", "previous": "first/out"},
+                    "out": ["out"],
+                },
+            },
+        },
+    )
+
+
+def test_run(tmp_path, workflow):
+    job_fn = _dump(tmp_path / "job.yml", {"first": "a", "second": "b"})
+    run = WorkflowExecutor(workflow, job_fn).run(outdir=tmp_path / "out")
+    assert run.succeeded
+    assert run.critical_path()[0] == ["first", "second"]
+    assert Path(run.outputs["out"]["path"]).read_text() == "a\nb\n"
+
+
+def test_conditional_step(tmp_path, workflow):
+    content = yaml.safe_load(workflow.read_text())
+    content["inputs"]["previous"] = "File?"
+    content["steps"]["first"]["in"]["previous"] = "previous"
+    content["steps"]["first"]["when"] = "$(inputs.previous === null)"
+    content["steps"]["second"]["in"]["previous"] = {
+        "source": ["first/out", "previous"],
+        "valueFrom": "$(self[0] || self[1])",
+    }
+    _dump(workflow, content)
+    (tmp_path / "previous.txt").write_text("stored\n")
+    job = {"first": "a", "second": "b"}
+    executor = WorkflowExecutor(workflow, _dump(tmp_path / "job.yml", job))
+    run = executor.run(outdir=tmp_path / "full")
+    assert run.steps["first"].status == "done"
+    assert Path(run.outputs["out"]["path"]).read_text() == "a\nb\n"
+
+    job["previous"] = {"class": "File", "path": "previous.txt"}
+    executor = WorkflowExecutor(workflow, _dump(tmp_path / "job.yml", job))
+    run = executor.run(outdir=tmp_path / "reused")
+    assert run.succeeded
+    assert run.steps["first"].status == "skipped"
+    assert Path(run.outputs["out"]["path"]).read_text() == "stored\nb\n"
+
+
+def test_unsupported_step_class(tmp_path, workflow):
+    _dump(
+        tmp_path / "expression.cwl",
+        {"cwlVersion": "v1.2", "class": "ExpressionTool", "expression": "{}"},
+    )
+    content = yaml.safe_load(workflow.read_text())
+    content["steps"]["first"]["run"] = "expression.cwl"
+    _dump(workflow, content)
+    job_fn = _dump(tmp_path / "job.yml", {"first": "a", "second": "b"})
+    with pytest.raises(ValueError, match="Steps first of"):
+        WorkflowExecutor(workflow, job_fn)
+
+
+# Writes a folder with a file, or appends the text to the file of a given folder
+WRITE_DIR = (
+    "import sys; from pathlib import Path; "
+    "folder = Path(sys.argv[2]).name if len(sys.argv) > 2 else 'fiat'; "
+    "Path(folder).mkdir(exist_ok=True); "
+    "open(Path(folder) / 'out.txt', 'a').write(sys.argv[1] + chr(10))"
+)
+
+
+@pytest.fixture
+def directory_workflow(tmp_path) -> Path:
+    tool = {
+        "cwlVersion": "v1.2",
+        "class": "CommandLineTool",
+        "baseCommand": [sys.executable, "-c", WRITE_DIR],
+        "inputs": {
+            "text": {"type": "string", "inputBinding": {"position": 1}},
+            "folder": {"type": "Directory?", "inputBinding": {"position": 2}},
+        },
+        "outputs": {
+            "out": {"type": "Directory", "outputBinding": {"glob": "fiat"}},
+        },
+    }
+    _dump(tmp_path / "write.cwl", tool)
+    tool["requirements"] = {
+        "InitialWorkDirRequirement": {
+            "listing": [{"entry": "$(inputs.folder)", "writable": True}]
+        }
+    }
+    _dump(tmp_path / "modify.cwl", tool)
+    return _dump(
+        tmp_path / "workflow.cwl",
+        {
+            "cwlVersion": "v1.2",
+            "class": "Workflow",
+            "inputs": {"first": "string", "second": "string"},
+            "outputs": {"out": {"type": "Directory", "outputSource": "run_fiat/out"}},
+            "steps": {
+                "update_fiat": {
+                    "run": "write.cwl",
+                    "in": {"text": "first"},
+                    "out": ["out"],
+                },
+                "run_fiat": {
+                    "run": "modify.cwl",
+                    "in": {"text": "second", "folder": "update_fiat/out"},
+                    "out": ["out"],
+                },
+            },
+        },
+    )
+
+
+def test_writable_inputs_are_copied(tmp_path, directory_workflow, monkeypatch):
+    staged = []
+    stage_value = workflow_executor._stage_value
+    monkeypatch.setattr(
+        workflow_executor,
+        "_stage_value",
+        lambda *args: staged.append(args[1]) or stage_value(*args),
+    )
+    job_fn = _dump(tmp_path / "job.yml", {"first": "a", "second": "b"})
+    cache = StepCache(tmp_path / "cache")
+    (tmp_path / "tmp").mkdir()
+    for _ in range(2):
+        executor = WorkflowExecutor(
+            directory_workflow, job_fn, tmp_dir=tmp_path / "tmp", cache=cache
+        )
+        run = executor.run()
+        assert run.succeeded
+        out_fn = Path(run.outputs["out"]["path"]) / "out.txt"
+        assert out_fn.read_text() == "a\nb\n"
+        upstream = Path(run.steps["update_fiat"].outputs["out"]["path"])
+        assert (upstream / "out.txt").read_text() == "a\n"
+    assert run.steps["update_fiat"].status == "cached"
+    # Cache hits are not staged
+    assert run.steps["run_fiat"].status == "cached"
+    assert len(staged) == 1
+    for entry in cache.entries():
+        if entry["step"] == "update_fiat":
+            files = cache.root / entry["key"] / "files"
+            assert (files / "fiat" / "out.txt").read_text() == "a\n"
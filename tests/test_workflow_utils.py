@@ -0,0 +1,163 @@
+import os
+import time
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+
+import pytest
+
+from DT_flood.utils import workflow_utils
+from DT_flood.utils.results_store import get_stored_results
+from DT_flood.utils.warm_states import (
+    OUTSTATE,
+    add_warm_state,
+    find_warm_state,
+    list_warm_states,
+)
+from DT_flood.utils.workflow_utils import _finish_scenario, _plan_scenario
+
+
+@pytest.fixture
+def plan(database, make_scenario) -> dict:
+    scenario = make_scenario("a")
+    results = database.database.scenarios.output_path / "a"
+    floodmap = results / "Flooding" / "FloodMap_a.tif"
+    floodmap.parent.mkdir(parents=True)
+    floodmap.write_text("floodmap")
+    return {
+        "database": database,
+        "scenario": scenario,
+        "staged": [],
+        "content_hash": "hash",
+        "hazard_key": "key",
+        "store_states": False,
+        "store_warmup": False,
+        "output": floodmap,
+        "planned": time.time() - 60,
+    }
+
+
+def test_store_outputs_of_run(database, plan):
+    _finish_scenario(plan, succeeded=True)
+    assert get_stored_results(database, "hash") is not None
+    assert (database.database.output_path / "hazard_store" / "key").exists()
+
+
+def test_failed_run_is_not_stored(database, plan):
+    _finish_scenario(plan, succeeded=False)
+    assert get_stored_results(database, "hash") is None
+
+
+def test_outputs_of_earlier_run_are_not_stored(database, plan):
+    stale = plan["planned"] - 60
+    os.utime(plan["output"], (stale, stale))
+    _finish_scenario(plan, succeeded=True)
+    assert get_stored_results(database, "hash") is None
+    assert not (database.database.output_path / "hazard_store").exists()
+
+
+def test_run_scenarios_reports_failed_keys(database, make_scenario, monkeypatch):
+    hashed = []
+
+    def _init_scenario(_, name):
+        if name == "missing":
+            raise ValueError(f"Scenario {name} does not exist")
+        return database, make_scenario(name)
+
+    def _hash(_, scenario):
+        hashed.append(scenario.name)
+        return f"hash_{scenario.name}"
+
+    monkeypatch.setattr(workflow_utils, "init_scenario", _init_scenario)
+    monkeypatch.setattr(workflow_utils, "scenario_content_hash", _hash)
+    monkeypatch.setattr(workflow_utils, "link_results", lambda *args: True)
+    results = workflow_utils.run_scenarios(
+        "database",
+        ["a", "missing", "b"],
+        oscar_endpoint="endpoint",
+        oscar_token="token",
+        step_cache=False,
+        reuse_results=True,
+    )
+    assert results["status"].tolist() == ["linked", "failed", "linked"]
+    assert results["error"][1] == "Scenario missing does not exist"
+    assert hashed == ["a", "b"]
+
+
+@pytest.fixture
+def warm_states(database, tmp_path) -> list[datetime]:
+    """Stored states on January 1st and June 1st, and an event on June 1st."""
+    state_fn = tmp_path / "outstates.nc"
+    state_fn.write_text("state")
+    times = [datetime(2020, 1, 1), datetime(2020, 6, 1)]
+    for state_time in times:
+        add_warm_state(database, state_time, state_fn)
+    database.database.events["event"].time = SimpleNamespace(
+        start_time=datetime(2020, 6, 1, 6), end_time=datetime(2020, 6, 3)
+    )
+    return times
+
+
+@pytest.mark.parametrize(
+    ("time", "tolerance", "max_gap", "expected"),
+    [
+        (datetime(2020, 6, 1, 6), timedelta(hours=12), timedelta(0), (1, True)),
+        (datetime(2020, 6, 10), timedelta(hours=12), timedelta(days=30), (1, False)),
+        (datetime(2020, 5, 31), timedelta(0), timedelta(days=365), (0, False)),
+        (datetime(2020, 9, 1), timedelta(hours=12), timedelta(days=30), None),
+    ],
+)
+def test_find_warm_state(database, warm_states, time, tolerance, max_gap, expected):
+    state = find_warm_state(database, time, tolerance=tolerance, max_gap=max_gap)
+    if expected is None:
+        assert state is None
+    else:
+        assert (state.time, state.exact) == (warm_states[expected[0]], expected[1])
+
+
+def test_warm_states_split_per_template(database, warm_states):
+    assert list(list_warm_states(database)) == warm_states
+    wflow = database.database.static_path / "templates" / "wflow"
+    wflow.mkdir()
+    (wflow / "wflow_sbm.toml").write_text("wflow")
+    assert list_warm_states(database) == {}
+
+
+@pytest.mark.usefixtures("warm_states")
+def test_plan_exact_warm_state(database, make_scenario):
+    plan = _plan_scenario(
+        database,
+        make_scenario("a"),
+        reuse_results=False,
+        reuse_hazard=False,
+        reuse_warm_state=True,
+        warm_state_tolerance=timedelta(hours=12),
+    )
+    assert plan["reused"] == "warm state"
+    assert (plan["inputs"]["warmup_dir"] / "model" / OUTSTATE).exists()
+    assert plan["staged"] == [plan["inputs"]["warmup_dir"]]
+    assert plan["store_states"]
+    assert not plan["store_warmup"]
+
+
+@pytest.mark.parametrize(
+    ("max_gap", "inputs"),
+    [
+        (timedelta(days=30), {"wflow_state_time": "2020-06-01T00:00:00"}),
+        (timedelta(hours=1), {}),
+    ],
+)
+@pytest.mark.usefixtures("warm_states")
+def test_plan_gap_fill_warm_state(database, make_scenario, max_gap, inputs):
+    plan = _plan_scenario(
+        database,
+        make_scenario("a"),
+        reuse_results=False,
+        reuse_hazard=False,
+        reuse_warm_state=True,
+        warm_state_max_gap=max_gap,
+    )
+    plan["inputs"].pop("wflow_state", None)
+    assert plan["inputs"] == inputs
+    assert plan["reused"] is None
+    assert plan["store_states"]
+    assert plan["store_warmup"]